@@ -5,6 +5,9 @@ from sqlalchemy import pool
 
 from alembic import context
 
+from app.db import Base
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -12,13 +15,24 @@ config = context.config
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+# Point at another database without editing alembic.ini:
+#   alembic -x url=sqlite:///./other.db upgrade head
+if context.get_x_argument(as_dictionary=True).get("url"):
+    config.set_main_option("sqlalchemy.url", context.get_x_argument(as_dictionary=True)["url"])
 
 # add your model's MetaData object here
 # for 'autogenerate' support
-# from myapp import mymodel
-# target_metadata = mymodel.Base.metadata
-target_metadata = None
+target_metadata = Base.metadata
+
+# The FTS5 index and its shadow tables are created by raw DDL (see app/models.py),
+# so autogenerate must not try to drop them
+FTS_PREFIX = "transcripts_fts"
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    return not (type_ == "table" and name and name.startswith(FTS_PREFIX))
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -44,6 +58,8 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -64,8 +80,12 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        # Batch mode lets ALTERs that SQLite lacks run as table rebuilds
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=True,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,389 @@
+"""baseline schema
+
+Brings any existing database to the schema app.models had before migrations were
+introduced: fresh databases get every table, create_all-era databases are left
+as they are, and databases from before the mobile app get the columns, token
+layout and usage limits that migrate_database.py used to patch in by hand.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 21:53:05.196080
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.sqlite_online import rebuild_table
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of the transcript search DDL in app/models.py as of this revision
+FTS_STATEMENTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5("
+    "text, content='transcripts', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS transcripts_ai AFTER INSERT ON transcripts BEGIN "
+    "INSERT INTO transcripts_fts(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS transcripts_ad AFTER DELETE ON transcripts BEGIN "
+    "INSERT INTO transcripts_fts(transcripts_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS transcripts_au AFTER UPDATE OF text ON transcripts BEGIN "
+    "INSERT INTO transcripts_fts(transcripts_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO transcripts_fts(rowid, text) VALUES (new.id, new.text); END",
+)
+
+TOKENS_CREATE_SQL = """
+    CREATE TABLE tokens__new (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        access_token VARCHAR NOT NULL,
+        token_type VARCHAR,
+        refresh_token VARCHAR NOT NULL,
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        UNIQUE (access_token),
+        UNIQUE (refresh_token),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )
+"""
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def _columns(name: str) -> set:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(name)}
+
+
+def _upgrade_legacy_users():
+    columns = _columns('users')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        if 'name' not in columns:
+            batch_op.add_column(sa.Column('name', sa.String(), nullable=True))
+        if 'created_at' not in columns:
+            batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+
+
+def _upgrade_legacy_tokens():
+    columns = _columns('tokens')
+    if 'token' in columns and 'access_token' not in columns:
+        # The oldest layout had a single token column; rebuild in batches so the
+        # auth endpoints keep working while rows are copied
+        with op.get_context().autocommit_block():
+            rebuild_table(
+                op.get_bind().connection.driver_connection, 'tokens', TOKENS_CREATE_SQL,
+                ['id', 'user_id', 'access_token', 'token_type', 'refresh_token', 'created_at'],
+                ['id', 'user_id', 'token', "'bearer'", "'refresh_' || token", 'created_at'],
+                indexes=['CREATE INDEX IF NOT EXISTS ix_tokens_id ON tokens (id)']
+            )
+    elif 'created_at' not in columns:
+        with op.batch_alter_table('tokens', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+
+
+def _seed_usage_limits():
+    """Give users from before usage limits existed the default mobile trial"""
+    op.execute(
+        "INSERT INTO usage_limits (user_id, app_type, calls_made_today, calls_made_this_week, "
+        "calls_made_this_month, calls_made_total, week_start_date, month_start_date, "
+        "trial_calls_remaining, trial_calls_used, trial_start_date, is_trial_active, is_subscribed, "
+        "created_at, updated_at) "
+        "SELECT id, 'MOBILE', 0, 0, 0, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 2, 0, CURRENT_TIMESTAMP, 1, 0, "
+        "CURRENT_TIMESTAMP, CURRENT_TIMESTAMP FROM users "
+        "WHERE id NOT IN (SELECT user_id FROM usage_limits)"
+    )
+
+
+def upgrade() -> None:
+    had_users = _has_table('users')
+    had_usage_limits = _has_table('usage_limits')
+    had_fts = _has_table('transcripts_fts')
+
+    if not _has_table('users'):
+        op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('hashed_password', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('users', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+            batch_op.create_index(batch_op.f('ix_users_id'), ['id'], unique=False)
+
+    if not _has_table('call_costs'):
+        op.create_table('call_costs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('call_sid', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('scenario', sa.String(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('ended_at', sa.DateTime(), nullable=False),
+        sa.Column('duration_seconds', sa.Float(), nullable=False),
+        sa.Column('responses', sa.Integer(), nullable=False),
+        sa.Column('text_input_tokens', sa.Integer(), nullable=False),
+        sa.Column('text_cached_input_tokens', sa.Integer(), nullable=False),
+        sa.Column('audio_input_tokens', sa.Integer(), nullable=False),
+        sa.Column('audio_cached_input_tokens', sa.Integer(), nullable=False),
+        sa.Column('text_output_tokens', sa.Integer(), nullable=False),
+        sa.Column('audio_output_tokens', sa.Integer(), nullable=False),
+        sa.Column('cost_usd', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('call_costs', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_call_costs_call_sid'), ['call_sid'], unique=True)
+            batch_op.create_index(batch_op.f('ix_call_costs_ended_at'), ['ended_at'], unique=False)
+            batch_op.create_index(batch_op.f('ix_call_costs_user_id'), ['user_id'], unique=False)
+
+    if not _has_table('call_records'):
+        op.create_table('call_records',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('call_sid', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('scenario', sa.String(), nullable=True),
+        sa.Column('to_number', sa.String(), nullable=True),
+        sa.Column('from_number', sa.String(), nullable=True),
+        sa.Column('source', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('status_rank', sa.Integer(), nullable=False),
+        sa.Column('initiated_at', sa.DateTime(), nullable=True),
+        sa.Column('ringing_at', sa.DateTime(), nullable=True),
+        sa.Column('answered_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('duration_seconds', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('call_sid')
+        )
+        with op.batch_alter_table('call_records', schema=None) as batch_op:
+            batch_op.create_index('ix_call_records_status_updated', ['status', 'updated_at'], unique=False)
+            batch_op.create_index('ix_call_records_user_created', ['user_id', 'created_at'], unique=False)
+            batch_op.create_index('ix_call_records_user_status_created', ['user_id', 'status', 'created_at'], unique=False)
+
+    if not _has_table('call_schedules'):
+        op.create_table('call_schedules',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('phone_number', sa.String(), nullable=False),
+        sa.Column('scheduled_time', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('scenario', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('call_schedules', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_call_schedules_id'), ['id'], unique=False)
+
+    if not _has_table('call_stats'):
+        op.create_table('call_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('call_sid', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('duration_s', sa.Float(), nullable=False),
+        sa.Column('caller_talk_s', sa.Float(), nullable=False),
+        sa.Column('assistant_talk_s', sa.Float(), nullable=False),
+        sa.Column('talk_ratio', sa.Float(), nullable=True),
+        sa.Column('longest_silence_s', sa.Float(), nullable=False),
+        sa.Column('overlap_count', sa.Integer(), nullable=False),
+        sa.Column('barge_in_count', sa.Integer(), nullable=False),
+        sa.Column('turn_count', sa.Integer(), nullable=False),
+        sa.Column('latency_mean_ms', sa.Float(), nullable=True),
+        sa.Column('latency_p50_ms', sa.Float(), nullable=True),
+        sa.Column('latency_p90_ms', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('call_stats', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_call_stats_call_sid'), ['call_sid'], unique=True)
+            batch_op.create_index(batch_op.f('ix_call_stats_user_id'), ['user_id'], unique=False)
+
+    if not _has_table('idempotency_keys'):
+        op.create_table('idempotency_keys',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('fingerprint', sa.String(), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('response_body', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_key')
+        )
+        with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_idempotency_keys_expires_at'), ['expires_at'], unique=False)
+
+    if not _has_table('tokens'):
+        op.create_table('tokens',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('access_token', sa.String(), nullable=False),
+        sa.Column('token_type', sa.String(), nullable=True),
+        sa.Column('refresh_token', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('access_token'),
+        sa.UniqueConstraint('refresh_token')
+        )
+        with op.batch_alter_table('tokens', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_tokens_id'), ['id'], unique=False)
+
+    if not _has_table('transcripts'):
+        op.create_table('transcripts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('call_sid', sa.String(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('role', sa.String(), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('item_id', sa.String(), nullable=True),
+        sa.Column('scenario', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('transcripts', schema=None) as batch_op:
+            batch_op.create_index('ix_transcripts_call_sid_seq', ['call_sid', 'seq'], unique=False)
+            batch_op.create_index(batch_op.f('ix_transcripts_user_id'), ['user_id'], unique=False)
+
+    if not _has_table('usage_limits'):
+        op.create_table('usage_limits',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('app_type', sa.Enum('MOBILE', 'WEB_BUSINESS', 'WEB_CONSUMER', name='apptype'), nullable=False),
+        sa.Column('calls_made_today', sa.Integer(), nullable=True),
+        sa.Column('calls_made_this_week', sa.Integer(), nullable=True),
+        sa.Column('calls_made_this_month', sa.Integer(), nullable=True),
+        sa.Column('calls_made_total', sa.Integer(), nullable=True),
+        sa.Column('last_call_date', sa.DateTime(), nullable=True),
+        sa.Column('week_start_date', sa.DateTime(), nullable=True),
+        sa.Column('month_start_date', sa.DateTime(), nullable=True),
+        sa.Column('trial_calls_remaining', sa.Integer(), nullable=True),
+        sa.Column('trial_calls_used', sa.Integer(), nullable=True),
+        sa.Column('trial_start_date', sa.DateTime(), nullable=True),
+        sa.Column('trial_end_date', sa.DateTime(), nullable=True),
+        sa.Column('is_trial_active', sa.Boolean(), nullable=True),
+        sa.Column('subscription_tier', sa.String(), nullable=True),
+        sa.Column('is_subscribed', sa.Boolean(), nullable=True),
+        sa.Column('subscription_start_date', sa.DateTime(), nullable=True),
+        sa.Column('subscription_end_date', sa.DateTime(), nullable=True),
+        sa.Column('subscription_status', sa.String(), nullable=True),
+        sa.Column('weekly_call_limit', sa.Integer(), nullable=True),
+        sa.Column('monthly_call_limit', sa.Integer(), nullable=True),
+        sa.Column('billing_cycle', sa.String(), nullable=True),
+        sa.Column('last_payment_date', sa.DateTime(), nullable=True),
+        sa.Column('next_payment_date', sa.DateTime(), nullable=True),
+        sa.Column('app_store_transaction_id', sa.String(), nullable=True),
+        sa.Column('app_store_product_id', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id')
+        )
+        with op.batch_alter_table('usage_limits', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_usage_limits_id'), ['id'], unique=False)
+
+    if not _has_table('user_scenarios'):
+        op.create_table('user_scenarios',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('persona', sa.Text(), nullable=False),
+        sa.Column('prompt', sa.Text(), nullable=False),
+        sa.Column('voice', sa.String(), nullable=True),
+        sa.Column('temperature', sa.Float(), nullable=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'name', name='uq_user_scenarios_user_name')
+        )
+        with op.batch_alter_table('user_scenarios', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_user_scenarios_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_user_scenarios_user_id'), ['user_id'], unique=False)
+
+    if had_users:
+        _upgrade_legacy_users()
+    if had_users and _has_table('tokens'):
+        _upgrade_legacy_tokens()
+    if had_users and not had_usage_limits:
+        _seed_usage_limits()
+
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in FTS_STATEMENTS:
+            op.execute(statement)
+        if not had_fts:
+            op.execute("INSERT INTO transcripts_fts(transcripts_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in ('transcripts_au', 'transcripts_ad', 'transcripts_ai'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS transcripts_fts")
+
+    with op.batch_alter_table('user_scenarios', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_scenarios_user_id'))
+        batch_op.drop_index(batch_op.f('ix_user_scenarios_id'))
+
+    op.drop_table('user_scenarios')
+    with op.batch_alter_table('usage_limits', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_usage_limits_id'))
+
+    op.drop_table('usage_limits')
+    with op.batch_alter_table('transcripts', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_transcripts_user_id'))
+        batch_op.drop_index('ix_transcripts_call_sid_seq')
+
+    op.drop_table('transcripts')
+    with op.batch_alter_table('tokens', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tokens_id'))
+
+    op.drop_table('tokens')
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_idempotency_keys_expires_at'))
+
+    op.drop_table('idempotency_keys')
+    with op.batch_alter_table('call_stats', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_call_stats_user_id'))
+        batch_op.drop_index(batch_op.f('ix_call_stats_call_sid'))
+
+    op.drop_table('call_stats')
+    with op.batch_alter_table('call_schedules', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_call_schedules_id'))
+
+    op.drop_table('call_schedules')
+    with op.batch_alter_table('call_records', schema=None) as batch_op:
+        batch_op.drop_index('ix_call_records_user_status_created')
+        batch_op.drop_index('ix_call_records_user_created')
+        batch_op.drop_index('ix_call_records_status_updated')
+
+    op.drop_table('call_records')
+    with op.batch_alter_table('call_costs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_call_costs_user_id'))
+        batch_op.drop_index(batch_op.f('ix_call_costs_ended_at'))
+        batch_op.drop_index(batch_op.f('ix_call_costs_call_sid'))
+
+    op.drop_table('call_costs')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_id'))
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+
+    op.drop_table('users')
@@ -0,0 +1,37 @@
+"""hot path indexes
+
+Indexes for the scheduler's due-call poll (call_schedules.scheduled_time), a
+user's calls in time order (user_id, scheduled_time) and token lookups on
+login/refresh/logout (tokens.user_id). Databases created by init_db() after the
+models gained these indexes already have them, hence if_not_exists.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 22:40:12.518304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_call_schedules_scheduled_time', 'call_schedules', ['scheduled_time'],
+                    unique=False, if_not_exists=True)
+    op.create_index('ix_call_schedules_user_scheduled', 'call_schedules', ['user_id', 'scheduled_time'],
+                    unique=False, if_not_exists=True)
+    op.create_index('ix_tokens_user_id', 'tokens', ['user_id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tokens_user_id', table_name='tokens', if_exists=True)
+    op.drop_index('ix_call_schedules_user_scheduled', table_name='call_schedules', if_exists=True)
+    op.drop_index('ix_call_schedules_scheduled_time', table_name='call_schedules', if_exists=True)
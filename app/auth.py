@@ -1,25 +1,31 @@
 # auth.py
-from fastapi import APIRouter, Depends, HTTPException, status, Cookie, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Cookie, Response, Header
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from app.models import User, Token, UsageLimits, AppType
+from sqlalchemy.orm import Session, joinedload
+from app.models import User, UsageLimits, AppType
 from app.schemas import TokenData, UserCreate, UserLogin, TokenResponse, TokenSchema
-from app.db import get_db
+from app.db import get_db, SessionLocal
 from app.utils import (
     decode_token,
     get_password_hash,
     verify_password,
     create_access_token,
-    create_refresh_token
+    create_refresh_token,
+    new_token_id,
+    REFRESH_TOKEN_EXPIRE_DAYS
 )
+from app.services.metrics import metrics
+from app.services.token_revocation import revocation_store
 from app.services.usage_service import UsageService
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 import os
 import uuid
 import json
-from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
-from datetime import timedelta
+import hmac
+from typing import Optional
+from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, ADMIN_API_KEY
+from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
@@ -33,26 +39,85 @@ def decode_access_token(token: str):
     return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _access_claims(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    # Refresh tokens only buy new tokens; a logged-out session's access tokens are denied
+    if payload.get("sub") is None or payload.get("type") == "refresh" or revocation_store.is_revoked(payload.get("fam")):
+        raise _credentials_exception()
+    return payload
+
+
+def _token_data(token: str) -> TokenData:
+    return TokenData(email=_access_claims(token)["sub"])
+
+
+def user_id_for_token(token: str) -> int:
+    """User id for a long-lived stream, verified like any access token but without holding a DB session"""
+    claims = _access_claims(token)
+    if claims.get("user_id") is not None:
+        return int(claims["user_id"])
+    # Tokens from the legacy /token endpoint only carry the email
+    db = SessionLocal()
+    try:
+        user = db.query(User.id).filter(User.email == claims["sub"]).first()
+    finally:
+        db.close()
+    if user is None:
+        raise _credentials_exception()
+    return user.id
+
+
+def _issue_tokens(user_id: int, email: str, family: Optional[str] = None) -> dict:
+    """Access and refresh tokens for a login session; nothing is stored"""
+    claims = {"sub": email, "user_id": user_id, "fam": family or new_token_id()}
+    return {
+        "access_token": create_access_token(
+            data=claims, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)),
+        "refresh_token": create_refresh_token(data=claims),
+        "token_type": "bearer"
+    }
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    token_data = _token_data(token)
     user = db.query(User).filter(User.email == token_data.email).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    return user
+
+
+async def get_current_user_with_state(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """Like get_current_user, but loads usage limits and custom scenarios in the same query"""
+    token_data = _token_data(token)
+    user = db.query(User).options(
+        joinedload(User.usage_limits),
+        joinedload(User.scenarios)
+    ).filter(User.email == token_data.email).first()
+    if user is None:
+        raise _credentials_exception()
     return user
 
 
+async def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """Guard for operational endpoints, authenticated with the ADMIN_API_KEY shared secret"""
+    if not ADMIN_API_KEY or not x_admin_key or not hmac.compare_digest(x_admin_key, ADMIN_API_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+
 @router.post("/register", response_model=TokenResponse)
 async def register(user: UserCreate, db: Session = Depends(get_db)):
     """Register a new user with proper usage limits initialization"""
@@ -76,33 +141,9 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         usage_limits = UsageService.initialize_user_usage(
             new_user.id, AppType.MOBILE, db)
         
-        # Create tokens
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": new_user.email, "user_id": new_user.id},
-            expires_delta=access_token_expires
-        )
-        refresh_token = create_refresh_token(
-            data={"sub": new_user.email, "user_id": new_user.id}
-        )
-        
-        # Store token in database
-        token_entry = Token(
-            user_id=new_user.id, 
-            access_token=access_token,
-            token_type="bearer", 
-            refresh_token=refresh_token
-        )
-        db.add(token_entry)
-        db.commit()
-        
         logger.info(f"New user registered: {new_user.email} (ID: {new_user.id})")
         
-        return TokenResponse(
-            access_token=access_token, 
-            refresh_token=refresh_token, 
-            token_type="bearer"
-        )
+        return TokenResponse(**_issue_tokens(new_user.id, new_user.email))
         
     except HTTPException:
         raise
@@ -134,38 +175,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": user.email, "user_id": user.id}, 
-            expires_delta=access_token_expires
-        )
-        refresh_token = create_refresh_token(
-            data={"sub": user.email, "user_id": user.id}
-        )
-        
-        # Update or create token entry
-        token_entry = db.query(Token).filter(Token.user_id == user.id).first()
-        if token_entry:
-            token_entry.access_token = access_token
-            token_entry.refresh_token = refresh_token
-        else:
-            token_entry = Token(
-                user_id=user.id,
-                access_token=access_token,
-                token_type="bearer",
-                refresh_token=refresh_token
-            )
-            db.add(token_entry)
-        
-        db.commit()
-        
         logger.info(f"User logged in: {user.email}")
         
-        return TokenSchema(
-            access_token=access_token,
-            refresh_token=refresh_token,
-            token_type="bearer"
-        )
+        return TokenSchema(**_issue_tokens(user.id, user.email))
         
     except HTTPException:
         raise
@@ -179,48 +191,40 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 
 @router.post("/refresh", response_model=TokenResponse)
 async def refresh_token(refresh_token: str, db: Session = Depends(get_db)):
-    """Refresh access token using refresh token"""
+    """Rotate a refresh token: the presented one is spent and a new pair is issued"""
     try:
         # Verify refresh token
         payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         user_id: int = payload.get("user_id")
+        jti: str = payload.get("jti")
+        family: str = payload.get("fam")
         
-        if email is None or user_id is None:
+        if email is None or user_id is None or payload.get("type") != "refresh" or not jti or not family:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token"
             )
         
-        # Check if refresh token exists in database
-        token_entry = db.query(Token).filter(
-            Token.refresh_token == refresh_token,
-            Token.user_id == user_id
-        ).first()
-        
-        if not token_entry:
+        # One insert per rotation; a second use of the same token means it leaked,
+        # so the whole session is revoked
+        if not revocation_store.consume_refresh(db, jti, family, user_id, datetime.utcfromtimestamp(payload["exp"])):
+            if not revocation_store.is_revoked(family):
+                revocation_store.reuse_detected += 1
+                metrics.increment("refresh_token_reuse")
+                logger.warning(f"Refresh token reuse for user {user_id}; revoking session {family}")
+                revocation_store.revoke_family(
+                    db, family, user_id, datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token"
             )
         
-        # Create new access token
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        new_access_token = create_access_token(
-            data={"sub": email, "user_id": user_id},
-            expires_delta=access_token_expires
-        )
-        
-        # Update token in database
-        token_entry.access_token = new_access_token
-        db.commit()
-        
-        return TokenResponse(
-            access_token=new_access_token,
-            refresh_token=refresh_token,
-            token_type="bearer"
-        )
+        metrics.increment("refresh_token_rotations")
+        return TokenResponse(**_issue_tokens(user_id, email, family))
         
+    except HTTPException:
+        raise
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -235,12 +239,14 @@ async def refresh_token(refresh_token: str, db: Session = Depends(get_db)):
 
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Logout user by invalidating tokens"""
+async def logout(token: str = Depends(oauth2_scheme), current_user: User = Depends(get_current_user),
+                 db: Session = Depends(get_db)):
+    """Logout user by revoking the session's access and refresh tokens"""
     try:
-        # Remove user's tokens from database
-        db.query(Token).filter(Token.user_id == current_user.id).delete()
-        db.commit()
+        family = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("fam")
+        if family:
+            revocation_store.revoke_family(
+                db, family, current_user.id, datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
         
         logger.info(f"User logged out: {current_user.email}")
         
@@ -254,4 +260,4 @@ async def logout(current_user: User = Depends(get_current_user), db: Session = D
         )
 
    # Make sure to export the function
-__all__ = ["router", "get_current_user"]
+__all__ = ["router", "get_current_user", "get_current_user_with_state", "require_admin"]
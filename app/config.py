@@ -1,4 +1,7 @@
 import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
 from dotenv import load_dotenv
 
 
@@ -10,3 +13,161 @@ if not SECRET_KEY:
 SECRET_KEY = SECRET_KEY.encode()  # Ensure it's in bytes format
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+# Admission control (per worker)
+MAX_CONCURRENT_CALLS = int(os.getenv('MAX_CONCURRENT_CALLS', 25))
+MAX_PENDING_DISPATCHES = int(os.getenv('MAX_PENDING_DISPATCHES', 10))
+MAX_LOOP_LAG_MS = float(os.getenv('MAX_LOOP_LAG_MS', 250))
+
+# OpenAI Realtime rate-limit gating
+OPENAI_MIN_REQUESTS_HEADROOM = int(os.getenv('OPENAI_MIN_REQUESTS_HEADROOM', 1))
+OPENAI_MIN_TOKENS_HEADROOM = int(os.getenv('OPENAI_MIN_TOKENS_HEADROOM', 5000))
+OPENAI_SESSION_MAX_WAIT_SECONDS = float(os.getenv('OPENAI_SESSION_MAX_WAIT_SECONDS', 3))
+
+# Scenario registry
+SCENARIOS_FILE = os.getenv(
+    'SCENARIOS_FILE', os.path.join(os.path.dirname(__file__), 'scenarios.json'))
+SCENARIOS_RELOAD_INTERVAL = float(os.getenv('SCENARIOS_RELOAD_INTERVAL', 5))
+
+# Shared secret for operational endpoints (disabled when unset)
+ADMIN_API_KEY = os.getenv('ADMIN_API_KEY')
+
+# Personalized scenarios
+INSTRUCTION_CACHE_SIZE = int(os.getenv('INSTRUCTION_CACHE_SIZE', 1024))
+CALL_CONTEXT_MAX_AGE_SECONDS = int(os.getenv('CALL_CONTEXT_MAX_AGE_SECONDS', 6 * 60 * 60))
+
+# Opening-greeting audio cache
+GREETING_CACHE_DIR = os.getenv('GREETING_CACHE_DIR', 'greetings')
+
+# Outbound audio pacing toward Twilio
+PLAYOUT_LEAD_MS = float(os.getenv('PLAYOUT_LEAD_MS', 100))
+PLAYOUT_MAX_BUFFER_MS = float(os.getenv('PLAYOUT_MAX_BUFFER_MS', 60000))
+PLAYOUT_MARK_INTERVAL_FRAMES = int(os.getenv('PLAYOUT_MARK_INTERVAL_FRAMES', 10))
+
+# OpenAI Realtime connection and mid-call reconnection
+OPENAI_REALTIME_URL = os.getenv(
+    'OPENAI_REALTIME_URL', 'wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-12-17')
+OPENAI_RECONNECT_MAX_ATTEMPTS = int(os.getenv('OPENAI_RECONNECT_MAX_ATTEMPTS', 5))
+OPENAI_RECONNECT_BACKOFF_MS = float(os.getenv('OPENAI_RECONNECT_BACKOFF_MS', 250))
+OPENAI_RECONNECT_BACKOFF_MAX_MS = float(os.getenv('OPENAI_RECONNECT_BACKOFF_MAX_MS', 4000))
+OPENAI_RECONNECT_AUDIO_BUFFER_MS = float(os.getenv('OPENAI_RECONNECT_AUDIO_BUFFER_MS', 10000))
+OPENAI_REPLAY_MAX_TURNS = int(os.getenv('OPENAI_REPLAY_MAX_TURNS', 20))
+
+# Call transcripts
+TRANSCRIPT_FLUSH_SEGMENTS = int(os.getenv('TRANSCRIPT_FLUSH_SEGMENTS', 16))
+TRANSCRIPT_WRITER_BATCH = int(os.getenv('TRANSCRIPT_WRITER_BATCH', 500))
+TRANSCRIPT_WRITER_INTERVAL = float(os.getenv('TRANSCRIPT_WRITER_INTERVAL', 1.0))
+
+# Local call recording (stereo export: caller left, assistant right)
+CALL_RECORDING_ENABLED = os.getenv('CALL_RECORDING_ENABLED', 'False').lower() == 'true'
+RECORDINGS_DIR = os.getenv('RECORDINGS_DIR', 'recordings')
+RECORDING_RETENTION_DAYS = float(os.getenv('RECORDING_RETENTION_DAYS', 30))
+RECORDING_WRITER_INTERVAL = float(os.getenv('RECORDING_WRITER_INTERVAL', 0.5))
+
+# Post-call audio analytics (runs on local recordings)
+ANALYTICS_WORKERS = int(os.getenv('ANALYTICS_WORKERS', max(1, (os.cpu_count() or 2) - 1)))
+ANALYTICS_SPEECH_THRESHOLD_DBFS = float(os.getenv('ANALYTICS_SPEECH_THRESHOLD_DBFS', -45))
+
+# OpenAI Realtime pricing, USD per 1M tokens (gpt-4o-realtime-preview-2024-12-17)
+OPENAI_PRICE_TEXT_INPUT = float(os.getenv('OPENAI_PRICE_TEXT_INPUT', 5.00))
+OPENAI_PRICE_TEXT_CACHED_INPUT = float(os.getenv('OPENAI_PRICE_TEXT_CACHED_INPUT', 2.50))
+OPENAI_PRICE_TEXT_OUTPUT = float(os.getenv('OPENAI_PRICE_TEXT_OUTPUT', 20.00))
+OPENAI_PRICE_AUDIO_INPUT = float(os.getenv('OPENAI_PRICE_AUDIO_INPUT', 40.00))
+OPENAI_PRICE_AUDIO_CACHED_INPUT = float(os.getenv('OPENAI_PRICE_AUDIO_CACHED_INPUT', 2.50))
+OPENAI_PRICE_AUDIO_OUTPUT = float(os.getenv('OPENAI_PRICE_AUDIO_OUTPUT', 80.00))
+
+# Twilio status callback ingestion
+CALL_STATUS_FLUSH_INTERVAL = float(os.getenv('CALL_STATUS_FLUSH_INTERVAL', 1.0))
+
+# Idempotency-Key support for call-placing endpoints
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', 24 * 60 * 60))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 10000))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', 30))
+
+# API rate limiting: "<requests>/<seconds>" token buckets per route class
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')  # memory | sqlite (shared by local workers)
+RATE_LIMIT_SQLITE_PATH = os.getenv('RATE_LIMIT_SQLITE_PATH', 'ratelimit.db')
+RATE_LIMIT_TRUST_FORWARDED = os.getenv('RATE_LIMIT_TRUST_FORWARDED', 'False').lower() == 'true'
+RATE_LIMIT_TRUSTED_HOPS = int(os.getenv('RATE_LIMIT_TRUSTED_HOPS', 1))  # proxies appending to X-Forwarded-For
+RATE_LIMIT_AUTH = os.getenv('RATE_LIMIT_AUTH', '10/60')  # per client IP
+RATE_LIMIT_CALLS = os.getenv('RATE_LIMIT_CALLS', '5/60')  # per user
+RATE_LIMIT_API = os.getenv('RATE_LIMIT_API', '120/60')  # per user
+
+# Per-call session state: how many recent non-audio events each call keeps for debugging
+CALL_SESSION_EVENT_HISTORY = int(os.getenv('CALL_SESSION_EVENT_HISTORY', 32))
+
+# Per-call supervisor: teardown deadline, finished-call summaries kept, leak detection
+CALL_TEARDOWN_TIMEOUT_SECONDS = float(os.getenv('CALL_TEARDOWN_TIMEOUT_SECONDS', 5))
+CALL_SUMMARY_HISTORY = int(os.getenv('CALL_SUMMARY_HISTORY', 100))
+CALL_LEAK_GRACE_SECONDS = float(os.getenv('CALL_LEAK_GRACE_SECONDS', 60))
+CALL_LEAK_CHECK_SECONDS = float(os.getenv('CALL_LEAK_CHECK_SECONDS', 60))
+
+# Shared call state: dispatch and webhook data keyed by CallSid, read when the media stream starts
+CALL_STATE_BACKEND = os.getenv('CALL_STATE_BACKEND', 'memory')  # memory | sqlite (shared by local workers)
+CALL_STATE_SQLITE_PATH = os.getenv('CALL_STATE_SQLITE_PATH', 'callstate.db')
+CALL_STATE_TTL_SECONDS = int(os.getenv('CALL_STATE_TTL_SECONDS', 4 * 60 * 60))  # Twilio's longest call
+CALL_STATE_CACHE_SIZE = int(os.getenv('CALL_STATE_CACHE_SIZE', 10000))
+
+# Live call events (/events): per-stream queue bound, heartbeat interval, open streams per user
+EVENT_HUB_QUEUE_SIZE = int(os.getenv('EVENT_HUB_QUEUE_SIZE', 100))
+EVENT_HUB_HEARTBEAT_SECONDS = float(os.getenv('EVENT_HUB_HEARTBEAT_SECONDS', 15))
+EVENT_HUB_MAX_STREAMS_PER_USER = int(os.getenv('EVENT_HUB_MAX_STREAMS_PER_USER', 5))
+
+# Refresh-token rotation: workers pick up revocations from other workers this often
+REVOCATION_SYNC_SECONDS = float(os.getenv('REVOCATION_SYNC_SECONDS', 5))
+REVOCATION_PURGE_SECONDS = float(os.getenv('REVOCATION_PURGE_SECONDS', 3600))
+
+# Graceful drain on SIGTERM / POST /admin/drain
+DRAIN_TIMEOUT_SECONDS = float(os.getenv('DRAIN_TIMEOUT_SECONDS', 600))
+
+# WebSocket transport profile for audio ("audio" = tuned, "default" = websockets defaults)
+OPENAI_WS_PROFILE = os.getenv('OPENAI_WS_PROFILE', 'audio')
+OPENAI_WS_MAX_SIZE = int(os.getenv('OPENAI_WS_MAX_SIZE', 4 * 1024 * 1024))
+OPENAI_WS_MAX_QUEUE = int(os.getenv('OPENAI_WS_MAX_QUEUE', 64))
+OPENAI_WS_WRITE_LIMIT = int(os.getenv('OPENAI_WS_WRITE_LIMIT', 64 * 1024))
+OPENAI_WS_PING_INTERVAL = float(os.getenv('OPENAI_WS_PING_INTERVAL', 15))
+OPENAI_WS_PING_TIMEOUT = float(os.getenv('OPENAI_WS_PING_TIMEOUT', 10))
+
+# Media gateway (media_gateway.py): Twilio webhook + media streams only
+MEDIA_GATEWAY_PORT = int(os.getenv('MEDIA_GATEWAY_PORT', 5060))
+MEDIA_GATEWAY_WORKERS = int(os.getenv('MEDIA_GATEWAY_WORKERS', 1))
+MEDIA_WS_MAX_SIZE = int(os.getenv('MEDIA_WS_MAX_SIZE', 256 * 1024))
+MEDIA_WS_PING_INTERVAL = float(os.getenv('MEDIA_WS_PING_INTERVAL', 15))
+MEDIA_WS_PING_TIMEOUT = float(os.getenv('MEDIA_WS_PING_TIMEOUT', 10))
+
+# Twilio webhooks: reject requests without a valid X-Twilio-Signature (checked once TWILIO_AUTH_TOKEN is set)
+TWILIO_VALIDATE_SIGNATURES = os.getenv('TWILIO_VALIDATE_SIGNATURES', 'True').lower() == 'true'
+TWIML_CACHE_SIZE = int(os.getenv('TWIML_CACHE_SIZE', 256))  # compiled responses per (host, scenario)
+
+# Create missing tables on startup (development); otherwise run `python3 migrate_database.py`
+DB_AUTO_CREATE = os.getenv('DB_AUTO_CREATE', 'False').lower() == 'true'
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Service credentials and deployment settings, read from the environment once"""
+    development_mode: bool
+    openai_api_key: Optional[str]
+    twilio_account_sid: Optional[str]
+    twilio_auth_token: Optional[str]
+    twilio_phone_number: Optional[str]
+    public_url: str  # host name only, without the scheme
+    port: int
+
+    @property
+    def twilio_configured(self) -> bool:
+        return bool(self.twilio_account_sid and self.twilio_auth_token and self.twilio_phone_number)
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    return Settings(
+        development_mode=os.getenv('DEVELOPMENT_MODE', 'False').lower() == 'true',
+        openai_api_key=os.getenv('OPENAI_API_KEY'),
+        twilio_account_sid=os.getenv('TWILIO_ACCOUNT_SID'),
+        twilio_auth_token=os.getenv('TWILIO_AUTH_TOKEN'),
+        twilio_phone_number=os.getenv('TWILIO_PHONE_NUMBER'),
+        public_url=os.getenv('PUBLIC_URL', '').strip().replace('https://', '').replace('http://', ''),
+        port=int(os.getenv('PORT', 5050))
+    )
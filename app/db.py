@@ -19,3 +19,16 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def init_db():
+    """Create any missing tables; schema setup is a deploy step, not an import side effect"""
+    import app.models  # noqa: F401  (registers the models on Base.metadata)
+    Base.metadata.create_all(bind=engine)
+
+
+if __name__ == "__main__":
+    # Run through the package module so the models register on the same Base
+    from app import db
+    db.init_db()
+    print(f"Database schema is up to date: {db.SQLALCHEMY_DATABASE_URL}")
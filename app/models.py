@@ -1,10 +1,13 @@
 # models.py
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, Float, Text, ForeignKey, DateTime, UniqueConstraint, Index, DDL, event, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from app.db import Base
 import datetime
 import enum
 
+# User-owned scenarios are addressed as "custom-<id>" alongside the global scenario names
+CUSTOM_SCENARIO_PREFIX = "custom-"
+
 
 class AppType(str, enum.Enum):
     MOBILE = "mobile"
@@ -23,8 +26,8 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     call_schedules = relationship("CallSchedule", back_populates="user")
-    tokens = relationship("Token", back_populates="user")
     usage_limits = relationship("UsageLimits", back_populates="user", uselist=False)
+    scenarios = relationship("UserScenario", back_populates="user")
 
 
 class UsageLimits(Base):
@@ -66,11 +69,13 @@ class UsageLimits(Base):
 
 class CallSchedule(Base):
     __tablename__ = "call_schedules"
+    # The scheduler polls for due calls; users list their own calls by time
+    __table_args__ = (Index("ix_call_schedules_user_scheduled", "user_id", "scheduled_time"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     phone_number = Column(String, nullable=False)
-    scheduled_time = Column(DateTime, nullable=False)
+    scheduled_time = Column(DateTime, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     scenario = Column(String, nullable=False)
 
@@ -78,18 +83,160 @@ class CallSchedule(Base):
     user = relationship("User", back_populates="call_schedules")
 
 
-class Token(Base):
-    __tablename__ = "tokens"
+class RevokedToken(Base):
+    """A used refresh token (kind "refresh") or a whole login session (kind "family").
+
+    Access tokens are never stored; rows only need to outlive the tokens they
+    revoke, so they are purged after expires_at.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True)
+    jti = Column(String(32), unique=True, nullable=False)  # token or family id, uuid4 hex
+    kind = Column(String(8), nullable=False)
+    user_id = Column(Integer, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class UserScenario(Base):
+    __tablename__ = "user_scenarios"
+    __table_args__ = (UniqueConstraint("user_id", "name", name="uq_user_scenarios_user_name"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    access_token = Column(String, unique=True, nullable=False)
-    token_type = Column(String, default="bearer")
-    refresh_token = Column(String, unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    name = Column(String, nullable=False)
+    persona = Column(Text, nullable=False)  # may reference user fields, e.g. $name
+    prompt = Column(Text, nullable=False)
+    voice = Column(String, nullable=True)
+    temperature = Column(Float, nullable=True)
+    version = Column(Integer, nullable=False, default=1)  # bumped on every edit
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
     # Relationships
-    user = relationship("User", back_populates="tokens")
+    user = relationship("User", back_populates="scenarios")
+
+    @property
+    def scenario_id(self) -> str:
+        return f"{CUSTOM_SCENARIO_PREFIX}{self.id}"
+
+
+class CallRecord(Base):
+    """One outbound call, created at dispatch and advanced by Twilio status callbacks"""
+    __tablename__ = "call_records"
+    __table_args__ = (
+        Index("ix_call_records_user_created", "user_id", "created_at"),
+        Index("ix_call_records_user_status_created", "user_id", "status", "created_at"),
+        Index("ix_call_records_status_updated", "status", "updated_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    call_sid = Column(String, unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    scenario = Column(String, nullable=True)
+    to_number = Column(String, nullable=True)
+    from_number = Column(String, nullable=True)
+    source = Column(String, nullable=True)  # "web", "mobile" or "scheduled"
+    status = Column(String, nullable=False, default="queued")
+    status_rank = Column(Integer, nullable=False, default=0)  # callbacks never move a call backwards
+    initiated_at = Column(DateTime, nullable=True)
+    ringing_at = Column(DateTime, nullable=True)
+    answered_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    duration_seconds = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+
+class IdempotencyKey(Base):
+    """Stored response for a client-supplied Idempotency-Key; status_code is NULL while in flight"""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key = Column(String, nullable=False)
+    fingerprint = Column(String, nullable=False)  # sha256 of method, path, query and body
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class Transcript(Base):
+    """One finished utterance (caller or assistant) from a call"""
+    __tablename__ = "transcripts"
+    __table_args__ = (Index("ix_transcripts_call_sid_seq", "call_sid", "seq"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    call_sid = Column(String, nullable=False)
+    seq = Column(Integer, nullable=False)  # order within the call
+    role = Column(String, nullable=False)  # "user" or "assistant"
+    text = Column(Text, nullable=False)
+    item_id = Column(String, nullable=True)
+    scenario = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class CallStats(Base):
+    """Post-call audio analytics computed from the local recording"""
+    __tablename__ = "call_stats"
+
+    id = Column(Integer, primary_key=True)
+    call_sid = Column(String, unique=True, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    duration_s = Column(Float, nullable=False, default=0)
+    caller_talk_s = Column(Float, nullable=False, default=0)
+    assistant_talk_s = Column(Float, nullable=False, default=0)
+    talk_ratio = Column(Float, nullable=True)  # caller share of total talk time
+    longest_silence_s = Column(Float, nullable=False, default=0)
+    overlap_count = Column(Integer, nullable=False, default=0)
+    barge_in_count = Column(Integer, nullable=False, default=0)
+    turn_count = Column(Integer, nullable=False, default=0)
+    latency_mean_ms = Column(Float, nullable=True)
+    latency_p50_ms = Column(Float, nullable=True)
+    latency_p90_ms = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
 
-__all__ = ["User", "Token", "CallSchedule", "UsageLimits", "AppType", "Base"]
+class CallCost(Base):
+    """OpenAI token usage and cost for one call, summed from response.done events"""
+    __tablename__ = "call_costs"
+
+    id = Column(Integer, primary_key=True)
+    call_sid = Column(String, unique=True, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    scenario = Column(String, nullable=True)
+    started_at = Column(DateTime, nullable=False)
+    ended_at = Column(DateTime, nullable=False, index=True)
+    duration_seconds = Column(Float, nullable=False, default=0)
+    responses = Column(Integer, nullable=False, default=0)
+    text_input_tokens = Column(Integer, nullable=False, default=0)
+    text_cached_input_tokens = Column(Integer, nullable=False, default=0)
+    audio_input_tokens = Column(Integer, nullable=False, default=0)
+    audio_cached_input_tokens = Column(Integer, nullable=False, default=0)
+    text_output_tokens = Column(Integer, nullable=False, default=0)
+    audio_output_tokens = Column(Integer, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0)
+
+
+# SQLite FTS5 index over transcript text, kept in sync by triggers. External content
+# means the text is stored once, in transcripts; the index only holds the terms.
+for _statement in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5("
+    "text, content='transcripts', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS transcripts_ai AFTER INSERT ON transcripts BEGIN "
+    "INSERT INTO transcripts_fts(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS transcripts_ad AFTER DELETE ON transcripts BEGIN "
+    "INSERT INTO transcripts_fts(transcripts_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS transcripts_au AFTER UPDATE OF text ON transcripts BEGIN "
+    "INSERT INTO transcripts_fts(transcripts_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO transcripts_fts(rowid, text) VALUES (new.id, new.text); END",
+):
+    event.listen(Transcript.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+
+
+__all__ = ["User", "RevokedToken", "CallSchedule", "UsageLimits", "UserScenario", "CallRecord", "IdempotencyKey", "Transcript", "CallStats", "CallCost", "AppType", "Base"]
@@ -0,0 +1,50 @@
+# app/routes/admin.py
+import os
+import signal
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.auth import require_admin
+from app.services.call_supervisor import call_registry
+from app.services.drain import drain_controller
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+def _exit_worker():
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+@router.post("/drain")
+async def start_drain(timeout_seconds: Optional[float] = None, exit: bool = False):
+    """Stop taking new calls and let live ones finish; with exit=true the worker stops once drained"""
+    if timeout_seconds is not None and timeout_seconds < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="timeout_seconds must be >= 0")
+    return drain_controller.begin("admin", timeout_seconds, _exit_worker if exit else None)
+
+
+@router.get("/drain")
+async def drain_progress():
+    """Drain state, remaining calls and writer flush results for this worker"""
+    return drain_controller.progress()
+
+
+@router.delete("/drain")
+async def cancel_drain():
+    """Resume serving if the drain has not finished and no exit is pending"""
+    if not drain_controller.cancel():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Worker is not in a cancellable drain")
+    return drain_controller.progress()
+
+
+@router.get("/calls")
+async def call_lifecycle():
+    """Live calls, recently finished call summaries and calls whose resources outlived them"""
+    return {
+        "live": call_registry.live(),
+        "recent": list(call_registry.recent),
+        "leaks": call_registry.find_leaks()
+    }
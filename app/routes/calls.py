@@ -0,0 +1,87 @@
+# app/routes/calls.py
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.db import get_db
+from app.auth import get_current_user, require_admin
+from app.models import User, CallRecord, CallStats
+from app.schemas import CallRecordRead, CallStatsRead
+from app.services.call_recorder import read_recording_meta, stream_stereo_wav
+from app.services.call_records import STATUS_RANKS
+from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/calls", tags=["calls"])
+
+
+def _check_status(call_status: Optional[str]):
+    if call_status is not None and call_status not in STATUS_RANKS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown call status")
+
+
+@router.get("", response_model=List[CallRecordRead])
+def list_calls(
+    call_status: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Call history for the current user, newest first, optionally by status"""
+    _check_status(call_status)
+    query = db.query(CallRecord).filter(CallRecord.user_id == current_user.id)
+    if call_status:
+        query = query.filter(CallRecord.status == call_status)
+    return query.order_by(CallRecord.created_at.desc()).offset(offset).limit(limit).all()
+
+
+@router.get("/by-status/{call_status}", response_model=List[CallRecordRead], dependencies=[Depends(require_admin)])
+def list_calls_by_status(
+    call_status: str,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Most recently updated calls in a given status, across all users"""
+    _check_status(call_status)
+    return db.query(CallRecord).filter(
+        CallRecord.status == call_status
+    ).order_by(CallRecord.updated_at.desc()).offset(offset).limit(limit).all()
+
+
+@router.get("/{call_sid}/recording.wav")
+def export_recording(call_sid: str, current_user: User = Depends(get_current_user)):
+    """Stream a locally recorded call as stereo WAV (caller left, assistant right)"""
+    meta = read_recording_meta(call_sid)
+    if meta is None or meta.get("user_id") != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recording not found")
+    try:
+        content_length, chunks = stream_stereo_wav(call_sid)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recording not found")
+    return StreamingResponse(
+        chunks,
+        media_type="audio/wav",
+        headers={
+            "Content-Length": str(content_length),
+            "Content-Disposition": f'attachment; filename="{call_sid}.wav"'
+        }
+    )
+
+
+@router.get("/{call_sid}/stats", response_model=CallStatsRead)
+def get_call_stats(
+    call_sid: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Talk time, silence, overlap and turn latency for one of the user's calls"""
+    stats = db.query(CallStats).filter(
+        CallStats.call_sid == call_sid,
+        CallStats.user_id == current_user.id
+    ).first()
+    if stats is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Call stats not found")
+    return stats
@@ -0,0 +1,81 @@
+# app/routes/events.py
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, WebSocket, status
+from fastapi.responses import StreamingResponse
+from fastapi.websockets import WebSocketDisconnect
+from app.auth import user_id_for_token
+from app.services.event_hub import Subscriber, event_hub
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Live call status and transcript snippets for the signed-in user; served by main.py
+# and media_gateway.py, since events only reach streams on the worker running the call
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+def _stream_user_id(authorization: Optional[str], token: Optional[str]) -> int:
+    """Bearer header, or ?token= for clients (browsers) that cannot set headers on a stream"""
+    if authorization and authorization[:7].lower() == "bearer ":
+        token = authorization[7:]
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return user_id_for_token(token)
+
+
+async def _sse_stream(subscriber: Subscriber):
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            event = await subscriber.next()
+            if event is None:
+                break
+            yield event.sse
+    finally:
+        event_hub.unsubscribe(subscriber)
+
+
+@router.get("")
+async def event_stream(
+    authorization: Optional[str] = Header(None),
+    token: Optional[str] = Query(None)
+):
+    """Server-sent events: call.started, call.transcript, call.status and call.ended"""
+    subscriber = event_hub.subscribe(_stream_user_id(authorization, token))
+    return StreamingResponse(
+        _sse_stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def event_socket(websocket: WebSocket, token: Optional[str] = None):
+    """The same events as GET /events, one JSON text frame each"""
+    try:
+        user_id = _stream_user_id(websocket.headers.get("authorization"), token)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    subscriber = event_hub.subscribe(user_id)
+    try:
+        # Nothing is read from the client; a dropped connection surfaces on the
+        # next send, at the latest with the next heartbeat
+        while True:
+            event = await subscriber.next()
+            if event is None:
+                await websocket.close(code=1013, reason=subscriber.close_reason or "")
+                break
+            await websocket.send_text(event.text)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.debug(f"Event socket for user {user_id} closed: {e!r}")
+    finally:
+        event_hub.unsubscribe(subscriber)
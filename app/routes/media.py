@@ -0,0 +1,379 @@
+# app/routes/media.py
+import asyncio
+import base64
+import json
+from functools import lru_cache
+from typing import Optional, Set, Tuple
+from xml.sax.saxutils import escape
+
+from fastapi import APIRouter, Depends, WebSocket, Request, HTTPException
+from fastapi.responses import Response
+from fastapi.websockets import WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from app.config import OPENAI_SESSION_MAX_WAIT_SECONDS, CALL_RECORDING_ENABLED, TWIML_CACHE_SIZE, get_settings
+from app.services.capacity import capacity
+from app.services.openai_rate_limits import rate_limits
+from app.services.metrics import metrics
+from app.services.scenario_registry import scenario_registry
+from app.services.personalization import (
+    is_known_scenario_id,
+    verify_call_context,
+    get_cached_for_context,
+    load_for_context
+)
+from app.services.greeting_cache import greeting_cache, GreetingCache
+from app.services.audio_pacer import PlayoutScheduler
+from app.services.realtime_session import RealtimeSession, RealtimeSessionClosed
+from app.services.transcripts import CallTranscript
+from app.services.call_recorder import CallRecorder
+from app.services.call_costs import CallUsage
+from app.services.call_session import CallSession
+from app.services.call_supervisor import CallSupervisor
+from app.services.event_hub import event_hub
+from app.services.call_state import CallState, call_states
+from app.services.twilio_webhook import WebhookForm, verify_twilio_request
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Twilio webhook and media stream; served by main.py and by media_gateway.py
+router = APIRouter(tags=["media"])
+
+# Post-call work that outlives the stream handler; the loop only holds tasks weakly
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _background_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background task {task.get_name()} failed: {task.exception()!r}")
+
+
+def _run_in_background(coro, name: str) -> asyncio.Task:
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_done)
+    return task
+
+LOG_EVENT_TYPES = [
+    'response.content.done', 'rate_limits.updated', 'response.done',
+    'input_audio_buffer.committed', 'input_audio_buffer.speech_stopped',
+    'input_audio_buffer.speech_started', 'session.created'
+]
+
+
+async def state_from_context(call_sid: str, token: Optional[str], source: str) -> Optional[CallState]:
+    """Build a call's state from its signed call context; the DB is only hit on a cache miss"""
+    call_ctx = verify_call_context(token)
+    if call_ctx is None:
+        return None
+    compiled = get_cached_for_context(call_ctx)
+    if compiled is None:
+        compiled = await run_in_threadpool(load_for_context, call_ctx)
+    if compiled is None:
+        return None
+    return CallState.for_scenario(call_sid, call_ctx.user_id, compiled, source)
+
+
+# The webhook's TwiML depends only on the host, the scenario and the per-call context
+# token, so it is rendered once per (host, scenario) and the token spliced in as bytes
+_CTX_SLOT = "__CALL_CONTEXT__"
+
+
+@lru_cache(maxsize=1)
+def busy_twiml() -> bytes:
+    from twilio.twiml.voice_response import VoiceResponse
+    response = VoiceResponse()
+    response.say("Sorry, all of our lines are busy right now. Please try again in a few minutes.")
+    response.hangup()
+    return str(response).encode()
+
+
+@lru_cache(maxsize=TWIML_CACHE_SIZE)
+def stream_twiml(host: str, scenario: str) -> Tuple[bytes, bytes, bytes]:
+    """(TwiML without a call context, and the halves around the ctx parameter's value)"""
+    # Imported on first render so importing main does not load the twilio package
+    from twilio.twiml.voice_response import VoiceResponse, Connect
+
+    def render(call_ctx: Optional[str]) -> str:
+        response = VoiceResponse()
+        connect = Connect()
+        stream = connect.stream(url=f"wss://{host}/media-stream/{scenario}")
+        if call_ctx:
+            stream.parameter(name="ctx", value=call_ctx)
+        response.append(connect)
+        return str(response)
+
+    head, tail = render(_CTX_SLOT).encode().split(_CTX_SLOT.encode())
+    return render(None).encode(), head, tail
+
+
+# Webhook Endpoint for Incoming Calls
+@router.api_route("/incoming-call/{scenario}", methods=["GET", "POST"])
+async def handle_incoming_call(request: Request, scenario: str,
+                               form: WebhookForm = Depends(verify_twilio_request)):
+    try:
+        # Validate scenario
+        if not is_known_scenario_id(scenario):
+            logger.error(f"Invalid scenario: {scenario}")
+            raise HTTPException(status_code=400, detail="Invalid scenario")
+
+        # Fail fast when this worker cannot take another media stream
+        openai_retry_after = rate_limits.retry_after()
+        if not capacity.has_capacity() or openai_retry_after > OPENAI_SESSION_MAX_WAIT_SECONDS:
+            logger.warning(f"Rejecting incoming call, capacity: {capacity.readiness()}, "
+                           f"OpenAI retry_after: {openai_retry_after:.1f}s")
+            return Response(content=busy_twiml(), media_type="application/xml")
+
+        # Stream back to the host Twilio reached, forwarding the signed call context
+        # as a custom parameter
+        plain, head, tail = stream_twiml(request.headers.get('Host', 'voice.hyperlabsai.com'), scenario)
+        call_ctx = request.query_params.get("ctx")
+        if not call_ctx:
+            return Response(content=plain, media_type="application/xml")
+
+        # Dispatch normally stored the call's state already; if that was on a worker
+        # that does not share our store, resolve it now rather than at media start
+        call_sid = form.get("CallSid")
+        if call_sid and call_states.get(call_sid) is None:
+            state = await state_from_context(call_sid, call_ctx, "webhook")
+            if state is not None:
+                call_states.put(state)
+        return Response(content=head + escape(call_ctx, {'"': "&quot;"}).encode() + tail,
+                        media_type="application/xml")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in handle_incoming_call: {e}", exc_info=True)
+        raise
+
+def publish_transcript(session: CallSession, role: str, text: str):
+    """Push a finished transcript line to the user's live event streams, if any"""
+    if text:
+        event_hub.publish(session.user_id, "call.transcript",
+                          {"call_sid": session.call_sid, "role": role, "text": text.strip()})
+
+
+async def receive_from_twilio(session: CallSession):
+    """Handle incoming audio from Twilio."""
+    websocket = session.websocket
+    openai_session = session.openai_session
+    recorder = session.recorder
+    try:
+        while True:
+            msg = await websocket.receive_json()
+            event = msg["event"]
+
+            if event == "media":
+                media = msg["media"]
+                if "payload" not in media:
+                    logger.error("Missing payload in Twilio media message")
+                    continue
+
+                session.on_media()
+                # Buffered by the session while it reconnects to OpenAI
+                await openai_session.send_audio(media["payload"])
+                if recorder is not None:
+                    recorder.inbound(media["payload"], media.get("timestamp", 0))
+                continue
+
+            session.twilio_event(event)
+            if event == "mark":
+                session.marks += 1
+                session.pacer.on_mark(msg["mark"]["name"])
+
+            elif event == "stop":
+                logger.info("Stop event received from Twilio")
+                await openai_session.send(json.dumps({
+                    "type": "input_audio_buffer.commit"
+                }))
+                logger.info("Sent audio buffer commit to OpenAI")
+                break
+    except WebSocketDisconnect:
+        logger.info("Twilio WebSocket disconnected")
+    except Exception as e:
+        logger.error(f"Error in receive_from_twilio: {e}")
+        raise
+
+async def send_to_twilio(session: CallSession):
+    """Handle outgoing audio to Twilio."""
+    openai_session = session.openai_session
+    pacer = session.pacer
+    transcript = session.transcript
+    try:
+        while True:
+            message = await openai_session.recv()
+            msg = json.loads(message)
+            msg_type = msg["type"]
+
+            if msg_type == "response.audio.delta":
+                # Queue for paced playout instead of bursting it at Twilio
+                session.on_audio_delta()
+                pacer.feed(base64.b64decode(msg["delta"]), msg.get("item_id"))
+                continue
+
+            session.openai_event(msg_type)
+            logger.info(f"Received message from OpenAI: {msg_type}")
+
+            if msg_type == "response.audio.done":
+                pacer.end_response()
+
+            elif msg_type == "input_audio_buffer.speech_started":
+                # Caller barged in: stop playback and tell the model what was actually heard
+                session.barge_ins += 1
+                truncate = await pacer.interrupt()
+                if truncate:
+                    item_id, audio_end_ms = truncate
+                    await openai_session.send(json.dumps({
+                        "type": "conversation.item.truncate",
+                        "item_id": item_id,
+                        "content_index": 0,
+                        "audio_end_ms": audio_end_ms
+                    }))
+
+            elif msg_type == "response.audio_transcript.done":
+                openai_session.record_turn("assistant", msg.get("transcript", ""))
+                transcript.add("assistant", msg.get("transcript", ""), msg.get("item_id"))
+                publish_transcript(session, "assistant", msg.get("transcript", ""))
+
+            elif msg_type == "conversation.item.input_audio_transcription.completed":
+                openai_session.record_turn("user", msg.get("transcript", ""))
+                transcript.add("user", msg.get("transcript", ""), msg.get("item_id"))
+                publish_transcript(session, "user", msg.get("transcript", ""))
+
+            elif msg_type == "error":
+                session.openai_errors += 1
+                logger.error(f"Error from OpenAI: {msg}")
+                break
+
+            elif msg_type == "response.done":
+                session.usage.add_response(msg.get("response") or {})
+                logger.info(f"OpenAI event: {msg}")
+
+            elif msg_type == "rate_limits.updated":
+                rate_limits.update(msg.get("rate_limits", []))
+                logger.info(f"OpenAI event: {msg}")
+
+            elif msg_type in LOG_EVENT_TYPES:
+                logger.info(f"OpenAI event: {msg}")
+
+    except RealtimeSessionClosed as e:
+        logger.error(f"OpenAI session lost: {e}")
+    except WebSocketDisconnect:
+        logger.info("OpenAI WebSocket disconnected")
+    except Exception as e:
+        logger.error(f"Error in send_to_twilio: {e}")
+        raise
+
+async def wait_for_stream_start(websocket: WebSocket) -> Optional[dict]:
+    """Read Twilio messages until the "start" event, which carries the stream identifiers"""
+    while True:
+        msg = await websocket.receive_json()
+        if msg.get("event") == "start":
+            return msg
+        if msg.get("event") == "stop":
+            return None
+
+@router.websocket("/media-stream/{scenario}")
+async def handle_media_stream(websocket: WebSocket, scenario: str):
+    # Admission control: reject the stream outright when the worker is full
+    if not capacity.try_acquire_call():
+        logger.warning(f"Rejecting media stream, worker at capacity: {capacity.readiness()}")
+        await websocket.close(code=1013)  # Try Again Later
+        return
+
+    session = CallSession(websocket, scenario)
+    try:
+        try:
+            async with CallSupervisor(session) as supervisor:
+                await websocket.accept()
+                logger.info("WebSocket connection accepted")
+
+                start_msg = await wait_for_stream_start(websocket)
+                if start_msg is None:
+                    return
+                session.start(start_msg["start"])
+                custom_parameters = start_msg["start"].get("customParameters") or {}
+                logger.info(f"Media stream started: {session.stream_sid} for call {session.call_sid}")
+
+                # The call's user and compiled scenario were stored under its CallSid at dispatch
+                # or webhook time, possibly by another worker; the signed call context and then
+                # the scenario in the URL are the fallbacks
+                state = call_states.get(session.call_sid)
+                if state is None:
+                    state = await state_from_context(session.call_sid, custom_parameters.get("ctx"), "stream")
+                if state is None:
+                    compiled = scenario_registry.get(scenario)
+                    state = compiled and CallState.for_scenario(session.call_sid, None, compiled, "stream")
+                if not state:
+                    await websocket.close(code=4000)
+                    return
+                session.user_id = state.user_id
+                session.scenario = state.scenario
+                event_hub.publish(session.user_id, "call.started",
+                                  {"call_sid": session.call_sid, "scenario": session.scenario})
+
+                # Transcript segments are buffered per call and persisted in batches off the loop
+                session.transcript = CallTranscript(session.call_sid, session.user_id, session.scenario)
+                session.usage = CallUsage(session.call_sid, session.user_id, session.scenario)
+
+                if CALL_RECORDING_ENABLED:
+                    session.recorder = CallRecorder(session.call_sid, session.user_id, session.scenario)
+
+                # All audio toward Twilio goes through the per-call playout scheduler
+                pacer = session.pacer = PlayoutScheduler(
+                    websocket.send_text,
+                    session.stream_sid,
+                    on_frame=session.recorder.outbound if session.recorder else None
+                )
+                supervisor.start_soon("pacer", pacer.run)
+
+                # Callers hear the cached greeting right away instead of dead air
+                greeting = greeting_cache.get(state.scenario) if state.greeting else None
+                if greeting:
+                    pacer.feed(greeting.audio[:])
+                    pacer.end_response()
+                    metrics.increment("greetings_played")
+
+                # Hold the session briefly, or refuse it, if OpenAI is about to rate limit us
+                if not await rate_limits.wait_for_headroom():
+                    await websocket.close(code=1013)
+                    return
+
+                # Connect to OpenAI's Realtime API; the session reconnects on its own if the
+                # upstream socket drops mid-call. Audio from an interrupted response is lost,
+                # so close it out in the pacer instead of counting underruns.
+                openai_session = session.openai_session = RealtimeSession(
+                    state.session_update,
+                    get_settings().openai_api_key,
+                    on_reconnected=pacer.end_response
+                )
+                await openai_session.connect()
+                session.usage.connected = True
+
+                # Let the model know the greeting has already been spoken
+                if greeting:
+                    openai_session.record_turn("assistant", greeting.text)
+                    session.transcript.add("assistant", greeting.text)
+                    publish_transcript(session, "assistant", greeting.text)
+                    await openai_session.send(GreetingCache.conversation_item(greeting))
+
+                # Bridge audio both ways until either side ends; the supervisor closes
+                # both sockets and hands off the call's records on the way out
+                await supervisor.bridge(receive_from_twilio, send_to_twilio)
+                if openai_session.reconnects:
+                    logger.info(f"OpenAI session reconnected {openai_session.reconnects} time(s) during the call")
+        except* WebSocketDisconnect:
+            # Twilio hung up; any other exceptions in a group go on to the handler below
+            logger.info("WebSocket disconnected")
+    except Exception as e:
+        logger.error(f"WebSocket handler error: {str(e)}")
+        raise
+    finally:
+        if session.recorder:
+            # Imported on first use: analytics pulls in NumPy
+            from app.services.call_analytics import analyze_call
+            _run_in_background(analyze_call(session.recorder.call_sid, session.user_id),
+                               f"analyze:{session.recorder.call_sid}")
+        capacity.release_call()
@@ -1,19 +1,32 @@
 # app/routes/mobile.py
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from app.db import get_db
-from app.auth import get_current_user
+from app.auth import get_current_user, get_current_user_with_state
 from app.models import User, UsageLimits, AppType
+from app.schemas import UserRead, UserScenarioRead
+from app.utils import make_etag, etag_matches
 from app.services.usage_service import UsageService
+from app.services.capacity import capacity
+from app.services.openai_rate_limits import rate_limits
+from app.services.personalization import resolve_scenario, sign_call_context
+from app.services.scenario_registry import scenario_registry
+from app.services.call_records import STATUS_CALLBACK_EVENTS, record_dispatch, status_callback_url
+from app.services.call_state import CallState, call_states
+from app.services.idempotency import idempotency_store, request_fingerprint
+from app.services.twilio_client import get_twilio_client
+from app.config import get_settings
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import datetime
 import logging
-import os
 
 logger = logging.getLogger(__name__)
 
 # Check if in development mode
-DEVELOPMENT_MODE = os.getenv('DEVELOPMENT_MODE', 'False').lower() == 'true'
+DEVELOPMENT_MODE = get_settings().development_mode
 
 router = APIRouter(prefix="/mobile", tags=["mobile"])
 
@@ -29,10 +42,25 @@ class UsageStatsResponse(BaseModel):
     calls_made_total: int
     is_trial_active: bool
     is_subscribed: bool
-    subscription_status: str = None
+    subscription_status: Optional[str] = None
     app_type: str = "mobile"
 
 
+class CostTotals(BaseModel):
+    calls: int
+    minutes: float
+    text_input_tokens: int
+    audio_input_tokens: int
+    text_output_tokens: int
+    audio_output_tokens: int
+    cost_usd: float
+
+
+class UsageCostsResponse(BaseModel):
+    total: CostTotals
+    this_month: CostTotals
+
+
 class MakeCallRequest(BaseModel):
     phone_number: str
     scenario: str = "default"
@@ -48,14 +76,7 @@ async def check_call_permission(
     try:
         # Skip limits in development mode
         if DEVELOPMENT_MODE:
-            return CallPermissionResponse(
-                can_make_call=True,
-                status="development_mode",
-                details={
-                    "message": "Development mode - unlimited calls",
-                    "calls_remaining": "unlimited"
-                }
-            )
+            return _call_permission_response(None)
         
         # Initialize usage limits if they don't exist
         usage_limits = db.query(UsageLimits).filter(
@@ -67,14 +88,7 @@ async def check_call_permission(
                 current_user.id, app_type, db)
         
         # Check if user can make a call
-        can_call, status_code, details = UsageService.can_make_call(
-            current_user.id, db)
-        
-        return CallPermissionResponse(
-            can_make_call=can_call,
-            status=status_code,
-            details=details
-        )
+        return _call_permission_response(usage_limits)
         
     except Exception as e:
         logger.error(f"Error checking call permission for user {current_user.id}: {e}")
@@ -84,34 +98,75 @@ async def check_call_permission(
         )
 
 
+def _usage_stats_response(usage_limits: Optional[UsageLimits]) -> UsageStatsResponse:
+    # Skip limits in development mode
+    if DEVELOPMENT_MODE:
+        return UsageStatsResponse(
+            trial_calls_remaining=999,
+            calls_made_total=0,
+            is_trial_active=True,
+            is_subscribed=False,
+            subscription_status=None,
+            app_type="mobile"
+        )
+    
+    stats = UsageService.usage_stats_from_limits(usage_limits)
+    
+    return UsageStatsResponse(
+        trial_calls_remaining=stats["trial_calls_remaining"],
+        calls_made_total=stats["calls_made_total"],
+        is_trial_active=stats["is_trial_active"],
+        is_subscribed=stats["is_subscribed"],
+        subscription_status=stats["subscription_status"],
+        app_type=stats["app_type"]
+    )
+
+
+def _call_permission_response(usage_limits: Optional[UsageLimits]) -> CallPermissionResponse:
+    if DEVELOPMENT_MODE:
+        return CallPermissionResponse(
+            can_make_call=True,
+            status="development_mode",
+            details={
+                "message": "Development mode - unlimited calls",
+                "calls_remaining": "unlimited"
+            }
+        )
+    can_call, status_code, details = UsageService.evaluate_call_permission(usage_limits)
+    return CallPermissionResponse(can_make_call=can_call, status=status_code, details=details)
+
+
+def _usage_version(usage_limits: Optional[UsageLimits]):
+    """Changes whenever anything derived from the usage limits row can change"""
+    if usage_limits is None:
+        return (DEVELOPMENT_MODE, None)
+    return (DEVELOPMENT_MODE, usage_limits.id, usage_limits.updated_at)
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_cache_headers(etag))
+
+
+def _cache_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
 @router.get("/usage-stats", response_model=UsageStatsResponse)
 async def get_usage_stats(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get usage statistics for the current user"""
+    """Get usage statistics for the current user; supports conditional GET via ETag"""
     try:
-        # Skip limits in development mode
-        if DEVELOPMENT_MODE:
-            return UsageStatsResponse(
-                trial_calls_remaining=999,
-                calls_made_total=0,
-                is_trial_active=True,
-                is_subscribed=False,
-                subscription_status=None,
-                app_type="mobile"
-            )
-        
-        stats = UsageService.get_usage_stats(current_user.id, db)
-        
-        return UsageStatsResponse(
-            trial_calls_remaining=stats["trial_calls_remaining"],
-            calls_made_total=stats["calls_made_total"],
-            is_trial_active=stats["is_trial_active"],
-            is_subscribed=stats["is_subscribed"],
-            subscription_status=stats["subscription_status"],
-            app_type=stats["app_type"]
-        )
+        usage_limits = db.query(UsageLimits).filter(
+            UsageLimits.user_id == current_user.id).first()
+        etag = make_etag("usage-stats", current_user.id, *_usage_version(usage_limits))
+        if etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+        response.headers.update(_cache_headers(etag))
+        return _usage_stats_response(usage_limits)
         
     except Exception as e:
         logger.error(f"Error getting usage stats for user {current_user.id}: {e}")
@@ -121,14 +176,105 @@ async def get_usage_stats(
         )
 
 
+@router.get("/usage-costs", response_model=UsageCostsResponse)
+async def get_usage_costs(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get talk minutes, OpenAI tokens and cost for the current user; supports conditional GET"""
+    try:
+        # Month-to-date totals roll over with the calendar month, so it is part of the version
+        month = datetime.datetime.utcnow().strftime("%Y-%m")
+        etag = make_etag("usage-costs", current_user.id, month, *UsageService.get_cost_version(current_user.id, db))
+        if etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+        response.headers.update(_cache_headers(etag))
+        return UsageService.get_cost_stats(current_user.id, db)
+    except Exception as e:
+        logger.error(f"Error getting usage costs for user {current_user.id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error retrieving usage costs"
+        )
+
+
+@router.get("/bootstrap")
+async def bootstrap(
+    request: Request,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user_with_state),
+    db: Session = Depends(get_db)
+):
+    """Everything the app needs at launch: user, usage, call permission and scenarios.
+
+    The user, usage limits and custom scenarios come from a single query; the ETag
+    is built from their version markers, so an unchanged state returns 304.
+    """
+    usage_limits = current_user.usage_limits
+    if usage_limits is None and not DEVELOPMENT_MODE:
+        app_type = UsageService.detect_app_type_from_request(request)
+        usage_limits = UsageService.initialize_user_usage(current_user.id, app_type, db)
+
+    registry_state = scenario_registry.state
+    custom_scenarios = sorted(current_user.scenarios, key=lambda s: s.id)
+    etag = make_etag(
+        "bootstrap",
+        current_user.id,
+        current_user.email,
+        current_user.name,
+        current_user.is_active,
+        *_usage_version(usage_limits),
+        registry_state.version,
+        *((s.id, s.version) for s in custom_scenarios)
+    )
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+
+    body = {
+        "user": UserRead.model_validate(current_user, from_attributes=True),
+        "usage": _usage_stats_response(usage_limits),
+        "permission": _call_permission_response(usage_limits),
+        "scenarios": {
+            "version": registry_state.version,
+            "global": [
+                {"id": s.name, "persona": s.persona, "prompt": s.prompt, "voice": s.voice}
+                for s in registry_state.scenarios.values()
+            ],
+            "custom": [UserScenarioRead.model_validate(s, from_attributes=True) for s in custom_scenarios]
+        }
+    }
+    return JSONResponse(content=jsonable_encoder(body), headers=_cache_headers(etag))
+
+
 @router.post("/make-call")
 async def make_call(
     call_request: MakeCallRequest,
     request: Request,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Make a call - mobile version with proper usage tracking"""
+    # Client retries carrying the same Idempotency-Key replay the first response
+    return await idempotency_store.run(
+        current_user.id,
+        idempotency_key,
+        await request_fingerprint(request),
+        lambda: place_call(call_request, request, current_user, db)
+    )
+
+
+async def place_call(call_request: MakeCallRequest, request: Request, current_user: User, db: Session):
+    """Dispatch a mobile call after scenario, usage and capacity checks"""
+    compiled_scenario = resolve_scenario(db, current_user, call_request.scenario)
+    if compiled_scenario is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid scenario"
+        )
+
     try:
         # Skip limits in development mode
         if not DEVELOPMENT_MODE:
@@ -158,31 +304,51 @@ async def make_call(
                     )
         
         # Make the actual call using Twilio
-        from twilio.rest import Client
-        
-        TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
-        TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
-        TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
-        PUBLIC_URL = os.getenv('PUBLIC_URL', '').strip()
-        
-        if not all([TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, PUBLIC_URL]):
+        settings = get_settings()
+        if not settings.twilio_configured or not settings.public_url:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Twilio configuration incomplete"
             )
         
-        twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        # Hold off on dispatch while OpenAI would refuse the session anyway
+        retry_after = rate_limits.retry_after()
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Voice service is busy, please try again shortly",
+                headers={"Retry-After": str(int(retry_after) + 1)}
+            )
+        
+        # Refuse new calls early when this worker has no headroom left
+        if not capacity.try_acquire_dispatch():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is at capacity, please try again shortly",
+                headers={"Retry-After": "5"}
+            )
         
-        # Construct webhook URL
-        webhook_url = f"https://{PUBLIC_URL}/incoming-call/{call_request.scenario}"
+        try:
+            # Construct webhook URL, carrying the signed call context
+            call_ctx = sign_call_context(current_user.id, compiled_scenario)
+            webhook_url = f"https://{settings.public_url}/incoming-call/{call_request.scenario}?ctx={call_ctx}"
+            
+            # Make the call
+            call = get_twilio_client().calls.create(
+                to=f"+1{call_request.phone_number}",
+                from_=settings.twilio_phone_number,
+                url=webhook_url,
+                record=True,
+                status_callback=status_callback_url(settings.public_url),
+                status_callback_event=STATUS_CALLBACK_EVENTS,
+                status_callback_method="POST"
+            )
+        finally:
+            capacity.release_dispatch()
         
-        # Make the call
-        call = twilio_client.calls.create(
-            to=f"+1{call_request.phone_number}",
-            from_=TWILIO_PHONE_NUMBER,
-            url=webhook_url,
-            record=True
-        )
+        call_states.put(CallState.for_scenario(call.sid, current_user.id, compiled_scenario, "mobile"))
+        record_dispatch(db, call.sid, current_user.id, call_request.scenario,
+                        f"+1{call_request.phone_number}", settings.twilio_phone_number, "mobile")
         
         # Record the call if not in development mode
         if not DEVELOPMENT_MODE:
@@ -0,0 +1,132 @@
+# app/routes/scenarios.py
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import Response
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.db import get_db
+from app.auth import get_current_user, require_admin
+from app.models import User, UserScenario
+from app.schemas import UserScenarioCreate, UserScenarioRead
+from app.services.scenario_registry import scenario_registry
+from app.services.personalization import instruction_cache
+from typing import List
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/scenarios", tags=["scenarios"])
+
+
+@router.get("")
+async def list_scenarios(request: Request):
+    """List available scenarios; supports conditional GET via ETag"""
+    state = scenario_registry.state
+    headers = {"ETag": state.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("If-None-Match") == state.etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=state.listing, media_type="application/json", headers=headers)
+
+
+@router.post("/reload", dependencies=[Depends(require_admin)])
+async def reload_scenarios():
+    """Reload the scenario file and atomically swap in the new registry"""
+    previous = scenario_registry.version
+    try:
+        state = scenario_registry.load()
+    except (OSError, ValueError) as e:
+        logger.error(f"Scenario reload failed, keeping version {previous}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Scenario reload failed: {e}"
+        )
+    return {
+        "message": "Scenarios reloaded",
+        "previous_version": previous,
+        "version": state.version,
+        "scenarios": list(state.scenarios.keys())
+    }
+
+
+@router.get("/mine", response_model=List[UserScenarioRead])
+async def list_user_scenarios(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """List the current user's custom scenarios"""
+    return db.query(UserScenario).filter(
+        UserScenario.user_id == current_user.id).order_by(UserScenario.id).all()
+
+
+@router.post("/mine", response_model=UserScenarioRead, status_code=status.HTTP_201_CREATED)
+async def create_user_scenario(
+    scenario: UserScenarioCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Create a custom scenario; persona and prompt may reference $name and $first_name"""
+    user_scenario = UserScenario(user_id=current_user.id, version=1, **scenario.model_dump())
+    db.add(user_scenario)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A scenario with this name already exists"
+        )
+    db.refresh(user_scenario)
+    logger.info(f"User {current_user.id} created scenario {user_scenario.scenario_id}")
+    return user_scenario
+
+
+def _get_owned_scenario(db: Session, user: User, scenario_id: int) -> UserScenario:
+    user_scenario = db.query(UserScenario).filter(
+        UserScenario.id == scenario_id,
+        UserScenario.user_id == user.id
+    ).first()
+    if not user_scenario:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scenario not found"
+        )
+    return user_scenario
+
+
+@router.put("/mine/{scenario_id}", response_model=UserScenarioRead)
+async def update_user_scenario(
+    scenario_id: int,
+    scenario: UserScenarioCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Replace a custom scenario; bumps its version and invalidates cached instructions"""
+    user_scenario = _get_owned_scenario(db, current_user, scenario_id)
+    for field, value in scenario.model_dump().items():
+        setattr(user_scenario, field, value)
+    user_scenario.version = (user_scenario.version or 0) + 1
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A scenario with this name already exists"
+        )
+    db.refresh(user_scenario)
+    instruction_cache.invalidate(current_user.id, user_scenario.scenario_id)
+    return user_scenario
+
+
+@router.delete("/mine/{scenario_id}")
+async def delete_user_scenario(
+    scenario_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Delete a custom scenario"""
+    user_scenario = _get_owned_scenario(db, current_user, scenario_id)
+    key = user_scenario.scenario_id
+    db.delete(user_scenario)
+    db.commit()
+    instruction_cache.invalidate(current_user.id, key)
+    return {"message": "Scenario deleted", "scenario_id": key}
@@ -0,0 +1,53 @@
+# app/routes/transcripts.py
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from app.db import get_db
+from app.auth import get_current_user
+from app.models import User, Transcript
+from app.schemas import TranscriptSegmentRead, TranscriptSearchResponse
+from app.services.transcripts import search_transcripts
+from typing import List
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/transcripts", tags=["transcripts"])
+
+
+@router.get("/search", response_model=TranscriptSearchResponse)
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Full-text search across the current user's call transcripts"""
+    try:
+        # Fetch one extra row to know whether another page exists without a COUNT(*)
+        hits = search_transcripts(db, current_user.id, q, limit + 1, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {
+        "query": q,
+        "results": hits[:limit],
+        "limit": limit,
+        "offset": offset,
+        "has_more": len(hits) > limit
+    }
+
+
+@router.get("/calls/{call_sid}", response_model=List[TranscriptSegmentRead])
+def get_call_transcript(
+    call_sid: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Full transcript of one of the current user's calls, in order"""
+    segments = db.query(Transcript).filter(
+        Transcript.call_sid == call_sid,
+        Transcript.user_id == current_user.id
+    ).order_by(Transcript.seq).all()
+    if not segments:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transcript not found")
+    return segments
@@ -0,0 +1,34 @@
+# app/routes/twilio_webhooks.py
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import Response
+from app.services.call_records import STATUS_RANKS, ingest_status_callback
+from app.services.call_state import call_states
+from app.services.event_hub import event_hub
+from app.services.twilio_webhook import WebhookForm, verify_twilio_request
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/twilio", tags=["twilio"])
+
+
+@router.post("/call-status")
+async def call_status_callback(form: WebhookForm = Depends(verify_twilio_request)):
+    """Twilio statusCallback: queued for a coalesced, batched upsert into call_records"""
+    call_sid = ingest_status_callback(form)
+    if call_sid is None:
+        logger.warning(f"Ignoring malformed status callback: {form.fields}")
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    # The call's state (kept until Twilio reports the call finished) says whose it is
+    state = call_states.get(call_sid)
+    if state is not None:
+        call_status, duration = form.get("CallStatus"), form.get("CallDuration")
+        event_hub.publish(state.user_id, "call.status", {
+            "call_sid": call_sid,
+            "status": call_status,
+            "duration_seconds": int(duration) if duration and duration.isdigit() else None
+        })
+        if STATUS_RANKS.get(call_status) == STATUS_RANKS["completed"]:
+            call_states.discard(call_sid)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
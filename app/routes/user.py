@@ -5,6 +5,7 @@ from app.db import get_db
 from app.auth import get_current_user
 from app.models import User
 from app.schemas import UserRead
+from app.services.personalization import instruction_cache
 from pydantic import BaseModel
 import logging
 
@@ -35,6 +36,7 @@ async def update_user_name(
         current_user.name = name
         db.commit()
         db.refresh(current_user)
+        instruction_cache.invalidate(current_user.id)
         
         logger.info(f"Updated name for user {current_user.email} to: {name}")
         
@@ -65,6 +67,7 @@ async def update_user_name_alt(
         current_user.name = name.strip() if isinstance(name, str) else str(name).strip()
         db.commit()
         db.refresh(current_user)
+        instruction_cache.invalidate(current_user.id)
         
         logger.info(f"Updated name for user {current_user.email} to: {current_user.name}")
         
@@ -1,7 +1,8 @@
 # schemas.py
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional
 from datetime import datetime
+from app.services.scenario_registry import Voice
 
 
 class UserCreate(BaseModel):
@@ -47,4 +48,90 @@ class TokenSchema(BaseModel):
         orm_mode = True
 
 
-__all__ = ["UserCreate", "UserLogin", "TokenSchema", "TokenData"]
+class UserScenarioCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    persona: str = Field(..., min_length=1, max_length=4000)
+    prompt: str = Field(..., min_length=1, max_length=4000)
+    voice: Optional[Voice] = None
+    temperature: Optional[float] = Field(None, ge=0.6, le=1.2)
+
+
+class UserScenarioRead(UserScenarioCreate):
+    id: int
+    scenario_id: str
+    version: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
+class TranscriptSegmentRead(BaseModel):
+    id: int
+    call_sid: str
+    seq: int
+    role: str
+    text: str
+    scenario: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
+class TranscriptSearchHit(TranscriptSegmentRead):
+    snippet: str
+    rank: float
+
+
+class TranscriptSearchResponse(BaseModel):
+    query: str
+    results: List[TranscriptSearchHit]
+    limit: int
+    offset: int
+    has_more: bool
+
+
+class CallRecordRead(BaseModel):
+    call_sid: str
+    scenario: Optional[str] = None
+    to_number: Optional[str] = None
+    source: Optional[str] = None
+    status: str
+    initiated_at: Optional[datetime] = None
+    ringing_at: Optional[datetime] = None
+    answered_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    duration_seconds: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
+class CallStatsRead(BaseModel):
+    call_sid: str
+    duration_s: float
+    caller_talk_s: float
+    assistant_talk_s: float
+    talk_ratio: Optional[float] = None
+    longest_silence_s: float
+    overlap_count: int
+    barge_in_count: int
+    turn_count: int
+    latency_mean_ms: Optional[float] = None
+    latency_p50_ms: Optional[float] = None
+    latency_p90_ms: Optional[float] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
+__all__ = [
+    "UserCreate", "UserLogin", "TokenSchema", "TokenData", "UserScenarioCreate", "UserScenarioRead",
+    "TranscriptSegmentRead", "TranscriptSearchHit", "TranscriptSearchResponse", "CallRecordRead", "CallStatsRead"
+]
@@ -0,0 +1,180 @@
+# app/services/audio_pacer.py
+import asyncio
+import base64
+import logging
+import weakref
+from typing import Awaitable, Callable, Optional, Tuple
+
+from app.config import PLAYOUT_LEAD_MS, PLAYOUT_MAX_BUFFER_MS, PLAYOUT_MARK_INTERVAL_FRAMES
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+FRAME_BYTES = 160  # 20 ms of 8 kHz G.711 mu-law
+FRAME_SECONDS = 0.02
+ULAW_SILENCE = b"\xff"
+COMPACT_THRESHOLD = 64 * 1024  # bytes consumed before the buffer is compacted
+
+_active_schedulers: "weakref.WeakSet[PlayoutScheduler]" = weakref.WeakSet()
+
+
+class PlayoutScheduler:
+    """Per-call outbound jitter buffer: re-chunks OpenAI audio into 20 ms frames and
+    sends them to Twilio at real-time pace, staying at most `lead_ms` ahead of playback"""
+
+    def __init__(
+        self,
+        send_text: Callable[[str], Awaitable[None]],
+        stream_sid: str,
+        lead_ms: float = PLAYOUT_LEAD_MS,
+        max_buffer_ms: float = PLAYOUT_MAX_BUFFER_MS,
+        mark_interval_frames: int = PLAYOUT_MARK_INTERVAL_FRAMES,
+        on_frame: Optional[Callable[[bytes, float], None]] = None
+    ):
+        self._send_text = send_text
+        self._media_prefix = '{"event":"media","streamSid":"%s","media":{"payload":"' % stream_sid
+        self._mark_template = '{"event":"mark","streamSid":"%s","mark":{"name":"%%d"}}' % stream_sid
+        self._clear_message = '{"event":"clear","streamSid":"%s"}' % stream_sid
+        self.lead = lead_ms / 1000
+        self.max_buffer_bytes = int(max_buffer_ms / 1000 / FRAME_SECONDS) * FRAME_BYTES
+        self.mark_interval_frames = mark_interval_frames
+        self.on_frame = on_frame  # e.g. the call recorder; gets (frame, play time)
+
+        self._buffer = bytearray()
+        self._read = 0
+        self._data_ready = asyncio.Event()
+        self._play_clock: Optional[float] = None  # loop time at which the next frame plays
+        self._response_active = False
+
+        self.frames_sent = 0
+        self.frames_played = 0  # playback cursor, advanced by Twilio mark echoes
+        self.underruns = 0
+        self.overflow_bytes = 0
+        self.current_item_id: Optional[str] = None
+        self._item_start_frame = 0
+        _active_schedulers.add(self)
+
+    @property
+    def buffered_bytes(self) -> int:
+        return len(self._buffer) - self._read
+
+    @property
+    def buffered_ms(self) -> float:
+        return self.buffered_bytes / FRAME_BYTES * FRAME_SECONDS * 1000
+
+    @property
+    def twilio_buffered_ms(self) -> float:
+        """Audio sent to Twilio but not yet confirmed played"""
+        return (self.frames_sent - self.frames_played) * FRAME_SECONDS * 1000
+
+    def feed(self, audio: bytes, item_id: Optional[str] = None):
+        """Queue decoded mu-law audio from a response.audio.delta (or a cached greeting)"""
+        if item_id is not None and item_id != self.current_item_id:
+            self.current_item_id = item_id
+            self._item_start_frame = self.frames_sent + self.buffered_bytes // FRAME_BYTES
+        room = self.max_buffer_bytes - self.buffered_bytes
+        if len(audio) > room:
+            # Bound per-call memory; anything beyond the cap is dropped and counted
+            self.overflow_bytes += len(audio) - max(room, 0)
+            metrics.increment("playout_overflow_bytes", len(audio) - max(room, 0))
+            audio = audio[:max(room, 0)]
+        self._buffer += audio
+        self._response_active = True
+        self._data_ready.set()
+
+    def end_response(self):
+        """The current response has no more audio; flush the trailing partial frame"""
+        self._response_active = False
+        remainder = self.buffered_bytes % FRAME_BYTES
+        if remainder:
+            self._buffer += ULAW_SILENCE * (FRAME_BYTES - remainder)
+        self._data_ready.set()
+
+    def on_mark(self, name: str):
+        """Twilio echoes a mark once the audio before it has been played"""
+        try:
+            self.frames_played = max(self.frames_played, int(name))
+        except ValueError:
+            pass
+
+    async def interrupt(self) -> Optional[Tuple[str, int]]:
+        """Caller barged in: drop queued audio locally and on Twilio.
+
+        Returns (item_id, audio_end_ms) for conversation.item.truncate when a response
+        was playing, so the model knows how much of it the caller actually heard.
+        """
+        truncate = None
+        if self.current_item_id and self.frames_sent > self._item_start_frame:
+            played = max(0, self.frames_played - self._item_start_frame)
+            truncate = (self.current_item_id, int(played * FRAME_SECONDS * 1000))
+        self._buffer.clear()
+        self._read = 0
+        self._response_active = False
+        self._play_clock = None
+        self.frames_played = self.frames_sent
+        self.current_item_id = None
+        await self._send_text(self._clear_message)
+        return truncate
+
+    async def run(self):
+        """Send frames at real-time pace for the life of the call"""
+        loop = asyncio.get_running_loop()
+        starved = False  # ran out of audio while the response was still going
+        while True:
+            if self.buffered_bytes < FRAME_BYTES:
+                starved = self._response_active
+                self._data_ready.clear()
+                await self._data_ready.wait()
+                continue
+
+            now = loop.time()
+            if self._play_clock is None or self._play_clock < now:
+                if starved and self._play_clock is not None:
+                    # Twilio played everything we sent before the rest of the response arrived
+                    self.underruns += 1
+                    metrics.increment("playout_underruns")
+                self._play_clock = now
+            starved = False
+            ahead = self._play_clock - now
+            if ahead > self.lead:
+                await asyncio.sleep(ahead - self.lead)
+                if self.buffered_bytes < FRAME_BYTES:
+                    continue  # interrupted while waiting
+
+            frame = bytes(self._buffer[self._read:self._read + FRAME_BYTES])
+            self._read += FRAME_BYTES
+            if self._read >= COMPACT_THRESHOLD:
+                del self._buffer[:self._read]
+                self._read = 0
+
+            await self._send_text(self._media_prefix + base64.b64encode(frame).decode() + '"}}')
+            if self.on_frame is not None:
+                self.on_frame(frame, self._play_clock)
+            self.frames_sent += 1
+            self._play_clock += FRAME_SECONDS
+            if self.frames_sent % self.mark_interval_frames == 0:
+                await self._send_text(self._mark_template % self.frames_sent)
+
+    def stats(self):
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_played": self.frames_played,
+            "buffered_ms": round(self.buffered_ms),
+            "twilio_buffered_ms": round(self.twilio_buffered_ms),
+            "underruns": self.underruns,
+            "overflow_bytes": self.overflow_bytes
+        }
+
+
+def playout_snapshot():
+    schedulers = list(_active_schedulers)
+    return {
+        "active_streams": len(schedulers),
+        "buffered_ms_total": round(sum(s.buffered_ms for s in schedulers)),
+        "buffered_ms_max": round(max((s.buffered_ms for s in schedulers), default=0)),
+        "twilio_buffered_ms_max": round(max((s.twilio_buffered_ms for s in schedulers), default=0)),
+        "underruns": sum(s.underruns for s in schedulers)
+    }
+
+
+metrics.register_collector("playout", playout_snapshot)
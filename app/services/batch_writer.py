@@ -0,0 +1,136 @@
+# app/services/batch_writer.py
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Generic, List, Optional, TypeVar
+
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BatchWriter(Generic[T]):
+    """Background thread that persists queued items in batches, off the event loop.
+
+    Producers call submit()/submit_many(), which never block; the writer thread
+    hands up to `max_batch` items at a time to `write_batch`, at least every
+    `flush_interval` seconds while items are waiting.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        write_batch: Callable[[List[T]], None],
+        max_batch: int = 500,
+        flush_interval: float = 1.0,
+        max_queue: int = 50000
+    ):
+        self.name = name
+        self._write_batch = write_batch
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, item: T) -> bool:
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            metrics.increment(f"{self.name}_dropped")
+            return False
+
+    def submit_many(self, items: List[T]):
+        for item in items:
+            self.submit(item)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything submitted so far has been written"""
+        if self._thread is None or not self._thread.is_alive():
+            self._drain_inline()
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 5.0):
+        """Write whatever is queued, then stop the thread"""
+        self.flush(timeout)
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _write(self, batch: List[T]):
+        if not batch:
+            return
+        try:
+            self._write_batch(batch)
+            self.written += len(batch)
+            metrics.increment(f"{self.name}_written", len(batch))
+        except Exception as e:
+            self.failed_batches += 1
+            metrics.increment(f"{self.name}_failed_batches")
+            logger.error(f"{self.name} writer failed to persist {len(batch)} items: {e}")
+
+    def _drain_inline(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+            else:
+                batch.append(item)
+        self._write(batch)
+
+    def _run(self):
+        batch: List[T] = []
+        deadline = None
+        while not self._stopping.is_set():
+            timeout = self.flush_interval if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, threading.Event):
+                self._write(batch)
+                batch, deadline = [], None
+                item.set()
+                continue
+            if item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if batch and (len(batch) >= self.max_batch or time.monotonic() >= deadline):
+                self._write(batch)
+                batch, deadline = [], None
+        self._write(batch)
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches
+        }
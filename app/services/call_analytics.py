@@ -0,0 +1,181 @@
+# app/services/call_analytics.py
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from app.config import ANALYTICS_WORKERS, ANALYTICS_SPEECH_THRESHOLD_DBFS
+from app.db import SessionLocal
+from app.models import CallStats
+from app.services.call_recorder import INBOUND_TRACK, OUTBOUND_TRACK, recording_dir, recording_writer
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+FRAME_SAMPLES = 160  # 20 ms at 8 kHz
+FRAME_SECONDS = 0.02
+HANGOVER_FRAMES = 10  # bridge pauses shorter than 200 ms inside one utterance
+MIN_TURN_GAP_FRAMES = 2  # ignore assistant starts that are just VAD flicker
+
+
+def _ulaw_table() -> np.ndarray:
+    """G.711 mu-law byte -> linear 16-bit sample, for all 256 codes"""
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (u >> 4) & 0x07
+    mantissa = u & 0x0F
+    magnitude = (((mantissa << 3) + 0x84) << exponent) - 0x84
+    return np.where(u & 0x80, -magnitude, magnitude).astype(np.float32)
+
+
+ULAW_TO_LINEAR = _ulaw_table()
+# Squared amplitude per mu-law code; frame energy is the mean over its 160 samples
+ULAW_SQUARED = ULAW_TO_LINEAR.astype(np.float64) ** 2
+
+
+def frame_activity(ulaw: np.ndarray, frames: int, threshold_dbfs: float) -> np.ndarray:
+    """Boolean speech activity per 20 ms frame from raw mu-law bytes"""
+    if len(ulaw) < frames * FRAME_SAMPLES:
+        ulaw = np.concatenate([ulaw, np.full(frames * FRAME_SAMPLES - len(ulaw), 0xFF, dtype=np.uint8)])
+    energy = ULAW_SQUARED[ulaw[:frames * FRAME_SAMPLES]].reshape(frames, FRAME_SAMPLES).mean(axis=1)
+    rms_dbfs = 10 * np.log10(energy / (32768.0 ** 2) + 1e-12)
+    active = rms_dbfs > threshold_dbfs
+    # Hangover: a frame stays active for HANGOVER_FRAMES after speech, so short pauses
+    # do not split one utterance into many
+    held = np.convolve(active.astype(np.int8), np.ones(HANGOVER_FRAMES, dtype=np.int8))[:frames]
+    return held > 0
+
+
+def _runs(mask: np.ndarray):
+    """(starts, ends) of the True runs in a boolean array; ends are exclusive"""
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def analyze_tracks(inbound: np.ndarray, outbound: np.ndarray,
+                   threshold_dbfs: float = ANALYTICS_SPEECH_THRESHOLD_DBFS) -> dict:
+    """Talk time, silence, overlap and turn latency for a caller/assistant track pair"""
+    frames = max(len(inbound), len(outbound)) // FRAME_SAMPLES
+    stats = {
+        "duration_s": frames * FRAME_SECONDS,
+        "caller_talk_s": 0.0,
+        "assistant_talk_s": 0.0,
+        "talk_ratio": None,
+        "longest_silence_s": 0.0,
+        "overlap_count": 0,
+        "barge_in_count": 0,
+        "turn_count": 0,
+        "latency_mean_ms": None,
+        "latency_p50_ms": None,
+        "latency_p90_ms": None
+    }
+    if frames == 0:
+        return stats
+
+    caller = frame_activity(inbound, frames, threshold_dbfs)
+    assistant = frame_activity(outbound, frames, threshold_dbfs)
+    caller_frames = int(caller.sum())
+    assistant_frames = int(assistant.sum())
+    stats["caller_talk_s"] = caller_frames * FRAME_SECONDS
+    stats["assistant_talk_s"] = assistant_frames * FRAME_SECONDS
+    if caller_frames + assistant_frames:
+        stats["talk_ratio"] = caller_frames / (caller_frames + assistant_frames)
+
+    silence_starts, silence_ends = _runs(~(caller | assistant))
+    if len(silence_starts):
+        stats["longest_silence_s"] = int((silence_ends - silence_starts).max()) * FRAME_SECONDS
+
+    overlap_starts, _ = _runs(caller & assistant)
+    stats["overlap_count"] = len(overlap_starts)
+    # A barge-in is an overlap the caller started while the assistant was already talking
+    caller_starts, caller_ends = _runs(caller)
+    prior = caller_starts - 1
+    stats["barge_in_count"] = int(np.count_nonzero((prior >= 0) & assistant[np.maximum(prior, 0)]))
+
+    # Turn-taking latency: caller stops -> next assistant start, if the caller has not
+    # started talking again in between
+    assistant_starts, _ = _runs(assistant)
+    if len(caller_ends) and len(assistant_starts):
+        idx = np.searchsorted(assistant_starts, caller_ends)
+        has_reply = idx < len(assistant_starts)
+        ends = caller_ends[has_reply]
+        replies = assistant_starts[idx[has_reply]]
+        next_caller = np.searchsorted(caller_starts, ends)
+        next_caller_start = np.where(
+            next_caller < len(caller_starts),
+            caller_starts[np.minimum(next_caller, len(caller_starts) - 1)],
+            frames + 1
+        )
+        # Hangover pushes every detected end HANGOVER_FRAMES - 1 frames late; undo it
+        gaps = replies - ends + (HANGOVER_FRAMES - 1)
+        valid = (replies < next_caller_start) & (gaps >= MIN_TURN_GAP_FRAMES)
+        latencies = gaps[valid] * FRAME_SECONDS * 1000
+        if len(latencies):
+            stats["turn_count"] = int(len(latencies))
+            stats["latency_mean_ms"] = float(latencies.mean())
+            stats["latency_p50_ms"] = float(np.percentile(latencies, 50))
+            stats["latency_p90_ms"] = float(np.percentile(latencies, 90))
+    return {k: round(v, 3) if isinstance(v, float) else v for k, v in stats.items()}
+
+
+def _load_track(path: str) -> np.ndarray:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.empty(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+def analyze_recording(call_sid: str) -> dict:
+    """Worker-process entry point: analyze a call's local recording"""
+    call_dir = recording_dir(call_sid)
+    return analyze_tracks(
+        _load_track(os.path.join(call_dir, f"{INBOUND_TRACK}.ulaw")),
+        _load_track(os.path.join(call_dir, f"{OUTBOUND_TRACK}.ulaw"))
+    )
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_analysis_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=ANALYTICS_WORKERS)
+    return _pool
+
+
+def shutdown_analysis_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def save_call_stats(call_sid: str, user_id: Optional[int], stats: dict):
+    db = SessionLocal()
+    try:
+        row = db.query(CallStats).filter(CallStats.call_sid == call_sid).first()
+        if row is None:
+            row = CallStats(call_sid=call_sid, user_id=user_id)
+            db.add(row)
+        for field, value in stats.items():
+            setattr(row, field, value)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def analyze_call(call_sid: str, user_id: Optional[int]):
+    """Analyze a finished call's recording in the worker pool and store the results"""
+    loop = asyncio.get_running_loop()
+    try:
+        # The recording must be on disk before a worker process reads it
+        await loop.run_in_executor(None, recording_writer.flush)
+        stats = await loop.run_in_executor(get_analysis_pool(), analyze_recording, call_sid)
+        await loop.run_in_executor(None, save_call_stats, call_sid, user_id, stats)
+        metrics.increment("calls_analyzed")
+        logger.info(f"Call analytics for {call_sid}: {stats}")
+    except Exception as e:
+        metrics.increment("call_analysis_failures")
+        logger.error(f"Call analytics failed for {call_sid}: {e}")
@@ -0,0 +1,102 @@
+# app/services/call_costs.py
+import datetime
+import logging
+from typing import List, Optional
+
+from app.config import (
+    OPENAI_PRICE_TEXT_INPUT,
+    OPENAI_PRICE_TEXT_CACHED_INPUT,
+    OPENAI_PRICE_TEXT_OUTPUT,
+    OPENAI_PRICE_AUDIO_INPUT,
+    OPENAI_PRICE_AUDIO_CACHED_INPUT,
+    OPENAI_PRICE_AUDIO_OUTPUT
+)
+from app.db import engine
+from app.models import CallCost
+from app.services.batch_writer import BatchWriter
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _insert_call_costs(rows: List[dict]):
+    with engine.begin() as conn:
+        conn.execute(CallCost.__table__.insert().prefix_with("OR REPLACE", dialect="sqlite"), rows)
+
+
+call_cost_writer = BatchWriter("call_costs", _insert_call_costs, max_batch=200, flush_interval=2.0)
+
+
+class CallUsage:
+    """Token usage accumulated over one call from response.done events"""
+
+    def __init__(self, call_sid: str, user_id: Optional[int] = None, scenario: Optional[str] = None):
+        self.call_sid = call_sid
+        self.user_id = user_id
+        self.scenario = scenario
+        self.started_at = datetime.datetime.utcnow()
+        self.connected = False  # set once the OpenAI session is open
+        self.responses = 0
+        self.text_input_tokens = 0
+        self.text_cached_input_tokens = 0
+        self.audio_input_tokens = 0
+        self.audio_cached_input_tokens = 0
+        self.text_output_tokens = 0
+        self.audio_output_tokens = 0
+
+    def add_response(self, response: dict):
+        """Fold in the usage block of a response.done event"""
+        usage = response.get("usage")
+        if not usage:
+            return
+        self.responses += 1
+        input_details = usage.get("input_token_details") or {}
+        cached_details = input_details.get("cached_tokens_details") or {}
+        output_details = usage.get("output_token_details") or {}
+        # Cached tokens are a subset of the input tokens and are billed at the cached rate
+        cached_text = cached_details.get("text_tokens", 0)
+        cached_audio = cached_details.get("audio_tokens", 0)
+        self.text_input_tokens += input_details.get("text_tokens", 0) - cached_text
+        self.audio_input_tokens += input_details.get("audio_tokens", 0) - cached_audio
+        self.text_cached_input_tokens += cached_text
+        self.audio_cached_input_tokens += cached_audio
+        self.text_output_tokens += output_details.get("text_tokens", 0)
+        self.audio_output_tokens += output_details.get("audio_tokens", 0)
+
+    def cost_usd(self) -> float:
+        return (
+            self.text_input_tokens * OPENAI_PRICE_TEXT_INPUT
+            + self.text_cached_input_tokens * OPENAI_PRICE_TEXT_CACHED_INPUT
+            + self.text_output_tokens * OPENAI_PRICE_TEXT_OUTPUT
+            + self.audio_input_tokens * OPENAI_PRICE_AUDIO_INPUT
+            + self.audio_cached_input_tokens * OPENAI_PRICE_AUDIO_CACHED_INPUT
+            + self.audio_output_tokens * OPENAI_PRICE_AUDIO_OUTPUT
+        ) / 1_000_000
+
+    def finish(self):
+        """Queue the call's cost record; never blocks the event loop"""
+        if not self.connected and not self.responses:
+            return  # OpenAI was never reached: nothing was billed, so no zero-cost row
+        ended_at = datetime.datetime.utcnow()
+        cost = self.cost_usd()
+        call_cost_writer.submit({
+            "call_sid": self.call_sid,
+            "user_id": self.user_id,
+            "scenario": self.scenario,
+            "started_at": self.started_at,
+            "ended_at": ended_at,
+            "duration_seconds": (ended_at - self.started_at).total_seconds(),
+            "responses": self.responses,
+            "text_input_tokens": self.text_input_tokens,
+            "text_cached_input_tokens": self.text_cached_input_tokens,
+            "audio_input_tokens": self.audio_input_tokens,
+            "audio_cached_input_tokens": self.audio_cached_input_tokens,
+            "text_output_tokens": self.text_output_tokens,
+            "audio_output_tokens": self.audio_output_tokens,
+            "cost_usd": cost
+        })
+        metrics.increment("openai_cost_usd", cost)
+        metrics.increment("openai_audio_output_tokens", self.audio_output_tokens)
+
+
+metrics.register_collector("call_cost_writer", call_cost_writer.stats)
@@ -0,0 +1,220 @@
+# app/services/call_recorder.py
+import asyncio
+import base64
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.config import RECORDINGS_DIR, RECORDING_RETENTION_DAYS, RECORDING_WRITER_INTERVAL
+from app.services.batch_writer import BatchWriter
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 8000  # G.711 mu-law: one byte per sample
+ULAW_SILENCE = b"\xff"
+INBOUND_TRACK = "inbound"  # caller, left channel
+OUTBOUND_TRACK = "outbound"  # assistant, right channel
+MAX_GAP_BYTES = 60 * SAMPLE_RATE  # never pad more than a minute for one bogus timestamp
+EXPORT_CHUNK_SAMPLES = 32 * 1024
+WAVE_FORMAT_MULAW = 7
+
+_SAFE_CALL_SID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def recording_dir(call_sid: str) -> str:
+    if not _SAFE_CALL_SID.match(call_sid):
+        raise ValueError(f"Invalid call SID: {call_sid!r}")
+    return os.path.join(RECORDINGS_DIR, call_sid)
+
+
+class _RecordingFiles:
+    """Open track files, owned by the writer thread"""
+
+    def __init__(self):
+        self._files: Dict[Tuple[str, str], Tuple[object, int]] = {}
+
+    def write_batch(self, items: List[tuple]):
+        for item in items:
+            # One call's bad item must not cost the rest of the batch (other calls' closes included)
+            try:
+                self._apply(item)
+            except Exception as e:
+                metrics.increment("recording_write_failures")
+                logger.error(f"Recording {item[0]} failed for call {os.path.basename(item[1])}: {e}")
+
+    def _apply(self, item: tuple):
+        if item[0] == "write":
+            _, call_dir, track, offset, data = item
+            self._write(call_dir, track, offset, data)
+        elif item[0] == "open":
+            _, call_dir, meta = item
+            os.makedirs(call_dir, exist_ok=True)
+            with open(os.path.join(call_dir, "meta.json"), "w") as f:
+                json.dump(meta, f)
+        elif item[0] == "close":
+            self._close(item[1])
+
+    def _write(self, call_dir: str, track: str, offset: int, data):
+        key = (call_dir, track)
+        entry = self._files.get(key)
+        if entry is None:
+            os.makedirs(call_dir, exist_ok=True)
+            fh = open(os.path.join(call_dir, f"{track}.ulaw"), "ab")
+            entry = (fh, fh.tell())
+        fh, length = entry
+        if isinstance(data, str):
+            data = base64.b64decode(data)  # inbound payloads are decoded here, not on the loop
+        if offset > length:
+            # Silence for the time this track had nothing to say, so both tracks stay aligned
+            gap = min(offset - length, MAX_GAP_BYTES)
+            fh.write(ULAW_SILENCE * gap)
+            length += gap
+        fh.write(data)
+        self._files[key] = (fh, length + len(data))
+
+    def _close(self, call_dir: str):
+        for key in [k for k in self._files if k[0] == call_dir]:
+            fh, _ = self._files.pop(key)
+            fh.close()
+
+
+_files = _RecordingFiles()
+recording_writer = BatchWriter("recordings", _files.write_batch, flush_interval=RECORDING_WRITER_INTERVAL)
+
+
+class CallRecorder:
+    """Per-call recorder; every method only enqueues work for the writer thread"""
+
+    def __init__(self, call_sid: str, user_id: Optional[int] = None, scenario: Optional[str] = None):
+        self.call_sid = call_sid
+        self.call_dir = recording_dir(call_sid)
+        self._started = asyncio.get_running_loop().time()
+        self.closed = False
+        recording_writer.submit(("open", self.call_dir, {
+            "call_sid": call_sid,
+            "user_id": user_id,
+            "scenario": scenario,
+            "started_at": time.time()
+        }))
+        metrics.increment("recordings_started")
+
+    def inbound(self, payload: str, timestamp_ms):
+        """Caller audio as the base64 payload from a Twilio media message"""
+        offset = int(timestamp_ms) * SAMPLE_RATE // 1000
+        recording_writer.submit(("write", self.call_dir, INBOUND_TRACK, offset, payload))
+
+    def outbound(self, frame: bytes, play_time: float):
+        """Assistant audio frame, stamped with the loop time at which it plays"""
+        offset = round((play_time - self._started) * SAMPLE_RATE)
+        recording_writer.submit(("write", self.call_dir, OUTBOUND_TRACK, offset, frame))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            recording_writer.submit(("close", self.call_dir))
+
+
+def read_recording_meta(call_sid: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(recording_dir(call_sid), "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def wav_header(data_bytes: int, channels: int = 2) -> bytes:
+    """RIFF header for interleaved 8 kHz mu-law"""
+    block_align = channels
+    fmt = (
+        WAVE_FORMAT_MULAW.to_bytes(2, "little")
+        + channels.to_bytes(2, "little")
+        + SAMPLE_RATE.to_bytes(4, "little")
+        + (SAMPLE_RATE * block_align).to_bytes(4, "little")
+        + block_align.to_bytes(2, "little")
+        + (8).to_bytes(2, "little")  # bits per sample
+        + (0).to_bytes(2, "little")  # cbSize
+    )
+    fact = (data_bytes // block_align).to_bytes(4, "little")
+    riff_size = 4 + (8 + len(fmt)) + (8 + len(fact)) + (8 + data_bytes + data_bytes % 2)
+    return (
+        b"RIFF" + riff_size.to_bytes(4, "little") + b"WAVE"
+        + b"fmt " + len(fmt).to_bytes(4, "little") + fmt
+        + b"fact" + len(fact).to_bytes(4, "little") + fact
+        + b"data" + data_bytes.to_bytes(4, "little")
+    )
+
+
+def _map_track(path: str) -> Optional[mmap.mmap]:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def stream_stereo_wav(call_sid: str) -> Tuple[int, Iterator[bytes]]:
+    """(content_length, chunk iterator) for a stereo WAV: caller left, assistant right.
+
+    Tracks are memory-mapped and interleaved one chunk at a time, so the export never
+    holds more than a chunk of either track in memory.
+    """
+    call_dir = recording_dir(call_sid)
+    inbound = _map_track(os.path.join(call_dir, f"{INBOUND_TRACK}.ulaw"))
+    outbound = _map_track(os.path.join(call_dir, f"{OUTBOUND_TRACK}.ulaw"))
+    if inbound is None and outbound is None:
+        raise FileNotFoundError(call_sid)
+    samples = max(len(inbound) if inbound else 0, len(outbound) if outbound else 0)
+    header = wav_header(samples * 2)
+
+    def chunks():
+        try:
+            yield header
+            for start in range(0, samples, EXPORT_CHUNK_SAMPLES):
+                end = min(start + EXPORT_CHUNK_SAMPLES, samples)
+                frame = bytearray(ULAW_SILENCE * ((end - start) * 2))
+                for channel, track in ((0, inbound), (1, outbound)):
+                    if track is not None and start < len(track):
+                        part = track[start:min(end, len(track))]
+                        frame[channel:channel + len(part) * 2:2] = part
+                yield bytes(frame)
+        finally:
+            for track in (inbound, outbound):
+                if track is not None:
+                    track.close()
+
+    return len(header) + samples * 2, chunks()
+
+
+def purge_expired_recordings(now: Optional[float] = None) -> int:
+    """Delete recordings older than RECORDING_RETENTION_DAYS; returns how many were removed"""
+    if not os.path.isdir(RECORDINGS_DIR):
+        return 0
+    cutoff = (now or time.time()) - RECORDING_RETENTION_DAYS * 86400
+    removed = 0
+    for entry in os.scandir(RECORDINGS_DIR):
+        if entry.is_dir() and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    if removed:
+        logger.info(f"Removed {removed} recordings older than {RECORDING_RETENTION_DAYS} days")
+        metrics.increment("recordings_purged", removed)
+    return removed
+
+
+async def retention_loop(interval: float = 3600):
+    """Apply the retention policy periodically, off the event loop"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, purge_expired_recordings)
+        except Exception as e:
+            logger.error(f"Recording retention sweep failed: {e}")
+        await asyncio.sleep(interval)
+
+
+metrics.register_collector("recording_writer", recording_writer.stats)
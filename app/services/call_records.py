@@ -0,0 +1,178 @@
+# app/services/call_records.py
+import datetime
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.config import CALL_STATUS_FLUSH_INTERVAL
+from app.db import engine
+from app.models import CallRecord
+from app.services.batch_writer import BatchWriter
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+STATUS_CALLBACK_EVENTS = ["initiated", "ringing", "answered", "completed"]
+
+# Twilio CallStatus values in lifecycle order; terminal states share the top rank
+STATUS_RANKS = {
+    "queued": 0,
+    "initiated": 1,
+    "ringing": 2,
+    "in-progress": 3,
+    "completed": 4,
+    "busy": 4,
+    "no-answer": 4,
+    "failed": 4,
+    "canceled": 4
+}
+
+# Which timestamp column each status fills in
+_STATUS_TIMESTAMPS = {
+    "initiated": "initiated_at",
+    "ringing": "ringing_at",
+    "in-progress": "answered_at",
+    "completed": "completed_at",
+    "busy": "completed_at",
+    "no-answer": "completed_at",
+    "failed": "completed_at",
+    "canceled": "completed_at"
+}
+
+_ROW_FIELDS = (
+    "call_sid", "user_id", "scenario", "to_number", "from_number", "source", "status", "status_rank",
+    "initiated_at", "ringing_at", "answered_at", "completed_at", "duration_seconds", "created_at", "updated_at"
+)
+
+
+def status_callback_url(public_url: str) -> str:
+    return f"https://{public_url}/twilio/call-status"
+
+
+def _upsert_statement():
+    """INSERT ... ON CONFLICT(call_sid) that only ever moves a call forward"""
+    stmt = sqlite_insert(CallRecord.__table__)
+    excluded = stmt.excluded
+    table = CallRecord.__table__.c
+    return stmt.on_conflict_do_update(
+        index_elements=["call_sid"],
+        set_={
+            "status": case((excluded.status_rank >= table.status_rank, excluded.status), else_=table.status),
+            "status_rank": func.max(table.status_rank, excluded.status_rank),
+            "user_id": func.coalesce(table.user_id, excluded.user_id),
+            "scenario": func.coalesce(table.scenario, excluded.scenario),
+            "to_number": func.coalesce(table.to_number, excluded.to_number),
+            "from_number": func.coalesce(table.from_number, excluded.from_number),
+            "source": func.coalesce(table.source, excluded.source),
+            "initiated_at": func.coalesce(table.initiated_at, excluded.initiated_at),
+            "ringing_at": func.coalesce(table.ringing_at, excluded.ringing_at),
+            "answered_at": func.coalesce(table.answered_at, excluded.answered_at),
+            "completed_at": func.coalesce(table.completed_at, excluded.completed_at),
+            "duration_seconds": func.coalesce(excluded.duration_seconds, table.duration_seconds),
+            "updated_at": excluded.updated_at
+        }
+    )
+
+
+_UPSERT = _upsert_statement()
+
+
+def _empty_row(call_sid: str, now: datetime.datetime) -> dict:
+    row = dict.fromkeys(_ROW_FIELDS)
+    row.update(call_sid=call_sid, status="queued", status_rank=0, created_at=now, updated_at=now)
+    return row
+
+
+def coalesce_status_events(events: List[dict]) -> List[dict]:
+    """Merge callbacks per call so a flush writes one row per call, whatever the event order"""
+    rows: Dict[str, dict] = {}
+    for event in events:
+        row = rows.get(event["call_sid"])
+        if row is None:
+            row = rows[event["call_sid"]] = _empty_row(event["call_sid"], event["received_at"])
+        status = event["status"]
+        rank = STATUS_RANKS.get(status, 0)
+        if rank >= row["status_rank"]:
+            row["status"], row["status_rank"] = status, rank
+        column = _STATUS_TIMESTAMPS.get(status)
+        if column and row[column] is None:
+            row[column] = event["received_at"]
+        if event.get("duration_seconds") is not None:
+            row["duration_seconds"] = event["duration_seconds"]
+        for field in ("to_number", "from_number"):
+            if event.get(field) and row[field] is None:
+                row[field] = event[field]
+        row["updated_at"] = max(row["updated_at"], event["received_at"])
+    return list(rows.values())
+
+
+def _write_status_events(events: List[dict]):
+    rows = coalesce_status_events(events)
+    with engine.begin() as conn:
+        conn.execute(_UPSERT, rows)
+    metrics.increment("call_status_rows_upserted", len(rows))
+
+
+call_status_writer = BatchWriter(
+    "call_status",
+    _write_status_events,
+    max_batch=5000,
+    flush_interval=CALL_STATUS_FLUSH_INTERVAL
+)
+
+
+def ingest_status_callback(form) -> Optional[str]:
+    """Queue one Twilio status callback; returns the CallSid, or None if it is unusable"""
+    call_sid = form.get("CallSid")
+    status = form.get("CallStatus")
+    if not call_sid or not status:
+        return None
+    duration = form.get("CallDuration")
+    call_status_writer.submit({
+        "call_sid": call_sid,
+        "status": status,
+        "duration_seconds": int(duration) if duration and duration.isdigit() else None,
+        "to_number": form.get("To"),
+        "from_number": form.get("From"),
+        "received_at": datetime.datetime.utcnow()
+    })
+    metrics.increment("call_status_callbacks")
+    return call_sid
+
+
+def record_dispatch(
+    db: Session,
+    call_sid: str,
+    user_id: Optional[int],
+    scenario: Optional[str],
+    to_number: Optional[str],
+    from_number: Optional[str],
+    source: str
+):
+    """Create the CallRecord as soon as Twilio accepts the call.
+
+    Best effort: the call is already placed, so a DB error (e.g. the database is
+    locked) is logged and rolled back; status callbacks still fill in the row.
+    """
+    now = datetime.datetime.utcnow()
+    row = _empty_row(call_sid, now)
+    row.update(
+        user_id=user_id,
+        scenario=scenario,
+        to_number=to_number,
+        from_number=from_number,
+        source=source
+    )
+    try:
+        db.execute(_UPSERT, [row])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        metrics.increment("call_dispatch_record_failures")
+        logger.error(f"Failed to record dispatched call {call_sid}: {e}")
+
+
+metrics.register_collector("call_status_writer", call_status_writer.stats)
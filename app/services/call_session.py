@@ -0,0 +1,127 @@
+# app/services/call_session.py
+import sys
+import time
+from array import array
+from typing import List, Optional, Tuple
+
+from app.config import CALL_SESSION_EVENT_HISTORY
+
+
+class EventRing:
+    """Fixed-size ring of (monotonic time, event type) for the most recent events.
+
+    Types are interned so every call shares one copy of each event name, and the
+    times live in a flat array of doubles rather than one float object each.
+    """
+
+    __slots__ = ("_types", "_times", "_next", "count")
+
+    def __init__(self, size: int = CALL_SESSION_EVENT_HISTORY):
+        self._types: List[Optional[str]] = [None] * size
+        self._times = array("d", bytes(8 * size))
+        self._next = 0
+        self.count = 0
+
+    def add(self, event_type: str, at: float):
+        i = self._next
+        self._types[i] = sys.intern(event_type)
+        self._times[i] = at
+        self._next = (i + 1) % len(self._types)
+        self.count += 1
+
+    def recent(self) -> List[Tuple[float, str]]:
+        """Oldest first"""
+        size = len(self._types)
+        start = self._next if self.count >= size else 0
+        return [(self._times[(start + n) % size], self._types[(start + n) % size])
+                for n in range(min(self.count, size))]
+
+
+class CallSession:
+    """Everything the media bridge keeps for one call, in one slotted object.
+
+    Created when Twilio opens the media stream and filled in as the call sets
+    up; the per-frame handlers read and update it in place. Counters and the
+    event rings have a fixed size, so a call's footprint does not grow with
+    its length (audio buffers in the pacer and recorder aside).
+    """
+
+    __slots__ = (
+        "websocket", "openai_session", "pacer", "transcript", "usage", "recorder",
+        "scenario", "stream_sid", "call_sid", "user_id",
+        "accepted_at", "started_at", "first_media_at", "last_media_at", "first_response_at", "ended_at",
+        "media_in", "audio_deltas", "marks", "barge_ins", "openai_errors",
+        "twilio_events", "openai_events",
+        "__weakref__"  # tracked weakly by the call registry's leak detector
+    )
+
+    def __init__(self, websocket, scenario: str):
+        self.websocket = websocket
+        self.openai_session = None
+        self.pacer = None
+        self.transcript = None
+        self.usage = None
+        self.recorder = None
+
+        self.scenario = scenario
+        self.stream_sid: Optional[str] = None
+        self.call_sid: Optional[str] = None
+        self.user_id: Optional[int] = None
+
+        self.accepted_at = time.monotonic()
+        self.started_at = 0.0
+        self.first_media_at = 0.0
+        self.last_media_at = 0.0
+        self.first_response_at = 0.0
+        self.ended_at = 0.0
+
+        self.media_in = 0
+        self.audio_deltas = 0
+        self.marks = 0
+        self.barge_ins = 0
+        self.openai_errors = 0
+
+        # Non-audio events only: media frames and audio deltas are just counted
+        self.twilio_events = EventRing()
+        self.openai_events = EventRing()
+
+    def start(self, start: dict):
+        """Take the stream identifiers from Twilio's "start" event"""
+        self.started_at = time.monotonic()
+        self.stream_sid = start["streamSid"]
+        self.call_sid = start.get("callSid") or self.stream_sid
+
+    def on_media(self):
+        now = time.monotonic()
+        if not self.media_in:
+            self.first_media_at = now
+        self.last_media_at = now
+        self.media_in += 1
+
+    def on_audio_delta(self):
+        if not self.audio_deltas:
+            self.first_response_at = time.monotonic()
+        self.audio_deltas += 1
+
+    def twilio_event(self, event_type: str):
+        self.twilio_events.add(event_type, time.monotonic())
+
+    def openai_event(self, event_type: str):
+        self.openai_events.add(event_type, time.monotonic())
+
+    def summary(self) -> dict:
+        end = self.ended_at or time.monotonic()
+        return {
+            "call_sid": self.call_sid,
+            "stream_sid": self.stream_sid,
+            "scenario": self.scenario,
+            "duration_s": round(end - self.started_at, 1) if self.started_at else 0.0,
+            "first_response_ms": round((self.first_response_at - self.started_at) * 1000)
+            if self.first_response_at and self.started_at else None,
+            "media_in": self.media_in,
+            "audio_deltas": self.audio_deltas,
+            "marks": self.marks,
+            "barge_ins": self.barge_ins,
+            "openai_errors": self.openai_errors,
+            "reconnects": self.openai_session.reconnects if self.openai_session else 0
+        }
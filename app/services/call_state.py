@@ -0,0 +1,208 @@
+# app/services/call_state.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from app.config import (
+    CALL_STATE_BACKEND,
+    CALL_STATE_SQLITE_PATH,
+    CALL_STATE_TTL_SECONDS,
+    CALL_STATE_CACHE_SIZE
+)
+from app.services.metrics import metrics
+from app.services.scenario_registry import CompiledScenario
+
+logger = logging.getLogger(__name__)
+
+SWEEP_INTERVAL = 60.0
+
+
+class CallState(NamedTuple):
+    """What the media stream needs to know about a call, keyed by its CallSid.
+
+    Written when the call is dispatched (or when its webhook arrives) and read
+    when Twilio opens the media stream, which may be on another worker. The
+    pre-serialized session.update travels with it so that worker needs neither
+    the DB nor its own instruction cache.
+    """
+    call_sid: str
+    user_id: Optional[int]
+    scenario: str
+    version: str
+    session_update: str
+    greeting: bool
+    source: str  # web | mobile | scheduled | webhook | stream
+    expires_at: float
+
+    @classmethod
+    def for_scenario(cls, call_sid: str, user_id: Optional[int], compiled: CompiledScenario,
+                     source: str, ttl: float = CALL_STATE_TTL_SECONDS) -> "CallState":
+        return cls(call_sid, user_id, compiled.name, compiled.version, compiled.session_update,
+                   bool(compiled.greeting), source, time.time() + ttl)
+
+
+class MemoryCallStateStore:
+    """Per-process states; enough when one worker serves both webhooks and media"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: Dict[str, CallState] = {}
+        self._next_sweep = time.time() + SWEEP_INTERVAL
+
+    def put(self, state: CallState):
+        now = time.time()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._next_sweep = now + SWEEP_INTERVAL
+                for call_sid in [sid for sid, s in self._states.items() if s.expires_at <= now]:
+                    del self._states[call_sid]
+            self._states[state.call_sid] = state
+
+    def get(self, call_sid: str) -> Optional[CallState]:
+        return self._states.get(call_sid)
+
+    def delete(self, call_sid: str):
+        with self._lock:
+            self._states.pop(call_sid, None)
+
+    def __len__(self):
+        return len(self._states)
+
+
+class SQLiteCallStateStore:
+    """States in a local SQLite file so every worker on the host sees every call.
+
+    Stands in for a networked store; a read is one primary-key lookup and a
+    write one short transaction on a WAL database.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._next_sweep = time.time() + SWEEP_INTERVAL
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS call_state "
+            "(call_sid TEXT PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, state: CallState):
+        conn = self._conn()
+        now = time.time()
+        if now >= self._next_sweep:
+            self._next_sweep = now + SWEEP_INTERVAL
+            conn.execute("DELETE FROM call_state WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "INSERT OR REPLACE INTO call_state (call_sid, state, expires_at) VALUES (?, ?, ?)",
+            (state.call_sid, json.dumps(state), state.expires_at)
+        )
+
+    def get(self, call_sid: str) -> Optional[CallState]:
+        row = self._conn().execute(
+            "SELECT state FROM call_state WHERE call_sid = ?", (call_sid,)
+        ).fetchone()
+        return CallState(*json.loads(row[0])) if row else None
+
+    def delete(self, call_sid: str):
+        self._conn().execute("DELETE FROM call_state WHERE call_sid = ?", (call_sid,))
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM call_state").fetchone()[0]
+
+
+class CallStateRegistry:
+    """Call states in a shared store behind a bounded local cache.
+
+    A CallSid's state is written once and never changes, so cached entries
+    need no invalidation beyond their expiry; only misses reach the store.
+    """
+
+    def __init__(self, store, cache_size: int = CALL_STATE_CACHE_SIZE):
+        self.store = store
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, CallState]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _remember(self, state: CallState):
+        with self._lock:
+            self._cache[state.call_sid] = state
+            self._cache.move_to_end(state.call_sid)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def put(self, state: CallState):
+        """Record a call's state; a store failure is logged, the signed call context still works"""
+        self._remember(state)
+        try:
+            self.store.put(state)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to store call state for {state.call_sid}: {e}")
+
+    def get(self, call_sid: Optional[str]) -> Optional[CallState]:
+        if not call_sid:
+            return None
+        state = self._cache.get(call_sid)
+        if state is None:
+            self.misses += 1
+            try:
+                state = self.store.get(call_sid)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Failed to read call state for {call_sid}: {e}")
+                return None
+            if state is None:
+                return None
+            self._remember(state)
+        else:
+            self.hits += 1
+        return state if state.expires_at > time.time() else None
+
+    def discard(self, call_sid: Optional[str]):
+        """Forget a finished call"""
+        if not call_sid:
+            return
+        with self._lock:
+            self._cache.pop(call_sid, None)
+        try:
+            self.store.delete(call_sid)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to delete call state for {call_sid}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.store).__name__,
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors
+        }
+
+
+def create_call_state_store():
+    if CALL_STATE_BACKEND == "sqlite":
+        os.makedirs(os.path.dirname(os.path.abspath(CALL_STATE_SQLITE_PATH)), exist_ok=True)
+        return SQLiteCallStateStore(CALL_STATE_SQLITE_PATH)
+    return MemoryCallStateStore()
+
+
+call_states = CallStateRegistry(create_call_state_store())
+
+metrics.register_collector("call_state", call_states.stats)
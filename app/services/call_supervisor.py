@@ -0,0 +1,215 @@
+# app/services/call_supervisor.py
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List
+
+import anyio
+from starlette.websockets import WebSocketDisconnect, WebSocketState
+
+from app.config import (
+    CALL_TEARDOWN_TIMEOUT_SECONDS,
+    CALL_LEAK_GRACE_SECONDS,
+    CALL_LEAK_CHECK_SECONDS,
+    CALL_SUMMARY_HISTORY
+)
+from app.services.audio_pacer import playout_snapshot
+from app.services.call_session import CallSession
+from app.services.event_hub import event_hub
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[CallSession], Awaitable[None]]
+
+
+class CallSupervisor:
+    """Owns every task and socket of one call.
+
+    Used as `async with CallSupervisor(session) as supervisor:` around the whole
+    media stream. Background work (the playout pacer) and the two bridge
+    directions run in anyio task groups, so no task outlives the call. On exit
+    the tasks are cancelled and awaited, then teardown closes the OpenAI and
+    Twilio sockets and hands the call's records to their writers, under one
+    shielded timeout. Task failures are logged and kept in the call summary.
+    """
+
+    def __init__(self, session: CallSession, teardown_timeout: float = CALL_TEARDOWN_TIMEOUT_SECONDS):
+        self.session = session
+        self.teardown_timeout = teardown_timeout
+        self.failures: List[str] = []
+        self._task_group = None
+
+    async def __aenter__(self) -> "CallSupervisor":
+        call_registry.opened(self.session)
+        self._task_group = anyio.create_task_group()
+        await self._task_group.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc is not None and isinstance(exc, Exception) and not isinstance(exc, WebSocketDisconnect):
+            self.failures.append(f"handler: {exc!r}")
+        self._task_group.cancel_scope.cancel()
+        try:
+            if isinstance(exc, Exception):
+                # Close the task group on its own so the handler's exception propagates
+                # as itself rather than wrapped in an ExceptionGroup
+                await self._task_group.__aexit__(None, None, None)
+                return False
+            # Cancellation (possibly from our own scope) is the task group's to handle
+            return await self._task_group.__aexit__(exc_type, exc, tb)
+        finally:
+            await self._teardown()
+
+    def _task_name(self, name: str) -> str:
+        return f"call:{self.session.call_sid or id(self.session)}:{name}"
+
+    async def _supervised(self, name: str, fn: Callable[[], Awaitable[None]], scope: anyio.CancelScope):
+        """Run one task of the call; when it ends, for any reason, the scope's other tasks stop too"""
+        try:
+            await fn()
+        except Exception as e:
+            self.failures.append(f"{name}: {e!r}")
+            metrics.increment("call_task_failures")
+            logger.error(f"Call {self.session.call_sid} task {name} failed: {e!r}", exc_info=True)
+        finally:
+            scope.cancel()
+
+    def start_soon(self, name: str, fn: Callable[[], Awaitable[None]]):
+        """Run fn for the rest of the call; if it stops, the call ends"""
+        self._task_group.start_soon(self._supervised, name, fn, self._task_group.cancel_scope,
+                                    name=self._task_name(name))
+
+    async def bridge(self, *handlers: Handler):
+        """Run the handlers until the first one returns, then cancel and await the rest"""
+        async with anyio.create_task_group() as task_group:
+            for handler in handlers:
+                task_group.start_soon(
+                    self._supervised, handler.__name__, lambda h=handler: h(self.session),
+                    task_group.cancel_scope, name=self._task_name(handler.__name__))
+
+    def _step(self, name: str, fn: Callable[[], None]):
+        try:
+            fn()
+        except Exception as e:
+            self.failures.append(f"teardown {name}: {e!r}")
+            logger.error(f"Call {self.session.call_sid} teardown of {name} failed: {e!r}")
+
+    async def _close_twilio(self):
+        websocket = self.session.websocket
+        if (websocket.client_state != WebSocketState.DISCONNECTED
+                and websocket.application_state != WebSocketState.DISCONNECTED):
+            await websocket.close(code=1011 if self.failures else 1000)
+
+    async def _teardown(self):
+        session = self.session
+        session.ended_at = time.monotonic()
+        if session.pacer is not None:
+            logger.info(f"Playout stats: {session.pacer.stats()}")
+        # Buffered records go to their batch writers; none of these block
+        if session.transcript is not None:
+            self._step("transcript", session.transcript.flush)
+        if session.usage is not None:
+            self._step("usage", session.usage.finish)
+        if session.recorder is not None:
+            self._step("recorder", session.recorder.close)
+
+        with anyio.move_on_after(self.teardown_timeout, shield=True) as scope:
+            for name, close in (("openai", session.openai_session and session.openai_session.close),
+                                ("twilio", self._close_twilio)):
+                if close is None:
+                    continue
+                try:
+                    await close()
+                except Exception as e:
+                    # Usually the peer already went away; nothing left to release
+                    logger.debug(f"Call {session.call_sid} closing {name} socket: {e!r}")
+        if scope.cancelled_caught:
+            self.failures.append(f"teardown timed out after {self.teardown_timeout}s")
+            metrics.increment("call_teardown_timeouts")
+            logger.error(f"Call {session.call_sid} teardown timed out after {self.teardown_timeout}s")
+
+        call_registry.closed(session, self.failures)
+
+
+class CallRegistry:
+    """Live calls on this worker, finished-call summaries and a leak detector.
+
+    Sessions are tracked weakly: a session that is still reachable some time
+    after its call ended (or a task named for it that is still running) means
+    something kept a reference to the call's sockets and buffers.
+    """
+
+    def __init__(self, history: int = CALL_SUMMARY_HISTORY, leak_grace: float = CALL_LEAK_GRACE_SECONDS):
+        self.leak_grace = leak_grace
+        self._sessions: "weakref.WeakSet[CallSession]" = weakref.WeakSet()
+        self.recent: Deque[Dict] = deque(maxlen=history)
+        self.completed = 0
+        self.failed = 0
+        self.leaks: Dict[str, List[str]] = {}
+
+    def opened(self, session: CallSession):
+        self._sessions.add(session)
+
+    def closed(self, session: CallSession, failures: List[str]):
+        summary = session.summary()
+        summary["failures"] = failures
+        self.recent.append(summary)
+        self.completed += 1
+        if failures:
+            self.failed += 1
+        if session.started_at:
+            logger.info(f"Call finished: {summary}")
+        event_hub.publish(session.user_id, "call.ended",
+                          {key: value for key, value in summary.items() if key != "failures"})
+
+    def live(self) -> List[Dict]:
+        return [session.summary() for session in list(self._sessions) if not session.ended_at]
+
+    def find_leaks(self) -> Dict[str, List[str]]:
+        """Calls that ended over leak_grace ago but whose session or tasks are still alive.
+
+        Never forces gc.collect(): a full collection on the media loop would stall
+        audio pacing. A session only kept alive by a reference cycle can show up here
+        until the regular collector reaches it.
+        """
+        now = time.monotonic()
+        ended = {}
+        for session in list(self._sessions):
+            if session.ended_at and now - session.ended_at > self.leak_grace:
+                ended[str(session.call_sid or id(session))] = ["session"]
+        live_call_ids = {str(s.call_sid or id(s)) for s in list(self._sessions) if not s.ended_at}
+        for task in asyncio.all_tasks():
+            parts = task.get_name().split(":")
+            if len(parts) == 3 and parts[0] == "call" and parts[1] not in live_call_ids:
+                ended.setdefault(parts[1], []).append(f"task {parts[2]}")
+        return ended
+
+    async def leak_watch(self, interval: float = CALL_LEAK_CHECK_SECONDS):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                leaks = self.find_leaks()
+                for call_sid, objects in leaks.items():
+                    if call_sid not in self.leaks:
+                        logger.warning(f"Call {call_sid} ended but still holds: {', '.join(objects)}")
+                self.leaks = leaks
+                metrics.set_gauge("call_leaks", len(leaks))
+            except Exception as e:
+                logger.error(f"Call leak check failed: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            "live_calls": len(self.live()),
+            "sessions_tracked": len(self._sessions),
+            "schedulers_alive": playout_snapshot()["active_streams"],
+            "completed": self.completed,
+            "with_failures": self.failed,
+            "leaked_calls": len(self.leaks)
+        }
+
+
+call_registry = CallRegistry()
+metrics.register_collector("call_lifecycle", call_registry.stats)
@@ -0,0 +1,94 @@
+# app/services/capacity.py
+import asyncio
+import logging
+import threading
+from typing import Dict, Any
+
+from app.config import MAX_CONCURRENT_CALLS, MAX_PENDING_DISPATCHES, MAX_LOOP_LAG_MS
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CapacityLimiter:
+    """Per-worker admission control for media bridges and outbound call dispatch"""
+
+    def __init__(self, max_calls: int, max_pending_dispatches: int, max_loop_lag_ms: float):
+        self.max_calls = max_calls
+        self.max_pending_dispatches = max_pending_dispatches
+        self.max_loop_lag_ms = max_loop_lag_ms
+        # The scheduler thread dispatches calls too, so counters are guarded by a lock
+        self._lock = threading.Lock()
+        self.active_calls = 0
+        self.pending_dispatches = 0
+        self.loop_lag_ms = 0.0
+        self.draining = False
+        self.rejected_calls = 0
+        self.rejected_dispatches = 0
+
+    def headroom(self) -> int:
+        """Number of additional media bridges this worker can accept"""
+        return max(0, self.max_calls - self.active_calls)
+
+    def is_overloaded(self) -> bool:
+        """True when the event loop is lagging beyond the configured threshold"""
+        return self.loop_lag_ms > self.max_loop_lag_ms
+
+    def has_capacity(self) -> bool:
+        return not self.draining and self.headroom() > 0 and not self.is_overloaded()
+
+    def try_acquire_call(self) -> bool:
+        """Reserve a slot for a new media bridge; returns False when the worker is full"""
+        with self._lock:
+            if self.draining or self.active_calls >= self.max_calls or self.is_overloaded():
+                self.rejected_calls += 1
+                return False
+            self.active_calls += 1
+            return True
+
+    def release_call(self):
+        with self._lock:
+            self.active_calls = max(0, self.active_calls - 1)
+
+    def try_acquire_dispatch(self) -> bool:
+        """Reserve a slot for an outbound Twilio call request"""
+        with self._lock:
+            if (self.pending_dispatches >= self.max_pending_dispatches
+                    or not self.has_capacity()):
+                self.rejected_dispatches += 1
+                return False
+            self.pending_dispatches += 1
+            return True
+
+    def release_dispatch(self):
+        with self._lock:
+            self.pending_dispatches = max(0, self.pending_dispatches - 1)
+
+    async def monitor_loop_lag(self, interval: float = 0.5):
+        """Measure how late the event loop wakes up; runs for the life of the worker"""
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            lag_ms = max(0.0, (loop.time() - started - interval) * 1000)
+            # Smooth the signal so a single slow tick does not flap readiness
+            self.loop_lag_ms = 0.8 * self.loop_lag_ms + 0.2 * lag_ms
+            if self.is_overloaded():
+                logger.warning(f"Event loop lag {self.loop_lag_ms:.1f}ms exceeds {self.max_loop_lag_ms}ms")
+
+    def readiness(self) -> Dict[str, Any]:
+        return {
+            "ready": self.has_capacity(),
+            "draining": self.draining,
+            "active_calls": self.active_calls,
+            "max_calls": self.max_calls,
+            "headroom": self.headroom(),
+            "pending_dispatches": self.pending_dispatches,
+            "loop_lag_ms": round(self.loop_lag_ms, 1),
+            "rejected_calls": self.rejected_calls,
+            "rejected_dispatches": self.rejected_dispatches
+        }
+
+
+capacity = CapacityLimiter(MAX_CONCURRENT_CALLS, MAX_PENDING_DISPATCHES, MAX_LOOP_LAG_MS)
+metrics.register_collector("capacity", capacity.readiness)
@@ -0,0 +1,152 @@
+# app/services/drain.py
+import asyncio
+import logging
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import DRAIN_TIMEOUT_SECONDS
+from app.services.capacity import capacity
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.5
+PROGRESS_LOG_INTERVAL = 10.0
+
+
+class DrainController:
+    """Drain lifecycle for a worker: serving -> draining -> drained.
+
+    Draining marks the capacity limiter so readiness fails and no new media
+    streams or dispatches are admitted, waits for live bridges and in-flight
+    dispatches to finish (up to a deadline), then flushes the buffered writers.
+    """
+
+    def __init__(self, timeout_seconds: float = DRAIN_TIMEOUT_SECONDS):
+        self.timeout_seconds = timeout_seconds
+        self.state = "serving"
+        self.reason: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.deadline: Optional[float] = None
+        self.calls_at_start = 0
+        self.calls_cut = 0
+        self.flush_results: Dict[str, bool] = {}
+        self._flushers: Dict[str, Callable[[], bool]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._on_drained: Optional[Callable[[], None]] = None
+
+    def register_flush(self, name: str, flush: Callable[[], bool]):
+        """Register a blocking flush to run once bridges are done"""
+        self._flushers[name] = flush
+
+    def begin(self, reason: str, timeout_seconds: Optional[float] = None,
+              on_drained: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+        """Start draining; calling it again while draining only reports progress"""
+        if on_drained is not None:
+            self._on_drained = on_drained
+        if self.state != "serving":
+            if self.state == "drained" and on_drained is not None:
+                on_drained()
+            return self.progress()
+        capacity.draining = True
+        self.state = "draining"
+        self.reason = reason
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + (self.timeout_seconds if timeout_seconds is None else timeout_seconds)
+        self.calls_at_start = capacity.active_calls
+        metrics.increment("drains_started")
+        logger.warning(f"Draining worker ({reason}): {self.calls_at_start} active calls, "
+                       f"deadline {self.deadline - self.started_at:.0f}s")
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self.progress()
+
+    def cancel(self) -> bool:
+        """Return to serving; not possible once finished or when an exit is pending"""
+        if self.state != "draining" or self._on_drained is not None:
+            return False
+        self._task.cancel()
+        capacity.draining = False
+        self.state = "serving"
+        logger.warning("Drain cancelled, worker is serving again")
+        return True
+
+    async def _run(self):
+        last_log = time.monotonic()
+        while capacity.active_calls or capacity.pending_dispatches:
+            now = time.monotonic()
+            if now >= self.deadline:
+                self.calls_cut = capacity.active_calls
+                metrics.increment("drain_calls_cut", self.calls_cut)
+                logger.warning(f"Drain deadline reached with {self.calls_cut} calls still active")
+                break
+            if now - last_log >= PROGRESS_LOG_INTERVAL:
+                last_log = now
+                logger.info(f"Draining: {capacity.active_calls}/{self.calls_at_start} calls, "
+                            f"{capacity.pending_dispatches} dispatches left, "
+                            f"{self.deadline - now:.0f}s to deadline")
+            await asyncio.sleep(POLL_INTERVAL)
+
+        self.flush_results = await run_in_threadpool(self._flush_all)
+        for handler in logging.getLogger().handlers:
+            handler.flush()
+        self.state = "drained"
+        self.finished_at = time.monotonic()
+        logger.warning(f"Worker drained in {self.finished_at - self.started_at:.1f}s: {self.progress()}")
+        if self._on_drained is not None:
+            self._on_drained()
+
+    def _flush_all(self) -> Dict[str, bool]:
+        results = {}
+        for name, flush in self._flushers.items():
+            try:
+                results[name] = bool(flush())
+            except Exception as e:
+                logger.error(f"Drain flush of {name} failed: {e}")
+                results[name] = False
+        return results
+
+    def progress(self) -> Dict[str, Any]:
+        now = self.finished_at or time.monotonic()
+        return {
+            "state": self.state,
+            "reason": self.reason,
+            "elapsed_s": round(now - self.started_at, 1) if self.started_at else None,
+            "deadline_in_s": round(max(0.0, self.deadline - now), 1) if self.deadline and self.state == "draining" else None,
+            "calls_at_start": self.calls_at_start,
+            "active_calls": capacity.active_calls,
+            "pending_dispatches": capacity.pending_dispatches,
+            "calls_cut": self.calls_cut,
+            "flushed": self.flush_results
+        }
+
+    def install_signal_handler(self):
+        """Turn SIGTERM into a drain; the server's own handler runs once drained.
+
+        Must be called from the running loop after the server has installed its
+        handlers (i.e. in the startup event). A second SIGTERM exits immediately.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        loop = asyncio.get_running_loop()
+        previous = signal.getsignal(signal.SIGTERM) or signal.SIG_DFL
+
+        def exit_now():
+            signal.signal(signal.SIGTERM, previous)
+            signal.raise_signal(signal.SIGTERM)
+
+        def handle_sigterm(signum, frame):
+            if self._on_drained is None:
+                loop.call_soon_threadsafe(self.begin, "SIGTERM", None, exit_now)
+            else:
+                exit_now()
+
+        signal.signal(signal.SIGTERM, handle_sigterm)
+
+
+drain_controller = DrainController()
+metrics.register_collector("drain", drain_controller.progress)
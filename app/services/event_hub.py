@@ -0,0 +1,179 @@
+# app/services/event_hub.py
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from app.config import EVENT_HUB_QUEUE_SIZE, EVENT_HUB_HEARTBEAT_SECONDS, EVENT_HUB_MAX_STREAMS_PER_USER
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class HubEvent:
+    """One published event, serialized once however many subscribers receive it"""
+
+    __slots__ = ("text", "_sse")
+
+    def __init__(self, event: str, data: Any = None):
+        self.text = json.dumps({"event": event, "data": data})
+        self._sse: Optional[bytes] = None
+
+    @property
+    def sse(self) -> bytes:
+        if self._sse is None:
+            self._sse = f"data: {self.text}\n\n".encode()
+        return self._sse
+
+
+HEARTBEAT = HubEvent("heartbeat")
+
+
+class Subscriber:
+    """One SSE or WebSocket stream: a bounded queue and a wake-up flag, no task of its own"""
+
+    __slots__ = ("user_id", "max_queue", "_queue", "_wake", "idle", "closed", "close_reason")
+
+    def __init__(self, user_id: int, max_queue: int):
+        self.user_id = user_id
+        self.max_queue = max_queue
+        self._queue: Deque[HubEvent] = deque()
+        self._wake = asyncio.Event()
+        self.idle = True  # nothing delivered since the last heartbeat tick
+        self.closed = False
+        self.close_reason: Optional[str] = None
+
+    def offer(self, event: HubEvent) -> bool:
+        """Queue an event; False when the queue is full and the subscriber should go"""
+        if len(self._queue) >= self.max_queue:
+            return False
+        self._queue.append(event)
+        self.idle = False
+        self._wake.set()
+        return True
+
+    def close(self, reason: str):
+        self.closed = True
+        self.close_reason = reason
+        self._queue.clear()
+        self._wake.set()
+
+    async def next(self) -> Optional[HubEvent]:
+        """The next event, or None once the subscriber has been closed"""
+        while not self._queue:
+            if self.closed:
+                return None
+            self._wake.clear()
+            await self._wake.wait()
+        return None if self.closed else self._queue.popleft()
+
+
+class EventHub:
+    """In-process pub/sub of live call events, fanned out per user.
+
+    The media bridge and Twilio status callbacks publish; each of the user's
+    streams gets the event in its bounded queue. A subscriber whose queue fills
+    up (a stalled client) is closed rather than allowed to hold memory, and one
+    hub-wide tick sends heartbeats only to streams that were otherwise idle.
+    Publish and subscribe from the event loop.
+    """
+
+    def __init__(self, max_queue: int = EVENT_HUB_QUEUE_SIZE,
+                 heartbeat_seconds: float = EVENT_HUB_HEARTBEAT_SECONDS,
+                 max_streams_per_user: int = EVENT_HUB_MAX_STREAMS_PER_USER):
+        self.max_queue = max_queue
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_streams_per_user = max_streams_per_user
+        self._users: Dict[int, Dict[Subscriber, None]] = {}  # insertion-ordered, oldest first
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.delivered = 0
+        self.evicted = 0
+        self.heartbeats = 0
+
+    def subscribe(self, user_id: int) -> Subscriber:
+        subscriber = Subscriber(user_id, self.max_queue)
+        streams = self._users.setdefault(user_id, {})
+        if len(streams) >= self.max_streams_per_user:
+            # A reconnecting client often leaves its old stream behind; the newest one wins
+            self._remove(next(iter(streams)), "too many streams")
+            streams = self._users.setdefault(user_id, {})
+        streams[subscriber] = None
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        streams = self._users.get(subscriber.user_id)
+        if streams is not None:
+            streams.pop(subscriber, None)
+            if not streams:
+                del self._users[subscriber.user_id]
+
+    def _remove(self, subscriber: Subscriber, reason: str):
+        subscriber.close(reason)
+        self.unsubscribe(subscriber)
+
+    def _deliver(self, subscriber: Subscriber, event: HubEvent):
+        if subscriber.offer(event):
+            self.delivered += 1
+            return
+        self.evicted += 1
+        metrics.increment("event_subscribers_evicted")
+        logger.warning(f"Evicting slow event subscriber for user {subscriber.user_id} "
+                       f"({subscriber.max_queue} events queued)")
+        self._remove(subscriber, "slow consumer")
+
+    def publish(self, user_id: Optional[int], event: str, data: Any = None) -> int:
+        """Send an event to the user's streams; free when nobody is listening"""
+        streams = self._users.get(user_id)
+        if not streams:
+            return 0
+        message = HubEvent(event, data)
+        self.published += 1
+        for subscriber in list(streams):
+            self._deliver(subscriber, message)
+        return len(streams)
+
+    def tick(self):
+        """Heartbeat every stream that received nothing since the last tick"""
+        for streams in list(self._users.values()):
+            for subscriber in list(streams):
+                if subscriber.idle:
+                    self.heartbeats += 1
+                    self._deliver(subscriber, HEARTBEAT)
+                subscriber.idle = True
+
+    async def heartbeat_loop(self):
+        self._loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Event hub heartbeat failed: {e}")
+
+    def close_all(self, reason: str = "shutdown"):
+        for streams in list(self._users.values()):
+            for subscriber in list(streams):
+                self._remove(subscriber, reason)
+
+    def shutdown(self) -> bool:
+        """Drain flush: end every stream so clients reconnect to another worker"""
+        if self._loop is None:
+            return True
+        self._loop.call_soon_threadsafe(self.close_all, "draining")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._users),
+            "subscribers": sum(len(streams) for streams in self._users.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "heartbeats": self.heartbeats,
+            "evicted": self.evicted
+        }
+
+
+event_hub = EventHub()
+metrics.register_collector("event_hub", event_hub.stats)
@@ -0,0 +1,135 @@
+# app/services/greeting_cache.py
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+from typing import Dict, NamedTuple, Optional
+
+from app.config import GREETING_CACHE_DIR
+from app.services.scenario_registry import CompiledScenario, scenario_registry
+
+logger = logging.getLogger(__name__)
+
+ULAW_FRAME_BYTES = 160  # 20 ms of 8 kHz G.711 mu-law
+
+
+class Greeting(NamedTuple):
+    scenario: str
+    version: str
+    text: str
+    audio: mmap.mmap  # raw mu-law, memory-mapped read-only
+
+
+def greeting_version(scenario: CompiledScenario) -> str:
+    """Cache entries are invalidated whenever the scenario text or voice changes"""
+    source = "\n".join([scenario.voice, scenario.persona, scenario.prompt, scenario.greeting or ""])
+    return hashlib.sha256(source.encode()).hexdigest()[:12]
+
+
+def greeting_path(scenario_name: str, version: str) -> str:
+    return os.path.join(GREETING_CACHE_DIR, f"{scenario_name}.{version}.ulaw")
+
+
+class GreetingCache:
+    """Opening utterances per scenario, stored on disk as raw mu-law and memory-mapped"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._greetings: Dict[str, Greeting] = {}
+        self._registry_version: Optional[str] = None
+        self._refreshing = False
+
+    def load(self):
+        """Map every greeting that matches the current scenario registry"""
+        state = scenario_registry.state
+        greetings = {}
+        for name, scenario in state.scenarios.items():
+            if not scenario.greeting:
+                continue
+            version = greeting_version(scenario)
+            path = greeting_path(name, version)
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                logger.warning(f"No cached greeting for scenario {name} (expected {path})")
+                continue
+            with open(path, "rb") as f:
+                audio = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            greetings[name] = Greeting(name, version, scenario.greeting, audio)
+
+        # Calls still streaming an old greeting keep their own reference to its mapping
+        with self._lock:
+            self._greetings = greetings
+            self._registry_version = state.version
+        logger.info(f"Loaded {len(greetings)} cached greetings from {GREETING_CACHE_DIR}")
+
+    def get(self, scenario_name: str) -> Optional[Greeting]:
+        """Never touches the disk: greetings are mapped at startup and, after a scenario
+        reload, remapped in a worker thread. Call from the event loop."""
+        greeting = self._greetings.get(scenario_name)
+        if self._registry_version == scenario_registry.version:
+            return greeting
+        self._refresh_soon()
+        # Until the refresh lands, only serve greetings whose scenario text is unchanged
+        scenario = scenario_registry.get(scenario_name)
+        if greeting is None or scenario is None or greeting_version(scenario) != greeting.version:
+            return None
+        return greeting
+
+    def _refresh_soon(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        asyncio.get_running_loop().run_in_executor(None, self._refresh)
+
+    def _refresh(self):
+        try:
+            self.load()
+        except Exception as e:
+            logger.error(f"Greeting cache refresh failed: {e}")
+        finally:
+            self._refreshing = False
+
+    @staticmethod
+    def conversation_item(greeting: Greeting) -> str:
+        """conversation.item.create telling the model what it has already said"""
+        return json.dumps({
+            "type": "conversation.item.create",
+            "item": {
+                "type": "message",
+                "role": "assistant",
+                "content": [{"type": "text", "text": greeting.text}]
+            }
+        })
+
+
+greeting_cache = GreetingCache()
+
+
+def write_greeting(scenario_name: str, audio: bytes) -> str:
+    """Store greeting audio for the current scenario version and remove stale versions"""
+    scenario = scenario_registry.get(scenario_name)
+    if scenario is None or not scenario.greeting:
+        raise ValueError(f"Scenario {scenario_name} has no greeting configured")
+    if not audio:
+        raise ValueError(f"No audio captured for scenario {scenario_name}")
+
+    os.makedirs(GREETING_CACHE_DIR, exist_ok=True)
+    path = greeting_path(scenario_name, greeting_version(scenario))
+    # Pad to a whole number of 20 ms frames with mu-law silence
+    remainder = len(audio) % ULAW_FRAME_BYTES
+    if remainder:
+        audio += b"\xff" * (ULAW_FRAME_BYTES - remainder)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(audio)
+    os.replace(tmp_path, path)
+
+    for stale in glob.glob(os.path.join(GREETING_CACHE_DIR, f"{scenario_name}.*.ulaw")):
+        if stale != path:
+            os.remove(stale)
+    return path
@@ -0,0 +1,261 @@
+# app/services/idempotency.py
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+
+from app.config import IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_WAIT_SECONDS
+from app.db import SessionLocal
+from app.models import IdempotencyKey
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+PENDING_TTL_SECONDS = 120  # a claim left behind by a crashed worker frees up after this
+POLL_INTERVAL = 0.25
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    status_code: int
+    body: Any  # JSON-compatible
+    expires_at: datetime.datetime
+
+
+async def request_fingerprint(request: Request) -> str:
+    """Identify the request a key was first used with (method, path, query and body)"""
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.url.path}?{request.url.query}\n".encode())
+    digest.update(await request.body())
+    return digest.hexdigest()
+
+
+class IdempotencyStore:
+    """Replays the first response for a repeated Idempotency-Key.
+
+    Completed responses live in a bounded in-memory LRU in front of the
+    idempotency_keys table. Duplicates that arrive while the first request is
+    still running wait on it: in this process through a shared future, across
+    workers by polling the claimed row.
+    """
+
+    def __init__(self, max_entries: int = IDEMPOTENCY_CACHE_SIZE, ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = datetime.timedelta(seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[int, str], StoredResponse]" = OrderedDict()
+        self._inflight: Dict[Tuple[int, str], asyncio.Future] = {}
+
+    def _cache_get(self, cache_key: Tuple[int, str]) -> Optional[StoredResponse]:
+        with self._lock:
+            stored = self._cache.get(cache_key)
+            if stored is None:
+                return None
+            if stored.expires_at <= datetime.datetime.utcnow():
+                del self._cache[cache_key]
+                return None
+            self._cache.move_to_end(cache_key)
+            return stored
+
+    def _cache_put(self, cache_key: Tuple[int, str], stored: StoredResponse):
+        with self._lock:
+            self._cache[cache_key] = stored
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _claim(self, user_id: int, key: str, fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        """Insert an in-flight row for the key: ("claimed" | "done" | "pending", stored)"""
+        now = datetime.datetime.utcnow()
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key,
+                IdempotencyKey.expires_at <= now
+            ).delete(synchronize_session=False)
+            db.add(IdempotencyKey(
+                user_id=user_id,
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=now + datetime.timedelta(seconds=PENDING_TTL_SECONDS)
+            ))
+            try:
+                db.commit()
+                return "claimed", None
+            except IntegrityError:
+                db.rollback()
+            return self._lookup(db, user_id, key)
+        finally:
+            db.close()
+
+    def _lookup(self, db, user_id: int, key: str) -> Tuple[str, Optional[StoredResponse]]:
+        row = db.query(IdempotencyKey).filter(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key
+        ).first()
+        if row is None:
+            return "missing", None
+        if row.status_code is None:
+            return "pending", StoredResponse(row.fingerprint, 0, None, row.expires_at)
+        return "done", StoredResponse(row.fingerprint, row.status_code, json.loads(row.response_body), row.expires_at)
+
+    def _poll(self, user_id: int, key: str) -> Tuple[str, Optional[StoredResponse]]:
+        db = SessionLocal()
+        try:
+            return self._lookup(db, user_id, key)
+        finally:
+            db.close()
+
+    def _complete(self, user_id: int, key: str, stored: StoredResponse):
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key
+            ).update({
+                IdempotencyKey.status_code: stored.status_code,
+                IdempotencyKey.response_body: json.dumps(stored.body),
+                IdempotencyKey.expires_at: stored.expires_at
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _release(self, user_id: int, key: str):
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code.is_(None)
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _replay(stored: StoredResponse, fingerprint: str) -> JSONResponse:
+        if stored.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request"
+            )
+        metrics.increment("idempotent_replays")
+        return JSONResponse(content=stored.body, status_code=stored.status_code,
+                            headers={"Idempotent-Replayed": "true"})
+
+    async def run(
+        self,
+        user_id: int,
+        key: Optional[str],
+        fingerprint: str,
+        handler: Callable[[], Awaitable[Any]]
+    ):
+        """Run `handler` once per (user, key); repeats get the first successful response"""
+        if key is None:
+            return await handler()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Idempotency-Key")
+
+        cache_key = (user_id, key)
+        stored = self._cache_get(cache_key)
+        if stored is not None:
+            return self._replay(stored, fingerprint)
+
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            metrics.increment("idempotent_waits")
+            stored = await asyncio.shield(inflight)
+            return self._replay(stored, fingerprint)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + IDEMPOTENCY_WAIT_SECONDS
+            waited = False
+            while True:
+                state, stored = await run_in_threadpool(self._claim, user_id, key, fingerprint)
+                if state == "pending":
+                    # Another worker owns the key; wait for it to finish
+                    if stored.fingerprint != fingerprint:
+                        return self._replay(stored, fingerprint)
+                    if not waited:
+                        waited = True
+                        metrics.increment("idempotent_waits")
+                    while state == "pending" and loop.time() < deadline:
+                        await asyncio.sleep(POLL_INTERVAL)
+                        state, stored = await run_in_threadpool(self._poll, user_id, key)
+                # "missing": the row we collided with was released or purged before we could
+                # read it; claim again rather than run the handler without owning the key
+                if state != "missing" or loop.time() >= deadline:
+                    break
+            if state == "done":
+                self._cache_put(cache_key, stored)
+                future.set_result(stored)
+                return self._replay(stored, fingerprint)
+            if state != "claimed":
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still in progress"
+                )
+
+            try:
+                result = await handler()
+            except BaseException:
+                await run_in_threadpool(self._release, user_id, key)
+                raise
+            stored = StoredResponse(
+                fingerprint,
+                status.HTTP_200_OK,
+                jsonable_encoder(result),
+                datetime.datetime.utcnow() + self.ttl
+            )
+            await run_in_threadpool(self._complete, user_id, key, stored)
+            self._cache_put(cache_key, stored)
+            future.set_result(stored)
+            return result
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+                future.exception()  # waiters re-raise it; don't log "never retrieved"
+            raise
+        finally:
+            self._inflight.pop(cache_key, None)
+
+    def purge_expired(self) -> int:
+        """Drop expired keys from the table; the LRU expires entries on read"""
+        db = SessionLocal()
+        try:
+            removed = db.query(IdempotencyKey).filter(
+                IdempotencyKey.expires_at <= datetime.datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
+    async def purge_loop(self, interval: float = 3600):
+        while True:
+            try:
+                removed = await run_in_threadpool(self.purge_expired)
+                if removed:
+                    logger.info(f"Purged {removed} expired idempotency keys")
+            except Exception as e:
+                logger.error(f"Idempotency key purge failed: {e}")
+            await asyncio.sleep(interval)
+
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,37 @@
+# app/services/metrics.py
+import threading
+from typing import Callable, Dict, Any
+
+
+class MetricsRegistry:
+    """Process-wide counters, gauges and snapshot collectors exposed on /metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def increment(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        self._gauges[name] = value
+
+    def register_collector(self, name: str, collector: Callable[[], Dict[str, Any]]):
+        """Register a callable whose result is included in every snapshot"""
+        self._collectors[name] = collector
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            data = {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges)
+            }
+        for name, collector in self._collectors.items():
+            data[name] = collector()
+        return data
+
+
+metrics = MetricsRegistry()
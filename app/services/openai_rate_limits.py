@@ -0,0 +1,115 @@
+# app/services/openai_rate_limits.py
+import asyncio
+import logging
+import threading
+import time
+from typing import List, Dict, Any
+
+from app.config import (
+    OPENAI_MIN_REQUESTS_HEADROOM,
+    OPENAI_MIN_TOKENS_HEADROOM,
+    OPENAI_SESSION_MAX_WAIT_SECONDS
+)
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitTracker:
+    """Process-wide estimate of OpenAI headroom, fed by rate_limits.updated events
+
+    Every active Realtime session reports the same organisation-wide limits, so the
+    most recent event from any session is the freshest estimate we have.
+    """
+
+    def __init__(self, min_requests: int, min_tokens: int):
+        self.min_headroom = {"requests": min_requests, "tokens": min_tokens}
+        self._lock = threading.Lock()
+        # name -> {"limit", "remaining", "reset_at"} (reset_at is time.monotonic based)
+        self._limits: Dict[str, Dict[str, float]] = {}
+        self.updates = 0
+        self.deferred = 0
+        self.refused = 0
+
+    def update(self, rate_limits: List[Dict[str, Any]]):
+        """Apply the rate_limits array from a rate_limits.updated event"""
+        now = time.monotonic()
+        with self._lock:
+            for entry in rate_limits or []:
+                name = entry.get("name")
+                if name is None:
+                    continue
+                self._limits[name] = {
+                    "limit": entry.get("limit", 0),
+                    "remaining": entry.get("remaining", 0),
+                    "reset_at": now + float(entry.get("reset_seconds") or 0)
+                }
+            self.updates += 1
+
+    def _remaining(self, name: str, now: float):
+        entry = self._limits.get(name)
+        if entry is None:
+            return None
+        # Once the window has reset the full limit is available again
+        if now >= entry["reset_at"]:
+            return entry["limit"]
+        return entry["remaining"]
+
+    def retry_after(self) -> float:
+        """Seconds until there is enough headroom for a new session (0 when available now)"""
+        now = time.monotonic()
+        wait = 0.0
+        with self._lock:
+            for name, minimum in self.min_headroom.items():
+                remaining = self._remaining(name, now)
+                if remaining is not None and remaining < minimum:
+                    wait = max(wait, self._limits[name]["reset_at"] - now)
+        return wait
+
+    def has_headroom(self) -> bool:
+        return self.retry_after() <= 0
+
+    def reserve_session(self):
+        """Count a session we are about to open against the request budget until the next update"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._limits.get("requests")
+            if entry is not None and now < entry["reset_at"]:
+                entry["remaining"] = max(0, entry["remaining"] - 1)
+
+    async def wait_for_headroom(self, max_wait: float = OPENAI_SESSION_MAX_WAIT_SECONDS) -> bool:
+        """Hold a new session briefly if the window resets soon; False means refuse it"""
+        wait = self.retry_after()
+        if wait <= 0:
+            return True
+        if wait > max_wait:
+            self.refused += 1
+            logger.warning(f"OpenAI rate limit exhausted, refusing session (resets in {wait:.1f}s)")
+            return False
+        self.deferred += 1
+        logger.info(f"OpenAI rate limit low, holding session for {wait:.1f}s")
+        await asyncio.sleep(wait)
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            limits = {
+                name: {
+                    "limit": entry["limit"],
+                    "remaining": self._remaining(name, now),
+                    "reset_seconds": round(max(0.0, entry["reset_at"] - now), 2)
+                }
+                for name, entry in self._limits.items()
+            }
+        return {
+            "limits": limits,
+            "retry_after": round(self.retry_after(), 2),
+            "updates": self.updates,
+            "deferred_sessions": self.deferred,
+            "refused_sessions": self.refused
+        }
+
+
+rate_limits = RateLimitTracker(OPENAI_MIN_REQUESTS_HEADROOM, OPENAI_MIN_TOKENS_HEADROOM)
+metrics.register_collector("openai_rate_limits", rate_limits.snapshot)
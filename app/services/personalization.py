@@ -0,0 +1,215 @@
+# app/services/personalization.py
+import base64
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from collections import OrderedDict
+from string import Template
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import SECRET_KEY, INSTRUCTION_CACHE_SIZE, CALL_CONTEXT_MAX_AGE_SECONDS
+from app.db import SessionLocal
+from app.models import User, UserScenario, CUSTOM_SCENARIO_PREFIX
+from app.services.scenario_registry import CompiledScenario, compile_scenario, scenario_registry
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[int, str, str]  # (user_id, scenario_id, version)
+
+
+class CallContext(NamedTuple):
+    """Identity carried from dispatch to the media stream in a signed Stream parameter"""
+    user_id: int
+    scenario_id: str
+    version: str
+
+
+def parse_custom_scenario_id(scenario_id: str) -> Optional[int]:
+    """Return the UserScenario id for a "custom-<id>" key, or None for global scenarios"""
+    if not scenario_id.startswith(CUSTOM_SCENARIO_PREFIX):
+        return None
+    try:
+        return int(scenario_id[len(CUSTOM_SCENARIO_PREFIX):])
+    except ValueError:
+        return None
+
+
+def is_known_scenario_id(scenario_id: str) -> bool:
+    """Cheap syntactic check used where no user or DB session is available"""
+    return scenario_id in scenario_registry or parse_custom_scenario_id(scenario_id) is not None
+
+
+def user_template_fields(user: User) -> Dict[str, str]:
+    name = (user.name or "").strip()
+    return {
+        "name": name or "friend",
+        "first_name": name.split()[0] if name else "friend"
+    }
+
+
+def render_template(text: str, fields: Dict[str, str]) -> str:
+    """Substitute $name-style user fields; unknown placeholders are left untouched"""
+    return Template(text).safe_substitute(fields)
+
+
+class InstructionCache:
+    """Bounded LRU of compiled, personalized scenarios keyed by (user, scenario, version)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, CompiledScenario]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey) -> Optional[CompiledScenario]:
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return compiled
+
+    def put(self, key: CacheKey, compiled: CompiledScenario):
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int, scenario_id: Optional[str] = None):
+        """Drop every cached version for a user, or for one of the user's scenarios"""
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if key[0] == user_id and (scenario_id is None or key[1] == scenario_id)
+            ]
+            for key in stale:
+                del self._entries[key]
+
+
+instruction_cache = InstructionCache(INSTRUCTION_CACHE_SIZE)
+
+
+def _compile_for_user(
+    user: User,
+    scenario_id: str,
+    user_scenario: Optional[UserScenario],
+    version: str
+) -> Optional[CompiledScenario]:
+    fields = user_template_fields(user)
+    state = scenario_registry.state
+    name_line = f"The person you are speaking with is called {user.name.strip()}." if user.name and user.name.strip() else None
+
+    if user_scenario is None:
+        base = state.scenarios.get(scenario_id)
+        if base is None:
+            return None
+        return compile_scenario(
+            name=scenario_id,
+            system_message=state.system_message,
+            persona=render_template(base.persona, fields),
+            prompt=render_template(base.prompt, fields),
+            voice=base.voice,
+            temperature=base.temperature,
+            turn_detection=base.turn_detection,
+            version=version,
+            extra_instructions=name_line,
+            greeting=base.greeting
+        )
+
+    return compile_scenario(
+        name=scenario_id,
+        system_message=state.system_message,
+        persona=render_template(user_scenario.persona, fields),
+        prompt=render_template(user_scenario.prompt, fields),
+        voice=user_scenario.voice or state.defaults.voice,
+        temperature=user_scenario.temperature if user_scenario.temperature is not None else state.defaults.temperature,
+        turn_detection=state.defaults.turn_detection,
+        version=version,
+        extra_instructions=name_line
+    )
+
+
+def resolve_scenario(db: Session, user: User, scenario_id: str) -> Optional[CompiledScenario]:
+    """Compile (or fetch from cache) a scenario personalized for this user; None if unknown"""
+    custom_id = parse_custom_scenario_id(scenario_id)
+    user_scenario = None
+    if custom_id is None:
+        if scenario_id not in scenario_registry:
+            return None
+    else:
+        user_scenario = db.query(UserScenario).filter(
+            UserScenario.id == custom_id,
+            UserScenario.user_id == user.id
+        ).first()
+        if user_scenario is None:
+            return None
+
+    # The version covers the registry, the user's scenario and the user fields it renders,
+    # so an edit anywhere changes the key on every worker
+    fields_tag = hashlib.sha1((user.name or "").encode()).hexdigest()[:8]
+    version = f"{scenario_registry.version}.{user_scenario.version if user_scenario else 0}.{fields_tag}"
+
+    key = (user.id, scenario_id, version)
+    compiled = instruction_cache.get(key)
+    if compiled is None:
+        compiled = _compile_for_user(user, scenario_id, user_scenario, version)
+        instruction_cache.put(key, compiled)
+    return compiled
+
+
+def get_cached_for_context(ctx: CallContext) -> Optional[CompiledScenario]:
+    """Hot-path lookup for the media stream; no DB access"""
+    return instruction_cache.get((ctx.user_id, ctx.scenario_id, ctx.version))
+
+
+def load_for_context(ctx: CallContext) -> Optional[CompiledScenario]:
+    """Cache-miss path for the media stream: resolve the call context from the DB"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == ctx.user_id).first()
+        if user is None:
+            return None
+        return resolve_scenario(db, user, ctx.scenario_id)
+    finally:
+        db.close()
+
+
+def _signature(payload: bytes) -> str:
+    digest = hmac.new(SECRET_KEY, payload, hashlib.sha256).digest()[:16]
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def sign_call_context(user_id: int, compiled: CompiledScenario) -> str:
+    """Compact signed token passed through the webhook to the Stream's customParameters"""
+    expires = int(time.time()) + CALL_CONTEXT_MAX_AGE_SECONDS
+    payload = f"{user_id}:{compiled.version}:{expires}:{compiled.name}".encode()
+    encoded = base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+    return f"{encoded}.{_signature(payload)}"
+
+
+def verify_call_context(token: Optional[str]) -> Optional[CallContext]:
+    """Return the call context if the token is authentic and unexpired"""
+    if not token or "." not in token:
+        return None
+    encoded, signature = token.rsplit(".", 1)
+    try:
+        payload = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+    except ValueError:
+        return None
+    if not hmac.compare_digest(signature, _signature(payload)):
+        return None
+    try:
+        user_id, version, expires, scenario_id = payload.decode().split(":", 3)
+        if int(expires) < time.time():
+            return None
+        return CallContext(int(user_id), scenario_id, version)
+    except ValueError:
+        return None
@@ -0,0 +1,292 @@
+# app/services/rate_limiter.py
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from jose import JWTError, jwt
+
+from app.config import (
+    SECRET_KEY,
+    ALGORITHM,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_SQLITE_PATH,
+    RATE_LIMIT_TRUST_FORWARDED,
+    RATE_LIMIT_TRUSTED_HOPS,
+    RATE_LIMIT_AUTH,
+    RATE_LIMIT_CALLS,
+    RATE_LIMIT_API
+)
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SWEEP_INTERVAL = 60.0
+TOKEN_CACHE_SIZE = 16384
+
+
+class RateRule(NamedTuple):
+    name: str
+    capacity: float  # burst size
+    rate: float  # tokens refilled per second
+    by_user: bool  # key by the bearer token's user, falling back to client IP
+
+
+def parse_limit(name: str, spec: str, by_user: bool) -> RateRule:
+    """Parse "<requests>/<seconds>", e.g. "10/60" is a burst of 10 refilled over a minute"""
+    count, _, period = spec.partition("/")
+    capacity = float(count)
+    return RateRule(name, capacity, capacity / float(period or 1), by_user)
+
+
+class MemoryBucketStore:
+    """Per-process token buckets: key -> (tokens, last refill time).
+
+    A bucket idle long enough to have refilled is indistinguishable from a
+    missing one, so the periodic sweep simply drops it.
+    """
+
+    blocking = False
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._idle_after: Dict[str, float] = {}  # rule name -> seconds to refill
+        self._next_sweep = time.time() + SWEEP_INTERVAL
+
+    def take(self, key: str, rule: RateRule, now: float) -> float:
+        """Spend one token; returns 0 if allowed, else seconds until a token is available"""
+        if now >= self._next_sweep:
+            self._sweep(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = rule.capacity
+            self._idle_after[rule.name] = rule.capacity / rule.rate
+        else:
+            tokens = min(rule.capacity, bucket[0] + (now - bucket[1]) * rule.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rule.rate
+        self._buckets[key] = (tokens - 1, now)
+        return 0.0
+
+    def _sweep(self, now: float):
+        self._next_sweep = now + SWEEP_INTERVAL
+        idle_after = max(self._idle_after.values(), default=0)
+        stale = [key for key, (_, updated) in self._buckets.items() if now - updated >= idle_after]
+        for key in stale:
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """Buckets in a local SQLite file so every worker on the host shares one budget.
+
+    Stands in for a networked store; each check is a single short write
+    transaction on a WAL database.
+    """
+
+    blocking = True  # waits on other workers' write locks (up to the 1 s busy timeout)
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._next_sweep = time.time() + SWEEP_INTERVAL
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS buckets "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL) WITHOUT ROWID"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, rule: RateRule, now: float) -> float:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if now >= self._next_sweep:
+                self._next_sweep = now + SWEEP_INTERVAL
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - 24 * 60 * 60,))
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = rule.capacity if row is None else min(rule.capacity, row[0] + (now - row[1]) * rule.rate)
+            allowed = tokens >= 1
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, tokens - 1 if allowed else tokens, now)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return 0.0 if allowed else (1 - tokens) / rule.rate
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+
+class RateLimiter:
+    """Maps a request to a route class and a client key, and checks its bucket"""
+
+    def __init__(self, store, rules: Dict[str, RateRule]):
+        self.store = store
+        self.rules = rules
+        # Exact paths first, then prefixes; anything else (webhooks, media
+        # stream, health checks) is never throttled
+        self._exact: Dict[str, RateRule] = {
+            "/token": rules["auth"],
+            "/auth/login": rules["auth"],
+            "/auth/register": rules["auth"],
+            "/auth/refresh": rules["auth"],
+            "/schedule-call": rules["calls"],
+            "/mobile/make-call": rules["calls"]
+        }
+        self._prefixes: List[Tuple[str, RateRule]] = [
+            ("/make-call/", rules["calls"]),
+            ("/mobile/", rules["api"]),
+            ("/user/", rules["api"]),
+            ("/users/", rules["api"]),
+            ("/scenarios", rules["api"]),
+            ("/transcripts/", rules["api"]),
+            ("/calls", rules["api"])
+        ]
+        self._token_users: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def rule_for(self, path: str) -> Optional[RateRule]:
+        rule = self._exact.get(path)
+        if rule is not None:
+            return rule
+        for prefix, rule in self._prefixes:
+            if path.startswith(prefix):
+                return rule
+        return None
+
+    def _user_for_token(self, token: str) -> Optional[str]:
+        """Verified user key for a bearer token, cached so each token is decoded once"""
+        cached = self._token_users.get(token)
+        if cached is not None:
+            if cached[1] > time.time():
+                return cached[0]
+            del self._token_users[token]
+            return None
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+        user = payload.get("user_id") or payload.get("sub")
+        if user is None:
+            return None
+        self._token_users[token] = (f"user:{user}", payload.get("exp", math.inf))
+        if len(self._token_users) > TOKEN_CACHE_SIZE:
+            self._token_users.popitem(last=False)
+        return f"user:{user}"
+
+    def client_key(self, scope, rule: RateRule) -> str:
+        forwarded = []
+        for name, value in scope["headers"]:
+            if rule.by_user and name == b"authorization" and value[:7].lower() == b"bearer ":
+                user = self._user_for_token(value[7:].decode("latin-1"))
+                if user is not None:
+                    return user
+            elif RATE_LIMIT_TRUST_FORWARDED and name == b"x-forwarded-for":
+                forwarded.extend(hop.strip() for hop in value.split(b","))
+        if forwarded:
+            # Clients can put anything on the left; each trusted proxy appends the address
+            # it saw on the right, so the client is RATE_LIMIT_TRUSTED_HOPS from the end
+            return f"ip:{forwarded[max(0, len(forwarded) - RATE_LIMIT_TRUSTED_HOPS)].decode('latin-1')}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    def match(self, scope) -> Tuple[Optional[RateRule], Optional[str]]:
+        """(rule, bucket key), or (None, None) for routes that are never throttled"""
+        rule = self.rule_for(scope["path"])
+        if rule is None:
+            return None, None
+        return rule, f"{rule.name}|{self.client_key(scope, rule)}"
+
+    def check(self, scope) -> Tuple[Optional[RateRule], float]:
+        """(rule, retry_after); retry_after is 0 when the request may proceed"""
+        rule, key = self.match(scope)
+        if rule is None:
+            return None, 0.0
+        return rule, self.store.take(key, rule, time.time())
+
+    async def check_async(self, scope) -> Tuple[Optional[RateRule], float]:
+        """check() for the event loop: a blocking store is called from the threadpool"""
+        if not self.store.blocking:
+            return self.check(scope)
+        rule, key = self.match(scope)
+        if rule is None:
+            return None, 0.0
+        return rule, await run_in_threadpool(self.store.take, key, rule, time.time())
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.store).__name__,
+            "buckets": len(self.store),
+            "cached_tokens": len(self._token_users)
+        }
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware answering 429 with Retry-After once a bucket is empty"""
+
+    def __init__(self, app, limiter: "RateLimiter" = None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        try:
+            rule, retry_after = await self.limiter.check_async(scope)
+        except Exception as e:
+            # A broken shared store must not take the API down with it
+            logger.error(f"Rate limit check failed: {e}")
+            rule, retry_after = None, 0.0
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+
+        metrics.increment(f"rate_limited_{rule.name}")
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def create_bucket_store():
+    if RATE_LIMIT_BACKEND == "sqlite":
+        os.makedirs(os.path.dirname(os.path.abspath(RATE_LIMIT_SQLITE_PATH)), exist_ok=True)
+        return SQLiteBucketStore(RATE_LIMIT_SQLITE_PATH)
+    return MemoryBucketStore()
+
+
+rate_limiter = RateLimiter(create_bucket_store(), {
+    "auth": parse_limit("auth", RATE_LIMIT_AUTH, by_user=False),
+    "calls": parse_limit("calls", RATE_LIMIT_CALLS, by_user=True),
+    "api": parse_limit("api", RATE_LIMIT_API, by_user=True)
+})
+
+metrics.register_collector("rate_limiter", rate_limiter.stats)
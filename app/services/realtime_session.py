@@ -0,0 +1,208 @@
+# app/services/realtime_session.py
+import asyncio
+import json
+import logging
+import random
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+
+from app.config import (
+    OPENAI_REALTIME_URL,
+    OPENAI_RECONNECT_MAX_ATTEMPTS,
+    OPENAI_RECONNECT_BACKOFF_MS,
+    OPENAI_RECONNECT_BACKOFF_MAX_MS,
+    OPENAI_RECONNECT_AUDIO_BUFFER_MS,
+    OPENAI_REPLAY_MAX_TURNS,
+    OPENAI_WS_PROFILE,
+    OPENAI_WS_MAX_SIZE,
+    OPENAI_WS_MAX_QUEUE,
+    OPENAI_WS_WRITE_LIMIT,
+    OPENAI_WS_PING_INTERVAL,
+    OPENAI_WS_PING_TIMEOUT
+)
+from app.services.metrics import metrics
+from app.services.openai_rate_limits import rate_limits
+
+logger = logging.getLogger(__name__)
+
+AUDIO_APPEND_PREFIX = '{"type":"input_audio_buffer.append","audio":"'
+MAX_REPLAY_CHARS = 1000  # per turn; replay only needs the gist of long turns
+INBOUND_FRAME_MS = 20  # Twilio sends 20 ms media frames
+
+
+def websocket_options(profile: str = OPENAI_WS_PROFILE) -> dict:
+    """websockets.connect() keyword arguments for a transport profile"""
+    if profile == "default":
+        return {}
+    return {
+        # Audio travels as base64 JSON, which deflates poorly; compression only costs CPU
+        "compression": None,
+        "max_size": OPENAI_WS_MAX_SIZE,
+        "max_queue": OPENAI_WS_MAX_QUEUE,
+        "write_limit": OPENAI_WS_WRITE_LIMIT,
+        "ping_interval": OPENAI_WS_PING_INTERVAL,
+        "ping_timeout": OPENAI_WS_PING_TIMEOUT
+    }
+
+
+class RealtimeSessionClosed(Exception):
+    """The OpenAI connection was lost and could not be re-established"""
+
+
+class RealtimeSession:
+    """OpenAI Realtime connection that reconnects transparently mid-call.
+
+    On a drop it reconnects with backoff, re-sends the cached session.update,
+    replays a compact transcript of earlier turns and flushes caller audio that
+    arrived while the connection was down.
+    """
+
+    def __init__(
+        self,
+        session_update: str,
+        api_key: str,
+        url: str = OPENAI_REALTIME_URL,
+        on_reconnected: Optional[Callable[[], None]] = None,
+        connect=None,
+        ws_options: Optional[dict] = None
+    ):
+        self.session_update = session_update
+        self.url = url
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "OpenAI-Beta": "realtime=v1"
+        }
+        self.on_reconnected = on_reconnected
+        # websockets is imported per session, not per module, so importing main does not load it
+        import websockets
+        from websockets.exceptions import ConnectionClosed, InvalidHandshake
+        self._connect = connect or websockets.connect
+        self._dropped = ConnectionClosed
+        self._reconnect_errors = (OSError, ConnectionClosed, InvalidHandshake)
+        self.ws_options = websocket_options() if ws_options is None else ws_options
+        self._ws = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self._reconnecting = False
+        self._closed = False
+        self._turns: Deque[Tuple[str, str]] = deque(maxlen=OPENAI_REPLAY_MAX_TURNS)
+        self._pending_audio: Deque[str] = deque(
+            maxlen=max(1, int(OPENAI_RECONNECT_AUDIO_BUFFER_MS / INBOUND_FRAME_MS)))
+        self.reconnects = 0
+
+    async def _open(self):
+        rate_limits.reserve_session()
+        ws = await self._connect(self.url, extra_headers=self.headers, **self.ws_options)
+        await ws.send(self.session_update)
+        return ws
+
+    async def connect(self):
+        self._ws = await self._open()
+        logger.info("Connected to OpenAI WebSocket")
+
+    def record_turn(self, role: str, text: str):
+        """Remember a finished user/assistant turn for replay after a reconnect"""
+        if text:
+            self._turns.append((role, text[:MAX_REPLAY_CHARS]))
+
+    async def send(self, message: str):
+        generation = self._generation
+        if self._reconnecting:
+            await self._wait_reconnected()
+            generation = self._generation
+        try:
+            await self._ws.send(message)
+        except self._dropped:
+            await self._reconnect(generation)
+            await self._ws.send(message)
+
+    async def send_audio(self, payload: str):
+        """Forward a caller audio frame; buffered (bounded) while reconnecting"""
+        if self._reconnecting:
+            self._pending_audio.append(payload)
+            return
+        generation = self._generation
+        try:
+            await self._ws.send(AUDIO_APPEND_PREFIX + payload + '"}')
+        except self._dropped:
+            self._pending_audio.append(payload)
+            await self._reconnect(generation)
+
+    async def recv(self) -> str:
+        while True:
+            generation = self._generation
+            try:
+                return await self._ws.recv()
+            except self._dropped:
+                await self._reconnect(generation)
+
+    async def _wait_reconnected(self):
+        async with self._lock:
+            pass
+        if self._closed:
+            raise RealtimeSessionClosed("OpenAI session closed")
+
+    async def _reconnect(self, failed_generation: int):
+        """Re-establish the connection once, however many tasks noticed the drop"""
+        if self._closed:
+            raise RealtimeSessionClosed("OpenAI session closed")
+        async with self._lock:
+            if self._generation != failed_generation:
+                return  # another task already reconnected
+            self._reconnecting = True
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            logger.warning("OpenAI WebSocket dropped mid-call, reconnecting")
+            try:
+                for attempt in range(1, OPENAI_RECONNECT_MAX_ATTEMPTS + 1):
+                    delay = min(OPENAI_RECONNECT_BACKOFF_MAX_MS, OPENAI_RECONNECT_BACKOFF_MS * 2 ** (attempt - 1))
+                    await asyncio.sleep(delay / 1000 * random.uniform(0.5, 1.0))
+                    ws = None
+                    try:
+                        ws = await self._open()
+                        await self._replay(ws)
+                    except self._reconnect_errors as e:
+                        logger.warning(f"OpenAI reconnect attempt {attempt} failed: {e}")
+                        if ws is not None:
+                            await ws.close()  # opened but the replay failed; don't leak the socket
+                        continue
+
+                    self._ws = ws
+                    self._generation += 1
+                    self.reconnects += 1
+                    recovery_ms = (loop.time() - started) * 1000
+                    metrics.increment("openai_reconnects")
+                    metrics.increment("openai_recovery_ms_total", recovery_ms)
+                    metrics.set_gauge("openai_last_recovery_ms", round(recovery_ms))
+                    logger.info(f"OpenAI session recovered in {recovery_ms:.0f}ms after {attempt} attempt(s)")
+                    if self.on_reconnected:
+                        self.on_reconnected()
+                    return
+
+                self._closed = True
+                metrics.increment("openai_reconnect_failures")
+                raise RealtimeSessionClosed(
+                    f"OpenAI reconnect failed after {OPENAI_RECONNECT_MAX_ATTEMPTS} attempts")
+            finally:
+                self._reconnecting = False
+
+    async def _replay(self, ws):
+        """Restore conversation context and flush caller audio captured during the outage"""
+        for role, text in self._turns:
+            content_type = "input_text" if role == "user" else "text"
+            await ws.send(json.dumps({
+                "type": "conversation.item.create",
+                "item": {
+                    "type": "message",
+                    "role": role,
+                    "content": [{"type": content_type, "text": text}]
+                }
+            }))
+        while self._pending_audio:
+            await ws.send(AUDIO_APPEND_PREFIX + self._pending_audio[0] + '"}')
+            self._pending_audio.popleft()
+
+    async def close(self):
+        self._closed = True
+        if self._ws is not None:
+            await self._ws.close()
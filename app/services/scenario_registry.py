@@ -0,0 +1,242 @@
+# app/services/scenario_registry.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Literal
+
+from pydantic import BaseModel, Field, ValidationError
+
+from app.config import SCENARIOS_FILE, SCENARIOS_RELOAD_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+Voice = Literal["alloy", "ash", "ballad", "coral", "echo", "sage", "shimmer", "verse"]
+
+
+class TurnDetectionConfig(BaseModel):
+    threshold: float = Field(0.6, ge=0.0, le=1.0)
+    prefix_padding_ms: int = Field(1000, ge=0)
+    silence_duration_ms: int = Field(700, ge=0)
+
+
+class ScenarioDefaults(BaseModel):
+    voice: Voice = "alloy"
+    temperature: float = Field(0.8, ge=0.6, le=1.2)
+    turn_detection: TurnDetectionConfig = TurnDetectionConfig()
+
+
+class ScenarioDefinition(BaseModel):
+    persona: str = Field(..., min_length=1)
+    prompt: str = Field(..., min_length=1)
+    greeting: Optional[str] = None  # opening line played from the greeting cache
+    voice: Optional[Voice] = None
+    temperature: Optional[float] = Field(None, ge=0.6, le=1.2)
+    turn_detection: Optional[TurnDetectionConfig] = None
+
+
+class ScenarioFile(BaseModel):
+    system_message: str = Field(..., min_length=1)
+    defaults: ScenarioDefaults = ScenarioDefaults()
+    scenarios: Dict[str, ScenarioDefinition] = Field(..., min_length=1)
+
+
+class CompiledScenario(NamedTuple):
+    """Immutable, ready-to-send form of a scenario"""
+    name: str
+    persona: str
+    prompt: str
+    voice: str
+    temperature: float
+    turn_detection: TurnDetectionConfig
+    instructions: str
+    session_update: str  # pre-serialized session.update message
+    version: str
+    greeting: Optional[str] = None
+
+
+class _RegistryState(NamedTuple):
+    scenarios: Mapping[str, CompiledScenario]
+    system_message: str
+    defaults: ScenarioDefaults
+    version: str
+    etag: str
+    listing: bytes
+    mtime: float
+
+
+def build_session_update(
+    instructions: str,
+    voice: str,
+    temperature: float,
+    turn_detection: TurnDetectionConfig
+) -> str:
+    """Serialize the session.update message sent to OpenAI at the start of a call"""
+    return json.dumps({
+        "type": "session.update",
+        "session": {
+            "modalities": ["audio", "text"],
+            "instructions": instructions,
+            "voice": voice,
+            "input_audio_format": "g711_ulaw",
+            "output_audio_format": "g711_ulaw",
+            # Caller transcripts let a dropped session be rebuilt with its context
+            "input_audio_transcription": {"model": "whisper-1"},
+            "turn_detection": {
+                "type": "server_vad",
+                "threshold": turn_detection.threshold,
+                "prefix_padding_ms": turn_detection.prefix_padding_ms,
+                "silence_duration_ms": turn_detection.silence_duration_ms
+            },
+            "temperature": temperature
+        }
+    }, separators=(",", ":"))
+
+
+def compile_scenario(
+    name: str,
+    system_message: str,
+    persona: str,
+    prompt: str,
+    voice: str,
+    temperature: float,
+    turn_detection: TurnDetectionConfig,
+    version: str,
+    extra_instructions: Optional[str] = None,
+    greeting: Optional[str] = None
+) -> CompiledScenario:
+    """Build the instructions and session.update payload for a single scenario"""
+    instructions = f"{system_message}\n\nPersona: {persona}\n\nScenario: {prompt}"
+    if extra_instructions:
+        instructions = f"{instructions}\n\n{extra_instructions}"
+    return CompiledScenario(
+        name=name,
+        persona=persona,
+        prompt=prompt,
+        voice=voice,
+        temperature=temperature,
+        turn_detection=turn_detection,
+        instructions=instructions,
+        session_update=build_session_update(instructions, voice, temperature, turn_detection),
+        version=version,
+        greeting=greeting
+    )
+
+
+def compile_scenarios(parsed: ScenarioFile, version: str) -> Dict[str, CompiledScenario]:
+    """Compile every entry of a validated scenario document"""
+    compiled = {}
+    for name, scenario in parsed.scenarios.items():
+        compiled[name] = compile_scenario(
+            name=name,
+            system_message=parsed.system_message,
+            persona=scenario.persona,
+            prompt=scenario.prompt,
+            voice=scenario.voice or parsed.defaults.voice,
+            temperature=scenario.temperature if scenario.temperature is not None else parsed.defaults.temperature,
+            turn_detection=scenario.turn_detection or parsed.defaults.turn_detection,
+            version=version,
+            greeting=scenario.greeting
+        )
+    return compiled
+
+
+def parse_scenario_file(raw: bytes) -> ScenarioFile:
+    """Validate a scenario document; raises ValueError on bad input"""
+    try:
+        return ScenarioFile.model_validate_json(raw)
+    except ValidationError as e:
+        raise ValueError(f"Invalid scenario file: {e}") from e
+
+
+class ScenarioRegistry:
+    """Scenario lookup backed by a JSON file, swapped atomically on reload"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._reload_lock = threading.Lock()
+        self._state: Optional[_RegistryState] = None
+        self._failed_mtime: Optional[float] = None  # last version that failed; not retried until it changes
+
+    def load(self) -> _RegistryState:
+        """Load and compile the scenario file; the current registry is kept on failure"""
+        with self._reload_lock:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            parsed = parse_scenario_file(raw)
+            version = hashlib.sha256(raw).hexdigest()[:16]
+            scenarios = compile_scenarios(parsed, version)
+            listing = json.dumps({
+                "version": version,
+                "scenarios": [
+                    {
+                        "id": s.name,
+                        "persona": s.persona,
+                        "prompt": s.prompt,
+                        "voice": s.voice
+                    }
+                    for s in scenarios.values()
+                ]
+            }).encode()
+            # A single reference assignment is the swap; readers never see a partial registry
+            self._state = _RegistryState(
+                scenarios=MappingProxyType(scenarios),
+                system_message=parsed.system_message,
+                defaults=parsed.defaults,
+                version=version,
+                etag=f'"{version}"',
+                listing=listing,
+                mtime=mtime
+            )
+            logger.info(f"Loaded {len(scenarios)} scenarios from {self.path} (version {version})")
+            return self._state
+
+    @property
+    def state(self) -> _RegistryState:
+        state = self._state
+        if state is None:
+            state = self.load()
+        return state
+
+    def get(self, name: str) -> Optional[CompiledScenario]:
+        return self.state.scenarios.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.state.scenarios
+
+    def names(self) -> List[str]:
+        return list(self.state.scenarios.keys())
+
+    @property
+    def version(self) -> str:
+        return self.state.version
+
+    def maybe_reload(self) -> bool:
+        """Reload when the file has changed on disk; returns True if a new registry was swapped in"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = -1.0  # missing or unreadable; retried once it is back
+        try:
+            if mtime == self.state.mtime or mtime == self._failed_mtime:
+                return False
+            self.load()
+            self._failed_mtime = None
+            return True
+        except (OSError, ValueError) as e:
+            self._failed_mtime = mtime
+            logger.error(f"Scenario reload failed, keeping version {self.state.version}: {e}")
+            return False
+
+    async def watch(self, interval: float = SCENARIOS_RELOAD_INTERVAL):
+        """Poll the scenario file for changes for the life of the worker"""
+        while True:
+            await asyncio.sleep(interval)
+            self.maybe_reload()
+
+
+scenario_registry = ScenarioRegistry(SCENARIOS_FILE)
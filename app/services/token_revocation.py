@@ -0,0 +1,154 @@
+# app/services/token_revocation.py
+import asyncio
+import datetime
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import REVOCATION_SYNC_SECONDS, REVOCATION_PURGE_SECONDS
+from app.db import SessionLocal
+from app.models import RevokedToken
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+KIND_REFRESH = "refresh"
+KIND_FAMILY = "family"
+
+
+def _key(token_id: str) -> bytes:
+    # Our ids are uuid4 hex; 16 raw bytes keep the denylist compact
+    try:
+        return bytes.fromhex(token_id)
+    except ValueError:
+        return token_id.encode()
+
+
+def _epoch(value: datetime.datetime) -> float:
+    return value.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+class RevocationStore:
+    """Denylist of used refresh tokens and revoked login sessions (token families).
+
+    Lookups are in-memory: a dict of 16-byte id -> expiry that drops entries once
+    the token they revoke has expired anyway. The revoked_tokens table makes
+    revocations durable and shared: rotating a refresh token inserts its jti, and
+    the unique constraint on that insert is what detects a token being reused,
+    across workers. Each worker polls the table for rows added elsewhere.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[bytes, float] = {}
+        self._last_id = 0
+        self.reuse_detected = 0
+
+    def _remember(self, token_id: str, expires_at: float):
+        with self._lock:
+            self._entries[_key(token_id)] = expires_at
+
+    def is_revoked(self, token_id: Optional[str]) -> bool:
+        if not token_id:
+            return False
+        expires_at = self._entries.get(_key(token_id))
+        return expires_at is not None and expires_at > time.time()
+
+    def _insert(self, db: Session, token_id: str, kind: str, user_id: Optional[int],
+                expires_at: datetime.datetime) -> bool:
+        db.add(RevokedToken(jti=token_id, kind=kind, user_id=user_id, expires_at=expires_at))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        return True
+
+    def consume_refresh(self, db: Session, jti: str, family: str, user_id: int,
+                        expires_at: datetime.datetime) -> bool:
+        """Mark a refresh token used; False if it was used before or its session is revoked"""
+        if self.is_revoked(jti) or self.is_revoked(family):
+            return False
+        first_use = self._insert(db, jti, KIND_REFRESH, user_id, expires_at)
+        self._remember(jti, _epoch(expires_at))
+        if not first_use:
+            return False
+        # Another worker may have revoked the session within the last sync interval
+        return db.query(RevokedToken.id).filter(RevokedToken.jti == family).first() is None
+
+    def revoke_family(self, db: Session, family: str, user_id: Optional[int],
+                      expires_at: datetime.datetime):
+        """Revoke every token of a login session until its last refresh token would expire"""
+        if not self._insert(db, family, KIND_FAMILY, user_id, expires_at):
+            db.query(RevokedToken).filter(RevokedToken.jti == family).update(
+                {RevokedToken.expires_at: expires_at}, synchronize_session=False)
+            db.commit()
+        self._remember(family, _epoch(expires_at))
+        metrics.increment("token_families_revoked")
+
+    def sync(self) -> int:
+        """Load revocations added since the last sync (all unexpired ones on first call)"""
+        db = SessionLocal()
+        try:
+            rows = db.query(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at).filter(
+                RevokedToken.id > self._last_id,
+                RevokedToken.expires_at > datetime.datetime.utcnow()
+            ).order_by(RevokedToken.id).all()
+        finally:
+            db.close()
+        for row_id, jti, expires_at in rows:
+            self._remember(jti, _epoch(expires_at))
+            self._last_id = max(self._last_id, row_id)
+        return len(rows)
+
+    def expire(self) -> int:
+        """Forget in-memory entries whose tokens have expired"""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, expires_at in self._entries.items() if expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+    def purge_expired(self) -> int:
+        db = SessionLocal()
+        try:
+            removed = db.query(RevokedToken).filter(
+                RevokedToken.expires_at <= datetime.datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
+    async def watch(self, interval: float = REVOCATION_SYNC_SECONDS,
+                    purge_interval: float = REVOCATION_PURGE_SECONDS):
+        last_purge = 0.0
+        while True:
+            try:
+                await run_in_threadpool(self.sync)
+                if time.monotonic() - last_purge >= purge_interval:
+                    last_purge = time.monotonic()
+                    expired = self.expire()
+                    removed = await run_in_threadpool(self.purge_expired)
+                    if expired or removed:
+                        logger.info(f"Expired {expired} revocations in memory, purged {removed} rows")
+            except Exception as e:
+                logger.error(f"Token revocation sync failed: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "last_synced_id": self._last_id,
+            "reuse_detected": self.reuse_detected
+        }
+
+
+revocation_store = RevocationStore()
+metrics.register_collector("token_revocation", revocation_store.stats)
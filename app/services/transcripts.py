@@ -0,0 +1,102 @@
+# app/services/transcripts.py
+import datetime
+import logging
+import re
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import TRANSCRIPT_FLUSH_SEGMENTS, TRANSCRIPT_WRITER_BATCH, TRANSCRIPT_WRITER_INTERVAL
+from app.db import engine
+from app.models import Transcript
+from app.services.batch_writer import BatchWriter
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_SEARCH_TERM = re.compile(r"\w+", re.UNICODE)
+
+_SEARCH_SQL = text("""
+    SELECT t.id, t.call_sid, t.seq, t.role, t.text, t.scenario, t.created_at,
+           snippet(transcripts_fts, 0, '[', ']', '...', 12) AS snippet,
+           bm25(transcripts_fts) AS rank
+    FROM transcripts_fts
+    JOIN transcripts t ON t.id = transcripts_fts.rowid
+    WHERE transcripts_fts MATCH :match AND t.user_id = :user_id
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+""")
+
+
+def _insert_transcripts(rows: List[dict]):
+    # One executemany per batch; the FTS triggers index each row in the same transaction
+    with engine.begin() as conn:
+        conn.execute(Transcript.__table__.insert(), rows)
+
+
+transcript_writer = BatchWriter(
+    "transcripts",
+    _insert_transcripts,
+    max_batch=TRANSCRIPT_WRITER_BATCH,
+    flush_interval=TRANSCRIPT_WRITER_INTERVAL
+)
+
+
+class CallTranscript:
+    """Per-call transcript buffer, handed to the background writer in batches"""
+
+    def __init__(self, call_sid: str, user_id: Optional[int] = None, scenario: Optional[str] = None,
+                 flush_segments: int = TRANSCRIPT_FLUSH_SEGMENTS):
+        self.call_sid = call_sid
+        self.user_id = user_id
+        self.scenario = scenario
+        self.flush_segments = flush_segments
+        self.segments = 0
+        self._pending: List[dict] = []
+
+    def add(self, role: str, text: str, item_id: Optional[str] = None):
+        text = text.strip() if text else ""
+        if not text:
+            return
+        self._pending.append({
+            "user_id": self.user_id,
+            "call_sid": self.call_sid,
+            "seq": self.segments,
+            "role": role,
+            "text": text,
+            "item_id": item_id,
+            "scenario": self.scenario,
+            "created_at": datetime.datetime.utcnow()
+        })
+        self.segments += 1
+        if len(self._pending) >= self.flush_segments:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            transcript_writer.submit_many(self._pending)
+            metrics.increment("transcript_segments", len(self._pending))
+            self._pending = []
+
+
+def build_match_query(query: str) -> str:
+    """Turn free text into a safe FTS5 query: every word must match, as a phrase token"""
+    terms = _SEARCH_TERM.findall(query)
+    if not terms:
+        raise ValueError("Search query must contain at least one word")
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def search_transcripts(db: Session, user_id: int, query: str, limit: int, offset: int) -> List[dict]:
+    """Ranked (bm25) transcript matches across the user's calls"""
+    rows = db.execute(_SEARCH_SQL, {
+        "match": build_match_query(query),
+        "user_id": user_id,
+        "limit": limit,
+        "offset": offset
+    }).mappings().all()
+    return [dict(row) for row in rows]
+
+
+metrics.register_collector("transcript_writer", transcript_writer.stats)
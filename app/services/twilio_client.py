@@ -0,0 +1,29 @@
+# app/services/twilio_client.py
+import logging
+import threading
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_lock = threading.Lock()
+
+
+class TwilioNotConfigured(RuntimeError):
+    """Twilio credentials are missing from the environment"""
+
+
+def get_twilio_client():
+    """Shared Twilio REST client, created on first use; importing twilio.rest is slow"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                settings = get_settings()
+                if not settings.twilio_configured:
+                    raise TwilioNotConfigured("Twilio credentials are not set in the environment variables.")
+                from twilio.rest import Client
+                _client = Client(settings.twilio_account_sid, settings.twilio_auth_token)
+                logger.info("Twilio client initialized")
+    return _client
@@ -0,0 +1,122 @@
+# app/services/twilio_webhook.py
+import base64
+import hashlib
+import hmac
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from fastapi import HTTPException, Request, status
+
+from app.config import TWILIO_VALIDATE_SIGNATURES, get_settings
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookForm:
+    """A webhook's urlencoded fields, parsed on first access.
+
+    Handlers that only need the URL never pay for parsing; the signature check
+    and field lookups share one parse.
+    """
+
+    __slots__ = ("raw", "_pairs", "_fields")
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        self._pairs: Optional[List[Tuple[str, str]]] = None
+        self._fields: Optional[Dict[str, str]] = None
+
+    @property
+    def pairs(self) -> List[Tuple[str, str]]:
+        if self._pairs is None:
+            self._pairs = parse_qsl(self.raw.decode("latin-1"), keep_blank_values=True)
+        return self._pairs
+
+    @property
+    def fields(self) -> Dict[str, str]:
+        if self._fields is None:
+            self._fields = dict(self.pairs)
+        return self._fields
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.fields.get(name, default)
+
+
+class TwilioSignature:
+    """X-Twilio-Signature: base64 HMAC-SHA1 of the URL followed by the sorted POST fields.
+
+    The keyed HMAC state is built once from the auth token; each request only
+    copies it and hashes its own URL and fields.
+    """
+
+    def __init__(self, auth_token: str):
+        self._mac = hmac.new(auth_token.encode(), digestmod=hashlib.sha1)
+
+    def compute(self, url: str, params: Iterable[Tuple[str, str]]) -> bytes:
+        mac = self._mac.copy()
+        mac.update(url.encode())
+        for name, value in sorted(set(params)):
+            mac.update(name.encode())
+            mac.update(value.encode())
+        return base64.b64encode(mac.digest())
+
+    def is_valid(self, url: str, params: Iterable[Tuple[str, str]], signature: Optional[str]) -> bool:
+        if not signature:
+            return False
+        return hmac.compare_digest(self.compute(url, params), signature.encode())
+
+
+_signature: Optional[TwilioSignature] = None
+_lock = threading.Lock()
+
+
+def get_signature() -> Optional[TwilioSignature]:
+    """Validator for this account's auth token; None when the token is not configured"""
+    global _signature
+    if _signature is None:
+        with _lock:
+            if _signature is None:
+                auth_token = get_settings().twilio_auth_token
+                if not auth_token:
+                    return None
+                _signature = TwilioSignature(auth_token)
+    return _signature
+
+
+def webhook_url(request: Request) -> str:
+    """The URL Twilio requested, as it signed it: the PUBLIC_URL the callbacks were built from
+    (the Host header only when it is unset, since proxies may rewrite it) plus the raw path and query"""
+    host = get_settings().public_url.rstrip("/") or request.headers.get("host", "")
+    path = (request.scope.get("raw_path") or request.url.path.encode()).split(b"?", 1)[0]
+    query = request.scope.get("query_string", b"")
+    return f"https://{host}{path.decode('latin-1')}{'?' + query.decode('latin-1') if query else ''}"
+
+
+_warned_unsigned = False
+
+
+async def verify_twilio_request(request: Request) -> WebhookForm:
+    """Dependency for Twilio webhooks: checks X-Twilio-Signature and returns the lazily parsed fields"""
+    global _warned_unsigned
+    if request.method == "POST":
+        form, signed = WebhookForm(await request.body()), True
+    else:
+        form, signed = WebhookForm(request.scope.get("query_string", b"")), False  # signed as part of the URL
+    if not TWILIO_VALIDATE_SIGNATURES:
+        return form
+
+    signature = get_signature()
+    if signature is None:
+        if not _warned_unsigned:
+            _warned_unsigned = True
+            logger.warning("TWILIO_AUTH_TOKEN is not set; Twilio webhook signatures are not being checked")
+        return form
+    if not signature.is_valid(webhook_url(request), form.pairs if signed else (),
+                              request.headers.get("x-twilio-signature")):
+        metrics.increment("twilio_signature_rejected")
+        logger.warning(f"Rejected Twilio webhook with a bad signature: {request.url.path}")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Twilio signature")
+    return form
@@ -1,9 +1,10 @@
 # app/services/usage_service.py
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.models import UsageLimits, AppType, User
+from app.models import UsageLimits, AppType, User, CallCost
 from fastapi import Request
 import datetime
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -62,6 +63,11 @@ class UsageService:
         
         usage_limits = db.query(UsageLimits).filter(
             UsageLimits.user_id == user_id).first()
+        return UsageService.evaluate_call_permission(usage_limits)
+    
+    @staticmethod
+    def evaluate_call_permission(usage_limits: Optional[UsageLimits]) -> Tuple[bool, str, Dict[str, Any]]:
+        """Permission decision for already-loaded usage limits (no queries)"""
         
         if not usage_limits:
             # User doesn't have usage limits - this shouldn't happen
@@ -148,6 +154,11 @@ class UsageService:
         
         usage_limits = db.query(UsageLimits).filter(
             UsageLimits.user_id == user_id).first()
+        return UsageService.usage_stats_from_limits(usage_limits)
+    
+    @staticmethod
+    def usage_stats_from_limits(usage_limits: Optional[UsageLimits]) -> Dict[str, Any]:
+        """Usage statistics for already-loaded usage limits (no queries)"""
         
         if not usage_limits:
             # Return default stats for new users
@@ -175,6 +186,49 @@ class UsageService:
             "trial_start_date": usage_limits.trial_start_date.isoformat() if usage_limits.trial_start_date else None
         }
     
+    @staticmethod
+    def get_cost_totals(user_id: int, db: Session, since: datetime.datetime = None) -> Dict[str, Any]:
+        """Talk minutes, OpenAI tokens and cost for a user, from per-call cost records"""
+        query = db.query(
+            func.count(CallCost.id),
+            func.coalesce(func.sum(CallCost.duration_seconds), 0),
+            func.coalesce(func.sum(CallCost.text_input_tokens + CallCost.text_cached_input_tokens), 0),
+            func.coalesce(func.sum(CallCost.audio_input_tokens + CallCost.audio_cached_input_tokens), 0),
+            func.coalesce(func.sum(CallCost.text_output_tokens), 0),
+            func.coalesce(func.sum(CallCost.audio_output_tokens), 0),
+            func.coalesce(func.sum(CallCost.cost_usd), 0)
+        ).filter(CallCost.user_id == user_id)
+        if since is not None:
+            query = query.filter(CallCost.ended_at >= since)
+        calls, seconds, text_in, audio_in, text_out, audio_out, cost = query.one()
+
+        return {
+            "calls": calls,
+            "minutes": round(seconds / 60, 2),
+            "text_input_tokens": text_in,
+            "audio_input_tokens": audio_in,
+            "text_output_tokens": text_out,
+            "audio_output_tokens": audio_out,
+            "cost_usd": round(cost, 4)
+        }
+
+    @staticmethod
+    def get_cost_version(user_id: int, db: Session) -> Tuple[int, int]:
+        """Cheap change marker for a user's cost records: (count, latest id)"""
+        count, latest = db.query(func.count(CallCost.id), func.max(CallCost.id)).filter(
+            CallCost.user_id == user_id).one()
+        return count, latest or 0
+
+    @staticmethod
+    def get_cost_stats(user_id: int, db: Session) -> Dict[str, Any]:
+        """Lifetime and current-month cost totals for a user"""
+        now = datetime.datetime.utcnow()
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        return {
+            "total": UsageService.get_cost_totals(user_id, db),
+            "this_month": UsageService.get_cost_totals(user_id, db, since=month_start)
+        }
+
     @staticmethod
     def reset_daily_counts(db: Session):
         """Reset daily call counts - should be run daily via cron"""
@@ -0,0 +1,108 @@
+# app/sqlite_online.py
+"""
+SQLite maintenance that keeps the database usable while it runs: backups via the
+online backup API and table rebuilds that copy rows in short batches.
+
+Helpers that take a connection expect a sqlite3 connection in autocommit mode
+(isolation_level=None) and manage their own transactions.
+"""
+import logging
+import sqlite3
+import time
+from typing import Iterable, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+BACKUP_PAGES_PER_STEP = 1024
+BACKUP_STEP_SLEEP = 0.005
+COPY_BATCH_SIZE = 2000
+COPY_BATCH_SLEEP = 0.0
+
+
+def backup_database(src_path: str, dest_path: str, pages: int = BACKUP_PAGES_PER_STEP,
+                    sleep: float = BACKUP_STEP_SLEEP) -> str:
+    """Copy a live database page-by-page; writers only wait for one step at a time"""
+    started = time.monotonic()
+    src = sqlite3.connect(src_path)
+    dest = sqlite3.connect(dest_path)
+    try:
+        src.backup(dest, pages=pages, sleep=sleep)
+    finally:
+        dest.close()
+        src.close()
+    logger.info(f"Backed up {src_path} to {dest_path} in {time.monotonic() - started:.2f}s")
+    return dest_path
+
+
+def _batch_upper_bound(conn: sqlite3.Connection, table: str, after: int, batch_size: int) -> Optional[int]:
+    row = conn.execute(
+        f"SELECT rowid FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT 1 OFFSET ?",
+        (after, batch_size - 1)
+    ).fetchone()
+    if row is not None:
+        return row[0]
+    row = conn.execute(f"SELECT max(rowid) FROM {table} WHERE rowid > ?", (after,)).fetchone()
+    return row[0]
+
+
+def copy_rows_in_batches(conn: sqlite3.Connection, source: str, target: str,
+                         target_columns: Sequence[str], select_exprs: Sequence[str],
+                         after: int = 0, batch_size: int = COPY_BATCH_SIZE,
+                         sleep: float = COPY_BATCH_SLEEP) -> int:
+    """Copy rows with rowid > after in rowid order, one short transaction per batch.
+
+    Returns the last rowid copied so a caller can resume or catch up from there.
+    """
+    insert = (f"INSERT INTO {target} ({', '.join(target_columns)}) "
+              f"SELECT {', '.join(select_exprs)} FROM {source} WHERE rowid > ? AND rowid <= ? ORDER BY rowid")
+    copied = 0
+    while True:
+        upper = _batch_upper_bound(conn, source, after, batch_size)
+        if upper is None:
+            break
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            copied += conn.execute(insert, (after, upper)).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        after = upper
+        if sleep:
+            time.sleep(sleep)
+    logger.info(f"Copied {copied} rows from {source} to {target}")
+    return after
+
+
+def rebuild_table(conn: sqlite3.Connection, table: str, create_sql: str,
+                  target_columns: Sequence[str], select_exprs: Sequence[str],
+                  indexes: Iterable[str] = (), batch_size: int = COPY_BATCH_SIZE):
+    """Rebuild a table under a new definition without holding the write lock for the copy.
+
+    `create_sql` creates the replacement under the name "<table>__new". Rows are
+    copied in batches, then one short transaction copies rows added meanwhile,
+    drops rows deleted meanwhile, swaps the tables and recreates the indexes.
+    Rows updated during the batch phase keep their copied values, so use it for
+    append-mostly tables or with writers paused. The integer primary key must be
+    among the copied columns so rowids carry over.
+    """
+    new_table = f"{table}__new"
+    conn.execute(f"DROP TABLE IF EXISTS {new_table}")
+    conn.execute(create_sql)
+    last = copy_rows_in_batches(conn, table, new_table, target_columns, select_exprs, batch_size=batch_size)
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        copy_sql = (f"INSERT INTO {new_table} ({', '.join(target_columns)}) "
+                    f"SELECT {', '.join(select_exprs)} FROM {table} WHERE rowid > ? ORDER BY rowid")
+        caught_up = conn.execute(copy_sql, (last,)).rowcount
+        conn.execute(f"DELETE FROM {new_table} WHERE rowid NOT IN (SELECT rowid FROM {table})")
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+        for index_sql in indexes:
+            conn.execute(index_sql)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    logger.info(f"Rebuilt {table} ({caught_up} rows caught up during the swap)")
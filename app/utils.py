@@ -4,6 +4,8 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 import os
+import hashlib
+import uuid
 from app.config import SECRET_KEY, ALGORITHM
 
 # Access token expiry
@@ -32,13 +34,19 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return encoded_jwt
 
 
+def new_token_id() -> str:
+    """Random id for a refresh token (jti) or a login session's token family"""
+    return uuid.uuid4().hex
+
+
 def create_refresh_token(data: dict, expires_delta: timedelta = None):
+    """Single-use refresh token; data should carry the login session's family id (fam)"""
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "type": "refresh", "jti": new_token_id()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -49,3 +57,21 @@ def decode_token(token: str):
         return decoded
     except JWTError:
         return None
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag derived from the version markers of a response, not its body"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # Weak comparison: W/"x" and "x" name the same representation
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return "*" in candidates or any(
+        (candidate[2:] if candidate.startswith("W/") else candidate) == bare
+        for candidate in candidates
+    )
@@ -0,0 +1,60 @@
+"""
+Benchmark: post-call analytics throughput.
+
+Synthesizes caller/assistant mu-law tracks with alternating turns and measures how
+many call-minutes one process analyzes per CPU-minute.
+
+    python3 benchmarks/call_analytics_throughput.py --minutes 10 --calls 50
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.call_analytics import analyze_tracks  # noqa: E402
+
+SAMPLE_RATE = 8000
+
+
+def synthetic_call(minutes: float, seed: int):
+    """Two tracks of alternating speech bursts (mu-law 0x20-ish) over silence (0xff)"""
+    rng = np.random.default_rng(seed)
+    samples = int(minutes * 60 * SAMPLE_RATE)
+    caller = np.full(samples, 0xFF, dtype=np.uint8)
+    assistant = np.full(samples, 0xFF, dtype=np.uint8)
+    t = 0
+    while t < samples:
+        talk = int(rng.uniform(1, 6) * SAMPLE_RATE)
+        caller[t:t + talk] = rng.integers(0x10, 0x40, size=min(talk, samples - t), dtype=np.uint8)
+        t += talk + int(rng.uniform(0.3, 1.2) * SAMPLE_RATE)
+        talk = int(rng.uniform(2, 10) * SAMPLE_RATE)
+        assistant[t:t + talk] = rng.integers(0x10, 0x40, size=max(0, min(talk, samples - t)), dtype=np.uint8)
+        t += talk + int(rng.uniform(0.3, 1.5) * SAMPLE_RATE)
+    return caller, assistant
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=10, help="length of each synthetic call")
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    calls = [synthetic_call(args.minutes, seed) for seed in range(args.calls)]
+    start = time.process_time()
+    for caller, assistant in calls:
+        stats = analyze_tracks(caller, assistant)
+    cpu = time.process_time() - start
+
+    total_minutes = args.minutes * args.calls
+    print(f"analyzed {args.calls} calls x {args.minutes:g} min in {cpu:.2f}s CPU")
+    print(f"throughput: {total_minutes / (cpu / 60):,.0f} call-minutes per CPU-minute")
+    print(f"last call: {stats}")
+
+
+if __name__ == "__main__":
+    main()
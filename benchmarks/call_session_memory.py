@@ -0,0 +1,159 @@
+"""
+Benchmark: resident memory per concurrent call in the media bridge.
+
+Each measurement runs in a fresh interpreter. It starts N simulated calls, each
+with the real per-call objects (CallSession, PlayoutScheduler, RealtimeSession,
+CallTranscript, CallUsage) and the real receive_from_twilio/send_to_twilio
+handlers. Fake sockets stand in for Twilio and OpenAI: caller media and audio
+deltas arrive every --interval-ms. Once every call is streaming, the RSS growth
+over the idle baseline is divided by N.
+
+    python3 benchmarks/call_session_memory.py --calls 100 1000 --seconds 5
+"""
+
+import argparse
+import asyncio
+import base64
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+FRAME = base64.b64encode(b"\xff" * 160).decode()  # 20 ms of mu-law silence
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # macOS reports ru_maxrss in bytes, Linux in KiB; only the peak is available
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+class FakeTwilio:
+    """Twilio media stream: a media frame every interval, outbound frames discarded"""
+
+    def __init__(self, stream_sid: str, interval: float):
+        self.interval = interval
+        self.media = {"event": "media", "streamSid": stream_sid,
+                      "media": {"track": "inbound", "chunk": "1", "timestamp": "0", "payload": FRAME}}
+        self.sent = 0
+
+    async def receive_json(self):
+        await asyncio.sleep(self.interval)
+        return json.loads(json.dumps(self.media))
+
+    async def send_text(self, data: str):
+        self.sent += 1
+
+
+class FakeRealtime:
+    """OpenAI Realtime socket: an audio delta every interval"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.delta = json.dumps({"type": "response.audio.delta", "item_id": "item_1",
+                                 "delta": base64.b64encode(b"\xff" * 160).decode()})
+
+    async def send(self, data: str):
+        pass
+
+    async def recv(self) -> str:
+        await asyncio.sleep(self.interval)
+        return self.delta
+
+    async def close(self):
+        pass
+
+
+async def simulate(calls: int, seconds: float, interval: float) -> dict:
+    from app.routes.media import receive_from_twilio, send_to_twilio
+    from app.services.audio_pacer import PlayoutScheduler
+    from app.services.call_costs import CallUsage
+    from app.services.call_session import CallSession
+    from app.services.realtime_session import RealtimeSession
+    from app.services.transcripts import CallTranscript
+
+    async def fake_connect(url, **kwargs):
+        return FakeRealtime(interval)
+
+    gc.collect()
+    baseline = rss_bytes()
+    sessions, tasks = [], []
+    for n in range(calls):
+        stream_sid, call_sid = f"MZ{n:032d}", f"CA{n:032d}"
+        websocket = FakeTwilio(stream_sid, interval)
+        session = CallSession(websocket, "default")
+        session.start({"streamSid": stream_sid, "callSid": call_sid})
+        session.transcript = CallTranscript(call_sid, n, "default")
+        session.usage = CallUsage(call_sid, n, "default")
+        session.pacer = PlayoutScheduler(websocket.send_text, stream_sid)
+        session.openai_session = RealtimeSession('{"type":"session.update"}', "sk-benchmark",
+                                                 connect=fake_connect, ws_options={})
+        await session.openai_session.connect()
+        tasks += [asyncio.create_task(session.pacer.run()),
+                  asyncio.create_task(receive_from_twilio(session)),
+                  asyncio.create_task(send_to_twilio(session))]
+        sessions.append(session)
+
+    await asyncio.sleep(seconds)
+    gc.collect()
+    loaded = rss_bytes()
+    media_in = sum(s.media_in for s in sessions)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    session = sessions[0]
+    state_bytes = (sys.getsizeof(session)
+                   + sum(sys.getsizeof(ring) + sys.getsizeof(ring._types) + sys.getsizeof(ring._times)
+                         for ring in (session.twilio_events, session.openai_events)))
+    return {
+        "calls": calls,
+        "rss_mib": loaded / 2 ** 20,
+        "kib_per_call": (loaded - baseline) / calls / 1024,
+        "session_state_bytes": state_bytes,
+        "media_frames": media_in
+    }
+
+
+def child(calls: int, seconds: float, interval_ms: float):
+    import logging
+    logging.disable(logging.INFO)
+    print(json.dumps(asyncio.run(simulate(calls, seconds, interval_ms / 1000))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--interval-ms", type=float, default=20)
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.seconds, args.interval_ms)
+        return
+
+    print(f"{'calls':>6} {'rss MiB':>8} {'KiB/call':>9} {'session B':>10} {'frames in':>10}")
+    for calls in args.calls:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", str(calls),
+             "--seconds", str(args.seconds), "--interval-ms", str(args.interval_ms)],
+            capture_output=True, text=True, check=True, cwd=ROOT
+        )
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{r['calls']:>6} {r['rss_mib']:>8.1f} {r['kib_per_call']:>9.1f} "
+              f"{r['session_state_bytes']:>10} {r['media_frames']:>10}")
+
+
+if __name__ == "__main__":
+    main()
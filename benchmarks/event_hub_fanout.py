@@ -0,0 +1,77 @@
+"""
+Benchmark: cost of idle live-event subscribers and of fanning events out.
+
+Subscribes N streams (spread over users, a few per user, each with a waiting
+consumer as SSE/WebSocket handlers have) and reports the memory per stream,
+the time of one heartbeat tick over all of them, and the time to publish one
+event to a user's streams and have their consumers take it.
+
+    python3 benchmarks/event_hub_fanout.py --subscribers 1000 10000
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.services.event_hub import EventHub  # noqa: E402
+
+STREAMS_PER_USER = 3
+
+
+async def consume(subscriber):
+    while await subscriber.next() is not None:
+        pass
+
+
+async def measure(subscribers: int, publishes: int) -> dict:
+    hub = EventHub(max_queue=100, heartbeat_seconds=3600, max_streams_per_user=STREAMS_PER_USER)
+    users = max(1, subscribers // STREAMS_PER_USER)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    streams = [hub.subscribe(n % users) for n in range(subscribers)]
+    consumers = [asyncio.create_task(consume(s)) for s in streams]
+    await asyncio.sleep(0)
+    per_stream = (tracemalloc.get_traced_memory()[0] - before) / subscribers
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    hub.tick()
+    tick_ms = (time.perf_counter() - start) * 1000
+    await asyncio.sleep(0)
+
+    # Consumers run between publishes, so this includes handing the event to each stream
+    start = time.perf_counter()
+    for n in range(publishes):
+        hub.publish(n % users, "call.transcript", {"call_sid": "CA1", "role": "user", "text": "hello there"})
+        await asyncio.sleep(0)
+    publish_us = (time.perf_counter() - start) / publishes * 1e6
+    assert not hub.evicted
+
+    hub.close_all()
+    await asyncio.gather(*consumers)
+    return {"bytes_per_stream": per_stream, "tick_ms": tick_ms, "publish_us": publish_us}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--publishes", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'streams':>8} {'B/stream':>9} {'tick ms':>8} {'us/publish':>11}")
+    for subscribers in args.subscribers:
+        r = asyncio.run(measure(subscribers, args.publishes))
+        print(f"{subscribers:>8} {r['bytes_per_stream']:>9.0f} {r['tick_ms']:>8.2f} {r['publish_us']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark: CPU per concurrent call for the OpenAI WebSocket transport profiles.
+
+A fake Realtime server runs in a separate process and streams 20 ms base64
+audio deltas to every connection while the client side (this process) streams
+caller audio back, decoding deltas the way the media bridge does. The client
+process's CPU time is reported per concurrent call for the "default"
+(websockets defaults, permessage-deflate) and "audio" (tuned) profiles.
+
+    python3 benchmarks/media_ws_profiles.py --calls 10 50 --seconds 10 [--uvloop]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import websockets  # noqa: E402
+
+from app.services.realtime_session import AUDIO_APPEND_PREFIX, websocket_options  # noqa: E402
+
+FRAME_SECONDS = 0.02
+FRAME_BYTES = 160  # 20 ms of 8 kHz mu-law
+
+
+def audio_frame() -> str:
+    # Noise-like audio: real speech compresses about as badly once base64-encoded
+    return base64.b64encode(os.urandom(FRAME_BYTES)).decode()
+
+
+async def fake_realtime(websocket, *args):
+    """Stream one audio delta per frame until the client goes away"""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    n = 0
+
+    async def drain_client():
+        async for _ in websocket:
+            pass
+
+    reader = asyncio.create_task(drain_client())
+    try:
+        while True:
+            n += 1
+            await websocket.send(json.dumps({"type": "response.audio.delta", "item_id": "item_1", "delta": audio_frame()}))
+            await asyncio.sleep(max(0.0, start + n * FRAME_SECONDS - loop.time()))
+    except websockets.ConnectionClosed:
+        pass
+    finally:
+        reader.cancel()
+
+
+def serve(port: int, ready):
+    async def main():
+        async with websockets.serve(fake_realtime, "127.0.0.1", port, max_size=None):
+            ready.set()
+            await asyncio.Future()
+    asyncio.run(main())
+
+
+async def client_call(url: str, options: dict, seconds: float, received: list):
+    async with websockets.connect(url, **options) as ws:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        async def sender():
+            for n in range(int(seconds / FRAME_SECONDS)):
+                await ws.send(AUDIO_APPEND_PREFIX + audio_frame() + '"}')
+                await asyncio.sleep(max(0.0, start + (n + 1) * FRAME_SECONDS - loop.time()))
+
+        async def receiver():
+            while True:
+                msg = json.loads(await ws.recv())
+                if msg["type"] == "response.audio.delta":
+                    base64.b64decode(msg["delta"])
+                    received[0] += 1
+
+        recv_task = asyncio.create_task(receiver())
+        await sender()
+        recv_task.cancel()
+
+
+async def run(url: str, profile: str, calls: int, seconds: float) -> dict:
+    options = websocket_options(profile)
+    received = [0]
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(client_call(url, options, seconds, received) for _ in range(calls)))
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    return {
+        "cpu_ms_per_call_s": cpu / (calls * wall) * 1000,
+        "cpu_pct": cpu / wall * 100,
+        "frames": received[0]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--uvloop", action="store_true", help="run the client on uvloop (must be installed)")
+    args = parser.parse_args()
+
+    if args.uvloop:
+        import uvloop
+        uvloop.install()
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(args.port, ready), daemon=True)
+    server.start()
+    ready.wait(10)
+    url = f"ws://127.0.0.1:{args.port}"
+
+    print(f"{'calls':>6} {'profile':>8} {'cpu ms per call-s':>18} {'cpu %':>7} {'frames':>8}")
+    try:
+        for calls in args.calls:
+            for profile in ("default", "audio"):
+                r = asyncio.run(run(url, profile, calls, args.seconds))
+                print(f"{calls:>6} {profile:>8} {r['cpu_ms_per_call_s']:>18.2f} {r['cpu_pct']:>7.1f} {r['frames']:>8}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: per-request cost of the rate-limit check.
+
+Runs RateLimiter.check() against a realistic mix of clients (bearer tokens and
+anonymous IPs) for both bucket stores, with limits high enough that nothing is
+throttled, and reports microseconds per check.
+
+    python3 benchmarks/rate_limit_overhead.py --clients 100 10000 --checks 200000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.rate_limiter import (  # noqa: E402
+    MemoryBucketStore,
+    RateLimiter,
+    SQLiteBucketStore,
+    parse_limit
+)
+from app.utils import create_access_token  # noqa: E402
+
+RULES = {
+    "auth": parse_limit("auth", "1000000000/1", by_user=False),
+    "calls": parse_limit("calls", "1000000000/1", by_user=True),
+    "api": parse_limit("api", "1000000000/1", by_user=True)
+}
+PATHS = ["/mobile/usage-stats", "/auth/login", "/make-call/+15550000000/default", "/health"]
+
+
+def build_scopes(clients: int) -> list:
+    scopes = []
+    for i in range(clients):
+        headers = [(b"host", b"api.example.com"), (b"user-agent", b"bench")]
+        if i % 2 == 0:
+            token = create_access_token({"sub": f"user{i}@example.com", "user_id": i})
+            headers.append((b"authorization", f"Bearer {token}".encode()))
+        scopes.append({
+            "type": "http",
+            "path": PATHS[i % len(PATHS)],
+            "headers": headers,
+            "client": (f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 50000)
+        })
+    return scopes
+
+
+def run(limiter: RateLimiter, scopes: list, checks: int) -> float:
+    for scope in scopes:  # warm the token cache, as a running server would be
+        limiter.check(scope)
+    start = time.perf_counter()
+    for n in range(checks):
+        limiter.check(scopes[n % len(scopes)])
+    return (time.perf_counter() - start) / checks * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[100, 10000])
+    parser.add_argument("--checks", type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"{'clients':>8} {'store':>8} {'us/check':>9}")
+    for clients in args.clients:
+        scopes = build_scopes(clients)
+        memory = RateLimiter(MemoryBucketStore(), RULES)
+        print(f"{clients:>8} {'memory':>8} {run(memory, scopes, args.checks):>9.2f}")
+        with tempfile.TemporaryDirectory() as tmp:
+            sqlite = RateLimiter(SQLiteBucketStore(os.path.join(tmp, "ratelimit.db")), RULES)
+            print(f"{clients:>8} {'sqlite':>8} {run(sqlite, scopes, args.checks // 10):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: local call recorder overhead per concurrent call.
+
+Simulates N concurrent calls on one event loop, each receiving 50 caller frames/s
+and playing 50 assistant frames/s (20 ms mu-law frames), with and without the
+recorder attached. Reports the loop-side cost per frame, event loop lag and
+writer throughput.
+
+    python3 benchmarks/recorder_overhead.py --calls 10 50 100 --seconds 5
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("RECORDINGS_DIR", tempfile.mkdtemp(prefix="recorder-bench-"))
+
+from app.services.call_recorder import CallRecorder, recording_writer  # noqa: E402
+
+FRAME = b"\x7f" * 160
+PAYLOAD = base64.b64encode(FRAME).decode()
+
+
+async def simulated_call(index: int, seconds: float, record: bool, costs: list):
+    recorder = CallRecorder(f"CABENCH{index:05d}") if record else None
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for n in range(int(seconds * 50)):
+        t0 = time.perf_counter()
+        if recorder:
+            recorder.inbound(PAYLOAD, n * 20)
+            recorder.outbound(FRAME, start + n * 0.02)
+        costs.append(time.perf_counter() - t0)
+        next_frame = start + (n + 1) * 0.02
+        await asyncio.sleep(max(0.0, next_frame - loop.time()))
+    if recorder:
+        recorder.close()
+
+
+async def lag_probe(stop: asyncio.Event, lags: list):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        t0 = loop.time()
+        await asyncio.sleep(0.01)
+        lags.append((loop.time() - t0 - 0.01) * 1000)
+
+
+async def run(calls: int, seconds: float, record: bool):
+    costs, lags = [], []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(lag_probe(stop, lags))
+    await asyncio.gather(*(simulated_call(i, seconds, record, costs) for i in range(calls)))
+    stop.set()
+    await probe
+    flush_start = time.perf_counter()
+    recording_writer.flush(timeout=60)
+    flush_ms = (time.perf_counter() - flush_start) * 1000
+    lags.sort()
+    return {
+        "cost_us": statistics.mean(costs) * 1e6,
+        "lag_p50": lags[len(lags) // 2],
+        "lag_p99": lags[int(len(lags) * 0.99)],
+        "flush_ms": flush_ms
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    recording_writer.start()
+    print(f"recordings in {os.environ['RECORDINGS_DIR']}")
+    print(f"{'calls':>6} {'recorder':>9} {'us/frame':>9} {'lag p50 ms':>11} {'lag p99 ms':>11} {'drain ms':>9}")
+    for calls in args.calls:
+        for record in (False, True):
+            r = asyncio.run(run(calls, args.seconds, record))
+            print(f"{calls:>6} {'on' if record else 'off':>9} {r['cost_us']:>9.2f} "
+                  f"{r['lag_p50']:>11.2f} {r['lag_p99']:>11.2f} {r['flush_ms']:>9.1f}")
+    stats = recording_writer.stats()
+    print(f"writer: {stats}")
+    recording_writer.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: import time and cold-start time-to-ready per worker.
+
+For each entrypoint, runs fresh interpreters that only import the module, then
+starts it under uvicorn and polls /health/ready until it answers 200. Runs in a
+scratch directory so no database or recordings land in the checkout. Fails if
+importing an entrypoint loads a package that is only needed once a call starts.
+
+    python3 benchmarks/startup_time.py --runs 5
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRYPOINTS = ["main", "media_gateway"]
+
+# Loaded lazily on the first call (TwiML render, OpenAI session, Twilio REST client)
+LAZY_PACKAGES = ["twilio", "websockets"]
+
+IMPORT_SNIPPET = (
+    "import sys, time; t = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - t); "
+    "print(','.join(sorted({{m.split('.')[0] for m in sys.modules}} & set({lazy!r}))))"
+)
+
+
+def bench_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("SECRET_KEY", "benchmark")
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    env["DB_AUTO_CREATE"] = "true"
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_time(module: str, cwd: str, env: dict) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module, lazy=LAZY_PACKAGES)],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+    *_, elapsed, loaded = out.stdout.split("\n")[:-1]
+    assert not loaded, f"importing {module} loaded {loaded}"
+    return float(elapsed)
+
+
+def time_to_ready(module: str, cwd: str, env: dict, timeout: float = 60) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--log-level", "warning"],
+        cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/ready", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"{module} did not become ready within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--entrypoints", nargs="+", default=ENTRYPOINTS)
+    args = parser.parse_args()
+
+    env = bench_env()
+    print(f"{'entrypoint':>14} {'import ms p50':>14} {'ready ms p50':>13} {'ready ms max':>13}")
+    with tempfile.TemporaryDirectory(prefix="startup-bench-") as cwd:
+        for module in args.entrypoints:
+            imports = [import_time(module, cwd, env) * 1000 for _ in range(args.runs)]
+            ready = [time_to_ready(module, cwd, env) * 1000 for _ in range(args.runs)]
+            print(f"{module:>14} {statistics.median(imports):>14.0f} "
+                  f"{statistics.median(ready):>13.0f} {max(ready):>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: per-request cost of the incoming-call webhook's own work.
+
+Compares building the TwiML with a VoiceResponse tree on every request against
+the cached (host, scenario) template with the call context spliced in, and
+times the X-Twilio-Signature check over a typical Twilio form body (parsing
+included). Framework and network overhead are not measured.
+
+    python3 benchmarks/webhook_overhead.py --requests 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from twilio.twiml.voice_response import Connect, VoiceResponse  # noqa: E402
+
+from app.routes.media import escape, stream_twiml  # noqa: E402
+from app.services.twilio_webhook import TwilioSignature, WebhookForm  # noqa: E402
+
+HOST = "voice.example.com"
+CALL_CTX = "MTI6MS4wLjA6MTcwMDAwMDAwMDpkZWZhdWx0.3q2-7wAAAAAAAAAAAAAAAA"
+URL = f"https://{HOST}/incoming-call/default?ctx={CALL_CTX}"
+FORM = urlencode({
+    "AccountSid": "AC" + "0" * 32, "ApiVersion": "2010-04-01", "CallSid": "CA" + "1" * 32,
+    "CallStatus": "in-progress", "Called": "+15550000000", "Caller": "+15551111111",
+    "Direction": "outbound-api", "From": "+15550000000", "FromCity": "", "FromCountry": "US",
+    "FromState": "CA", "FromZip": "", "To": "+15551111111", "ToCity": "", "ToCountry": "US",
+    "ToState": "CA", "ToZip": ""
+}).encode()
+
+
+def per_request(fn, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def build_twiml() -> bytes:
+    response = VoiceResponse()
+    connect = Connect()
+    stream = connect.stream(url=f"wss://{HOST}/media-stream/default")
+    stream.parameter(name="ctx", value=CALL_CTX)
+    response.append(connect)
+    return str(response).encode()
+
+
+def cached_twiml() -> bytes:
+    _, head, tail = stream_twiml(HOST, "default")
+    return head + escape(CALL_CTX, {'"': "&quot;"}).encode() + tail
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100000)
+    args = parser.parse_args()
+
+    assert build_twiml() == cached_twiml()
+    signature = TwilioSignature("0123456789abcdef0123456789abcdef")
+    signed = signature.compute(URL, WebhookForm(FORM).pairs).decode()
+
+    print(f"{'step':>20} {'us/request':>11}")
+    print(f"{'twiml (built)':>20} {per_request(build_twiml, args.requests):>11.2f}")
+    print(f"{'twiml (cached)':>20} {per_request(cached_twiml, args.requests):>11.2f}")
+    print(f"{'parse + signature':>20} "
+          f"{per_request(lambda: signature.is_valid(URL, WebhookForm(FORM).pairs, signed), args.requests):>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
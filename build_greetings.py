@@ -0,0 +1,132 @@
+"""
+Offline builder for the opening-greeting cache.
+
+Each scenario with a "greeting" in app/scenarios.json gets a raw mu-law file in
+GREETING_CACHE_DIR, named after the scenario text version so edits invalidate it.
+
+    # Record greetings from a live Realtime session (all scenarios, or one)
+    python3 build_greetings.py
+    python3 build_greetings.py --scenario default
+
+    # Import an existing recording (raw 8 kHz mu-law or a mu-law WAV file)
+    python3 build_greetings.py --scenario default --from-file greeting.wav
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import sys
+
+import websockets
+from dotenv import load_dotenv
+
+from app.services.scenario_registry import scenario_registry
+from app.config import OPENAI_REALTIME_URL
+from app.services.greeting_cache import write_greeting
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+WAVE_FORMAT_MULAW = 7
+
+
+def read_recording(path: str) -> bytes:
+    """Load mu-law audio from a raw file or a mu-law WAV container"""
+    with open(path, "rb") as f:
+        header = f.read(12)
+    if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        with open(path, "rb") as f:
+            return f.read()
+
+    # The wave module only understands PCM, so walk the chunks ourselves
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        size = int.from_bytes(data[offset + 4:offset + 8], "little")
+        body = data[offset + 8:offset + 8 + size]
+        if chunk_id == b"fmt ":
+            fmt = body
+        elif chunk_id == b"data":
+            if fmt is None:
+                break
+            audio_format = int.from_bytes(fmt[0:2], "little")
+            channels = int.from_bytes(fmt[2:4], "little")
+            sample_rate = int.from_bytes(fmt[4:8], "little")
+            if audio_format != WAVE_FORMAT_MULAW or channels != 1 or sample_rate != 8000:
+                raise ValueError("WAV recordings must be mono 8 kHz mu-law")
+            return body
+        offset += 8 + size + (size % 2)
+    raise ValueError(f"No mu-law data chunk found in {path}")
+
+
+async def record_greeting(scenario_name: str) -> bytes:
+    """Have the Realtime model speak the scenario greeting and capture its audio"""
+    scenario = scenario_registry.get(scenario_name)
+    headers = {
+        "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
+        "OpenAI-Beta": "realtime=v1"
+    }
+    audio = bytearray()
+    async with websockets.connect(OPENAI_REALTIME_URL, extra_headers=headers, compression=None) as ws:
+        await ws.send(json.dumps({
+            "type": "session.update",
+            "session": {
+                "modalities": ["audio", "text"],
+                "instructions": f"{scenario.instructions}\n\nSay exactly the following, word for word, and nothing else: {scenario.greeting}",
+                "voice": scenario.voice,
+                "output_audio_format": "g711_ulaw",
+                "turn_detection": None,
+                "temperature": 0.6
+            }
+        }))
+        await ws.send(json.dumps({"type": "response.create"}))
+        async for message in ws:
+            msg = json.loads(message)
+            if msg["type"] == "response.audio.delta":
+                audio.extend(base64.b64decode(msg["delta"]))
+            elif msg["type"] == "response.done":
+                break
+            elif msg["type"] == "error":
+                raise RuntimeError(f"OpenAI error while recording {scenario_name}: {msg}")
+    return bytes(audio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Populate the opening-greeting audio cache")
+    parser.add_argument("--scenario", help="Only build this scenario")
+    parser.add_argument("--from-file", help="Import a recording instead of generating one")
+    args = parser.parse_args()
+
+    if args.from_file and not args.scenario:
+        parser.error("--from-file requires --scenario")
+
+    scenario_registry.load()
+    names = [args.scenario] if args.scenario else [
+        name for name in scenario_registry.names() if scenario_registry.get(name).greeting
+    ]
+
+    failed = False
+    for name in names:
+        try:
+            if args.from_file:
+                audio = read_recording(args.from_file)
+            else:
+                audio = asyncio.run(record_greeting(name))
+            path = write_greeting(name, audio)
+            logger.info(f"Cached greeting for {name}: {path} ({len(audio) / 8000:.2f}s)")
+        except Exception as e:
+            logger.error(f"Failed to build greeting for {name}: {e}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
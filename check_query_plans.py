@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Check that every hot query in the app is served by an index.
+
+Runs EXPLAIN QUERY PLAN for each query below against a scratch database built
+with `alembic upgrade head` (or an existing one with --db) and fails if any plan
+scans a whole table or sorts rows that an index should already return in order.
+Add a query here when a new request path or background loop starts reading a table.
+
+    python3 check_query_plans.py [--db sql_app.db] [--verbose]
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from typing import List, NamedTuple
+
+from alembic import command
+
+from migrate_database import alembic_config
+
+
+class HotQuery(NamedTuple):
+    name: str
+    sql: str
+    sorts: bool = False  # a temp B-tree sort is expected (e.g. ranking search results)
+
+
+NOW = "2026-01-01 00:00:00"
+
+HOT_QUERIES = [
+    # Auth: login, token verification, refresh-token rotation and logout
+    HotQuery("user by email", "SELECT * FROM users WHERE email = 'a@example.com'"),
+    HotQuery("user by id", "SELECT * FROM users WHERE id = 1"),
+    HotQuery("revoked token family", "SELECT id FROM revoked_tokens WHERE jti = 'f' LIMIT 1"),
+    HotQuery("revocation sync",
+             f"SELECT id, jti, expires_at FROM revoked_tokens WHERE id > 0 AND expires_at > '{NOW}' ORDER BY id"),
+    HotQuery("revocation purge", f"DELETE FROM revoked_tokens WHERE expires_at <= '{NOW}'"),
+    # Scheduler and scheduled calls
+    HotQuery("due calls", f"SELECT * FROM call_schedules WHERE scheduled_time <= '{NOW}'"),
+    HotQuery("user's scheduled calls",
+             "SELECT * FROM call_schedules WHERE user_id = 1 ORDER BY scheduled_time"),
+    # Usage limits and cost summaries
+    HotQuery("usage limits", "SELECT * FROM usage_limits WHERE user_id = 1 LIMIT 1"),
+    HotQuery("cost summary",
+             f"SELECT count(id), sum(cost_usd) FROM call_costs WHERE user_id = 1 AND ended_at >= '{NOW}'"),
+    HotQuery("cost version", "SELECT count(id), max(id) FROM call_costs WHERE user_id = 1"),
+    # Call history and status callbacks
+    HotQuery("call record upsert", "SELECT * FROM call_records WHERE call_sid = 'CA1'"),
+    HotQuery("user's calls",
+             "SELECT * FROM call_records WHERE user_id = 1 ORDER BY created_at DESC LIMIT 50"),
+    HotQuery("user's calls by status",
+             "SELECT * FROM call_records WHERE user_id = 1 AND status = 'completed' "
+             "ORDER BY created_at DESC LIMIT 50"),
+    HotQuery("calls by status",
+             "SELECT * FROM call_records WHERE status = 'in-progress' ORDER BY updated_at DESC LIMIT 50"),
+    HotQuery("call stats", "SELECT * FROM call_stats WHERE call_sid = 'CA1' AND user_id = 1 LIMIT 1"),
+    # Transcripts
+    HotQuery("transcript", "SELECT * FROM transcripts WHERE call_sid = 'CA1' AND user_id = 1 ORDER BY seq"),
+    HotQuery("transcript search",
+             "SELECT t.id, bm25(transcripts_fts) AS rank FROM transcripts_fts "
+             "JOIN transcripts t ON t.id = transcripts_fts.rowid "
+             "WHERE transcripts_fts MATCH 'hello' AND t.user_id = 1 ORDER BY rank LIMIT 20",
+             sorts=True),
+    # Idempotency keys
+    HotQuery("idempotency lookup", "SELECT * FROM idempotency_keys WHERE user_id = 1 AND key = 'k' LIMIT 1"),
+    HotQuery("idempotency purge", f"DELETE FROM idempotency_keys WHERE expires_at <= '{NOW}'"),
+    # Custom scenarios
+    HotQuery("user's scenarios", "SELECT * FROM user_scenarios WHERE user_id = 1 ORDER BY id"),
+    HotQuery("owned scenario", "SELECT * FROM user_scenarios WHERE id = 1 AND user_id = 1 LIMIT 1"),
+]
+
+# "SCAN users" (SQLite >= 3.36) or "SCAN TABLE users" without an index behind it
+FULL_SCAN = re.compile(r"^SCAN (TABLE )?\w+$")
+
+
+def plan_problems(conn: sqlite3.Connection, query: HotQuery) -> List[str]:
+    problems = []
+    for _, _, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {query.sql}"):
+        if FULL_SCAN.match(detail):
+            problems.append(detail)
+        elif "TEMP B-TREE" in detail and not query.sorts:
+            problems.append(detail)
+    return problems
+
+
+def check(db_path: str, verbose: bool = False) -> bool:
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    ok = True
+    try:
+        for query in HOT_QUERIES:
+            problems = plan_problems(conn, query)
+            ok = ok and not problems
+            print(f"{'FAIL' if problems else 'ok':>4}  {query.name}{': ' + '; '.join(problems) if problems else ''}")
+            if verbose:
+                for row in conn.execute(f"EXPLAIN QUERY PLAN {query.sql}"):
+                    print(f"        {row[3]}")
+    finally:
+        conn.close()
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="check an existing database instead of a fresh migration")
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    if args.db:
+        success = check(args.db, args.verbose)
+    else:
+        with tempfile.TemporaryDirectory(prefix="query-plans-") as scratch:
+            db_path = os.path.join(scratch, "plans.db")
+            command.upgrade(alembic_config(db_path), "head")
+            success = check(db_path, args.verbose)
+    sys.exit(0 if success else 1)
@@ -1,17 +1,10 @@
-import os
-import json
 import base64
 import asyncio
-import websockets
 import logging
 import sys
-from fastapi import FastAPI, WebSocket, Request, Depends, HTTPException, status, Body
-from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi import APIRouter, FastAPI, Request, Depends, HTTPException, status, Body, Header
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware  # Add this import
-from fastapi.websockets import WebSocketDisconnect
-from twilio.twiml.voice_response import VoiceResponse, Gather, Connect, Say, Stream
-from dotenv import load_dotenv
-from twilio.rest import Client
 import datetime
 from pydantic import BaseModel, EmailStr, field_validator
 from typing import Optional
@@ -26,93 +19,58 @@ import time
 from app.auth import router as auth_router, get_current_user
 from app.routes.mobile import router as mobile_router
 from app.routes.user import router as user_router
-from app.models import User, Token, CallSchedule, UsageLimits, AppType
+from app.routes.scenarios import router as scenarios_router
+from app.routes.transcripts import router as transcripts_router
+from app.routes.calls import router as calls_router
+from app.routes.twilio_webhooks import router as twilio_webhooks_router
+from app.routes.admin import router as admin_router
+from app.routes.media import router as media_router
+from app.routes.events import router as events_router
+from app.models import User, CallSchedule, UsageLimits, AppType
 from app.utils import verify_password, create_access_token
 from app.schemas import TokenResponse, UserRead
-from app.db import engine, get_db, SessionLocal, Base
-from app.config import ACCESS_TOKEN_EXPIRE_MINUTES
+from app.db import get_db, SessionLocal, init_db
+from app.config import ACCESS_TOKEN_EXPIRE_MINUTES, CALL_RECORDING_ENABLED, DB_AUTO_CREATE, get_settings
 from app.services.usage_service import UsageService
-from starlette.websockets import WebSocketState  # Add this at the top
+from app.services.capacity import capacity
+from app.services.openai_rate_limits import rate_limits
+from app.services.metrics import metrics
+from app.services.scenario_registry import scenario_registry
+from app.services.token_revocation import revocation_store
+from app.services.call_supervisor import call_registry
+from app.services.call_state import CallState, call_states
+from app.services.event_hub import event_hub
+from app.services.personalization import (
+    instruction_cache,
+    is_known_scenario_id,
+    resolve_scenario,
+    sign_call_context
+)
+from app.services.greeting_cache import greeting_cache
+from app.services.transcripts import transcript_writer
+from app.services.call_recorder import recording_writer, retention_loop as recording_retention_loop
+from app.services.call_costs import call_cost_writer
+from app.services.idempotency import idempotency_store, request_fingerprint
+from app.services.call_records import STATUS_CALLBACK_EVENTS, call_status_writer, record_dispatch, status_callback_url
+from app.services.rate_limiter import RateLimitMiddleware
+from app.services.drain import drain_controller
+from app.services.twilio_client import get_twilio_client
+from starlette.concurrency import run_in_threadpool
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-load_dotenv()
-
-# Check if in development mode
-DEVELOPMENT_MODE = os.getenv('DEVELOPMENT_MODE', 'False').lower() == 'true'
-
-# requires OpenAI Realtime API Access
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-PORT = int(os.getenv('PORT', 5050))
-
-# Define our scenarios
-SCENARIOS = {
-    "default": {
-        "persona": "I am an aggressive business man and real estate agent.",
-        "prompt": "We are at the end phase of a real estate deal and I need to get the deal done today.  The price is $5,000,000 and the seller is being difficult.  I need to get the deal done today."
-    },
-    "sister_emergency": {
-        "persona": "I am an experienced hiring manager conducting a job interview.",
-        "prompt": "You will act as a sister calling to tell you that your mother has slipped on a banana peel and broken her hip."
-    },
-    "mother_emergency": {
-        "persona": "I your mother and I am calling to tell you that I slipped on a banana peel and broke my hip.",
-        "prompt": "I am your mother and I need you to come over and take care of me because I slipped on a banana peel and broke my hip."
-    }
-}
-
-SYSTEM_MESSAGE = (
-    "You are a AI assistant who will adapt to the prompts provided by the user to chat about "
-    "the scenarios in depth, you will have an engaging backand forth conversation with. "
-    "Your persona is defined by the scenario and prompt provided by the user. "
-    "You can change your personality to match the scenario and prompt."
-)
-VOICE = 'alloy'
-LOG_EVENT_TYPES = [
-    'response.content.done', 'rate_limits.updated', 'response.done',
-    'input_audio_buffer.committed', 'input_audio_buffer.speech_stopped',
-    'input_audio_buffer.speech_started', 'session.created'
-]
-
-# Initialize FastAPI app
-app = FastAPI(title="AiFriendChat API", version="1.0.0")
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Create database tables (do this only once)
-Base.metadata.create_all(bind=engine)
-
-# Include routers
-app.include_router(auth_router)
-app.include_router(mobile_router)
-app.include_router(user_router)
-
-if not OPENAI_API_KEY:
-    raise ValueError(
-        'Missing the OpenAI API key. Please set it in the .env file.')
-
-# Twilio Client Initialization
-TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
-TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
-TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
+# Settings are read once per process; Twilio and the schema are not touched at import
+settings = get_settings()
+DEVELOPMENT_MODE = settings.development_mode
+PORT = settings.port
 
-if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_PHONE_NUMBER:
-    raise ValueError(
-        "Twilio credentials are not set in the environment variables.")
-
-twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+# Endpoints defined in this module; create_app() registers them after the routers
+router = APIRouter()
 
 # User Login Endpoint (legacy - keep for compatibility)
-@app.post("/token", response_model=TokenResponse)
+@router.post("/token", response_model=TokenResponse)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
@@ -138,16 +96,16 @@ async def login_for_access_token(
     return {"access_token": access_token, "token_type": "bearer"}
 
 # Protected Route Example
-@app.get("/protected")
+@router.get("/protected")
 def protected_route(current_user: User = Depends(get_current_user)):
     return {"message": f"Hello, {current_user.email}"}
 
-@app.get("/users/me", response_model=UserRead)
+@router.get("/users/me", response_model=UserRead)
 async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 # Update user name endpoint (legacy - for backwards compatibility)
-@app.post("/update-user-name")
+@router.post("/update-user-name")
 async def update_user_name_legacy(
     name: str = Body(...),
     current_user: User = Depends(get_current_user),
@@ -159,6 +117,7 @@ async def update_user_name_legacy(
         db.commit()
         db.refresh(current_user)
         
+        instruction_cache.invalidate(current_user.id)
         logger.info(f"Updated name for user {current_user.email} to: {current_user.name}")
         
         return {
@@ -184,9 +143,9 @@ class CallScheduleCreate(BaseModel):
     @field_validator('scenario')
     @classmethod
     def validate_scenario(cls, v):
-        if v not in SCENARIOS:
+        if not is_known_scenario_id(v):
             raise ValueError(
-                f"Invalid scenario. Must be one of: {', '.join(SCENARIOS.keys())}")
+                f"Invalid scenario. Must be one of: {', '.join(scenario_registry.names())}")
         return v
 
 class CallScheduleRead(CallScheduleCreate):
@@ -197,34 +156,56 @@ class CallScheduleRead(CallScheduleCreate):
         orm_mode = True
 
 # Schedule Call Endpoint
-@app.post("/schedule-call", response_model=CallScheduleRead)
+@router.post("/schedule-call", response_model=CallScheduleRead)
 async def schedule_call(
+    request: Request,
     call: CallScheduleCreate,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if call.scenario not in SCENARIOS:
-        raise HTTPException(status_code=400, detail="Invalid scenario")
-    new_call = CallSchedule(
-        user_id=current_user.id,
-        phone_number=call.phone_number,
-        scheduled_time=call.scheduled_time,
-        scenario=call.scenario
-    )
-    db.add(new_call)
-    db.commit()
-    db.refresh(new_call)
-    return new_call
+    async def create_schedule():
+        if resolve_scenario(db, current_user, call.scenario) is None:
+            raise HTTPException(status_code=400, detail="Invalid scenario")
+        new_call = CallSchedule(
+            user_id=current_user.id,
+            phone_number=call.phone_number,
+            scheduled_time=call.scheduled_time,
+            scenario=call.scenario
+        )
+        db.add(new_call)
+        db.commit()
+        db.refresh(new_call)
+        return CallScheduleRead.model_validate(new_call, from_attributes=True)
+
+    return await idempotency_store.run(
+        current_user.id, idempotency_key, await request_fingerprint(request), create_schedule)
 
 # Make Call Endpoint (updated with usage limits)
-@app.get("/make-call/{phone_number}/{scenario}")
+@router.get("/make-call/{phone_number}/{scenario}")
 async def make_call(
     request: Request,
     phone_number: str,
     scenario: str,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    # A retried request with the same Idempotency-Key gets the original response
+    # instead of placing (and billing) a second call
+    return await idempotency_store.run(
+        current_user.id,
+        idempotency_key,
+        await request_fingerprint(request),
+        lambda: place_call(request, phone_number, scenario, current_user, db)
+    )
+
+
+async def place_call(request: Request, phone_number: str, scenario: str, current_user: User, db: Session):
+    compiled_scenario = resolve_scenario(db, current_user, scenario)
+    if compiled_scenario is None:
+        raise HTTPException(status_code=400, detail="Invalid scenario")
+
     try:
         # Check usage limits for business web app users (not in development mode)
         if not DEVELOPMENT_MODE:
@@ -259,21 +240,47 @@ async def make_call(
                         detail="Please upgrade to continue making calls"
                     )
         
-        # Get the public URL from environment and ensure it's clean
-        public_url = os.getenv('PUBLIC_URL', '').strip()
-        logger.info(f"Using PUBLIC_URL from environment: {public_url}")
-
-        # Construct the complete webhook URL with https://
-        webhook_url = f"https://{public_url}/incoming-call/{scenario}"
-        logger.info(f"Constructed webhook URL: {webhook_url}")
-
-        # Make the call using Twilio
-        call = twilio_client.calls.create(
-            to=f"+1{phone_number}",  # Ensure proper phone number formatting
-            from_=TWILIO_PHONE_NUMBER,
-            url=webhook_url,
-            record=True
-        )
+        # Hold off on dispatch while OpenAI would refuse the session anyway
+        retry_after = rate_limits.retry_after()
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Voice service is busy, please try again shortly",
+                headers={"Retry-After": str(int(retry_after) + 1)}
+            )
+
+        # Refuse new calls early when this worker has no headroom left
+        if not capacity.try_acquire_dispatch():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is at capacity, please try again shortly",
+                headers={"Retry-After": "5"}
+            )
+
+        try:
+            public_url = settings.public_url
+            logger.info(f"Using PUBLIC_URL from environment: {public_url}")
+
+            # Construct the complete webhook URL with https://, carrying the signed call context
+            call_ctx = sign_call_context(current_user.id, compiled_scenario)
+            webhook_url = f"https://{public_url}/incoming-call/{scenario}?ctx={call_ctx}"
+            logger.info(f"Constructed webhook URL: {webhook_url}")
+
+            # Make the call using Twilio
+            call = get_twilio_client().calls.create(
+                to=f"+1{phone_number}",  # Ensure proper phone number formatting
+                from_=settings.twilio_phone_number,
+                url=webhook_url,
+                record=True,
+                status_callback=status_callback_url(public_url),
+                status_callback_event=STATUS_CALLBACK_EVENTS,
+                status_callback_method="POST"
+            )
+        finally:
+            capacity.release_dispatch()
+
+        call_states.put(CallState.for_scenario(call.sid, current_user.id, compiled_scenario, "web"))
+        record_dispatch(db, call.sid, current_user.id, scenario, f"+1{phone_number}", settings.twilio_phone_number, "web")
 
         # Record the call if not in development mode
         if not DEVELOPMENT_MODE:
@@ -290,178 +297,47 @@ async def make_call(
         logger.error(f"Error details: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# Webhook Endpoint for Incoming Calls
-@app.api_route("/incoming-call/{scenario}", methods=["GET", "POST"])
-async def handle_incoming_call(request: Request, scenario: str):
-    logger.info(f"Incoming call webhook received for scenario: {scenario}")
-    try:
-        # Validate scenario
-        if scenario not in SCENARIOS:
-            logger.error(f"Invalid scenario: {scenario}")
-            raise HTTPException(status_code=400, detail="Invalid scenario")
-
-        # Log request details
-        form_data = await request.form()
-        logger.info(f"Received form data: {form_data}")
-
-        response = VoiceResponse()
-
-        # Get the host from the request
-        host = request.headers.get('Host', 'voice.hyperlabsai.com')
-
-        # Construct WebSocket URL with explicit protocol
-        ws_url = f"wss://{host}/media-stream/{scenario}"
-
-        # Log the WebSocket URL we're using
-        logger.info(f"Setting up WebSocket connection to: {ws_url}")
-
-        # Add Stream connection
-        connect = Connect()
-        connect.stream(url=ws_url)
-        response.append(connect)
-
-        twiml = str(response)
-        logger.info(f"Generated TwiML response: {twiml}")
-
-        return Response(content=twiml, media_type="application/xml")
-    except Exception as e:
-        logger.error(f"Error in handle_incoming_call: {e}", exc_info=True)
-        raise
-
-# WebSocket handlers remain the same...
-async def receive_from_twilio(websocket: WebSocket, openai_ws):
-    """Handle incoming audio from Twilio."""
-    try:
-        while True:
-            msg = await websocket.receive_json()
-            logger.info(f"Received message from Twilio: {msg['event']}")
-
-            if msg["event"] == "media":
-                if "payload" not in msg["media"]:
-                    logger.error("Missing payload in Twilio media message")
-                    continue
-
-                payload = {
-                    "type": "input_audio_buffer.append",
-                    "audio": msg["media"]["payload"]
-                }
-                await openai_ws.send(json.dumps(payload))
-                logger.info("Sent audio buffer to OpenAI")
-
-            elif msg["event"] == "stop":
-                logger.info("Stop event received from Twilio")
-                await openai_ws.send(json.dumps({
-                    "type": "input_audio_buffer.commit"
-                }))
-                logger.info("Sent audio buffer commit to OpenAI")
-                break
-    except WebSocketDisconnect:
-        logger.info("Twilio WebSocket disconnected")
-    except Exception as e:
-        logger.error(f"Error in receive_from_twilio: {e}")
-        raise
-
-async def send_to_twilio(websocket: WebSocket, openai_ws):
-    """Handle outgoing audio to Twilio."""
-    try:
-        while True:
-            message = await openai_ws.recv()
-            msg = json.loads(message)
-            logger.info(f"Received message from OpenAI: {msg['type']}")
-
-            if msg["type"] == "audio":
-                await websocket.send_text(json.dumps({
-                    "event": "media",
-                    "media": {
-                        "payload": msg["audio"]
-                    }
-                }))
-                logger.info("Sent audio to Twilio")
-
-            elif msg["type"] == "error":
-                logger.error(f"Error from OpenAI: {msg}")
-                break
-
-            elif msg["type"] in LOG_EVENT_TYPES:
-                logger.info(f"OpenAI event: {msg}")
-
-    except WebSocketDisconnect:
-        logger.info("OpenAI WebSocket disconnected")
-    except Exception as e:
-        logger.error(f"Error in send_to_twilio: {e}")
-        raise
-
-@app.websocket("/media-stream/{scenario}")
-async def handle_media_stream(websocket: WebSocket, scenario: str):
-    try:
-        await websocket.accept()
-        logger.info("WebSocket connection accepted")
-
-        selected_scenario = SCENARIOS.get(scenario)
-        if not selected_scenario:
-            await websocket.close(code=4000)
-            return
-
-        # Connect to OpenAI's Realtime API
-        url = "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-12-17"
-        headers = {
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-            "OpenAI-Beta": "realtime=v1"
-        }
-
-        async with websockets.connect(url, extra_headers=headers) as openai_ws:
-            logger.info("Connected to OpenAI WebSocket")
-
-            # Send initial configuration
-            session_config = {
-                "type": "session.update",
-                "session": {
-                    "modalities": ["audio", "text"],
-                    "instructions": f"{SYSTEM_MESSAGE}\n\nPersona: {selected_scenario['persona']}\n\nScenario: {selected_scenario['prompt']}",
-                    "voice": "alloy",
-                    "input_audio_format": "g711_ulaw",
-                    "output_audio_format": "g711_ulaw",
-                    "turn_detection": {
-                        "type": "server_vad",
-                        "threshold": 0.6,
-                        "prefix_padding_ms": 1000,
-                        "silence_duration_ms": 700
-                    },
-                    "temperature": 0.8
-                }
-            }
-
-            await openai_ws.send(json.dumps(session_config))
-            logger.info("Session configuration sent")
-
-            # Start the audio handling tasks
-            audio_tasks = [
-                asyncio.create_task(receive_from_twilio(websocket, openai_ws)),
-                asyncio.create_task(send_to_twilio(websocket, openai_ws))
-            ]
-
-            # Wait for either task to complete
-            done, pending = await asyncio.wait(
-                audio_tasks,
-                return_when=asyncio.FIRST_COMPLETED
-            )
-
-            # Cancel any pending tasks
-            for task in pending:
-                task.cancel()
-
-    except WebSocketDisconnect:
-        logger.info("WebSocket disconnected")
-    except Exception as e:
-        logger.error(f"WebSocket handler error: {str(e)}")
-        if websocket.client_state != WebSocketState.DISCONNECTED:
-            await websocket.close(code=1011)
-        raise
-
 # Start Background Thread on Server Startup
-@app.on_event("startup")
 async def startup_event():
-    threading.Thread(target=initiate_scheduled_calls, daemon=True).start()
+    if DB_AUTO_CREATE:
+        await run_in_threadpool(init_db)
+    if not settings.openai_api_key:
+        logger.warning("OPENAI_API_KEY is not set; media streams will fail")
+    if settings.twilio_configured:
+        threading.Thread(target=initiate_scheduled_calls, daemon=True).start()
+    else:
+        logger.warning("Twilio credentials are not set; calls cannot be placed and scheduled calls are paused")
+    asyncio.create_task(capacity.monitor_loop_lag())
+    scenario_registry.load()
+    greeting_cache.load()
+    asyncio.create_task(scenario_registry.watch())
+    transcript_writer.start()
+    recording_writer.start()
+    call_cost_writer.start()
+    call_status_writer.start()
+    asyncio.create_task(idempotency_store.purge_loop())
+    asyncio.create_task(revocation_store.watch())
+    asyncio.create_task(call_registry.leak_watch())
+    asyncio.create_task(event_hub.heartbeat_loop())
+    if CALL_RECORDING_ENABLED:
+        asyncio.create_task(recording_retention_loop())
+    for writer in (transcript_writer, recording_writer, call_cost_writer, call_status_writer):
+        drain_controller.register_flush(writer.name, writer.flush)
+    drain_controller.register_flush("event_hub", event_hub.shutdown)
+    # SIGTERM drains live calls before the server shuts down
+    drain_controller.install_signal_handler()
+
+
+async def shutdown_event():
+    event_hub.close_all()
+    await run_in_threadpool(transcript_writer.stop)
+    await run_in_threadpool(recording_writer.stop)
+    await run_in_threadpool(call_cost_writer.stop)
+    await run_in_threadpool(call_status_writer.stop)
+    if CALL_RECORDING_ENABLED:
+        # Analytics (and NumPy) only load when recording is on
+        from app.services.call_analytics import shutdown_analysis_pool
+        shutdown_analysis_pool()
 
 # Background Task to Initiate Scheduled Calls
 def initiate_scheduled_calls():
@@ -472,25 +348,48 @@ def initiate_scheduled_calls():
             calls = db_local.query(CallSchedule).filter(
                 CallSchedule.scheduled_time <= now).all()
             for call in calls:
+                if capacity.draining:
+                    logger.info("Worker draining, leaving remaining scheduled calls for another worker")
+                    break
+                # Leave the call scheduled for the next pass if we are out of headroom
+                if not rate_limits.has_headroom():
+                    logger.warning(f"Deferring scheduled call {call.id}, OpenAI rate limit exhausted")
+                    break
+                if not capacity.try_acquire_dispatch():
+                    logger.warning(f"Deferring scheduled call {call.id}, worker at capacity")
+                    break
                 try:
-                    # Clean the URL first
-                    public_url = os.getenv('PUBLIC_URL', '').strip()
-                    public_url = public_url.replace(
-                        'https://', '').replace('http://', '')
-
-                    # Construct the webhook URL
-                    incoming_call_url = f"https://{public_url}/incoming-call/{call.scenario}"
-
-                    twilio_client.calls.create(
+                    public_url = settings.public_url
+
+                    # Construct the webhook URL, carrying the signed call context
+                    compiled_scenario = resolve_scenario(db_local, call.user, call.scenario)
+                    if compiled_scenario is None:
+                        logger.error(f"Dropping scheduled call {call.id}: unknown scenario {call.scenario}")
+                        db_local.delete(call)
+                        continue
+                    call_ctx = sign_call_context(call.user_id, compiled_scenario)
+                    incoming_call_url = f"https://{public_url}/incoming-call/{call.scenario}?ctx={call_ctx}"
+
+                    twilio_call = get_twilio_client().calls.create(
                         url=incoming_call_url,
                         to=call.phone_number,
-                        from_=TWILIO_PHONE_NUMBER
+                        from_=settings.twilio_phone_number,
+                        status_callback=status_callback_url(public_url),
+                        status_callback_event=STATUS_CALLBACK_EVENTS,
+                        status_callback_method="POST"
                     )
-                    logger.info(
-                        f"Scheduled call initiated to {call.phone_number} with ID: {call.id}")
+                    # Commit per call, before anything else can fail, so a placed call is never redialed
+                    user_id, scenario, phone_number, call_id = call.user_id, call.scenario, call.phone_number, call.id
                     db_local.delete(call)
+                    db_local.commit()
+                    logger.info(f"Scheduled call initiated to {phone_number} with ID: {call_id}")
+                    call_states.put(CallState.for_scenario(twilio_call.sid, user_id, compiled_scenario, "scheduled"))
+                    record_dispatch(db_local, twilio_call.sid, user_id, scenario,
+                                    phone_number, settings.twilio_phone_number, "scheduled")
                 except Exception as e:
                     logger.error(f"Failed to initiate scheduled call: {e}")
+                finally:
+                    capacity.release_dispatch()
             db_local.commit()
         except Exception as e:
             logger.error(f"Error in initiate_scheduled_calls: {e}")
@@ -498,15 +397,67 @@ def initiate_scheduled_calls():
             db_local.close()
         time.sleep(60)
 
-# Health check endpoint
-@app.get("/health")
+# Health check endpoints
+@router.get("/health")
+@router.get("/health/live")
 async def health_check():
+    """Liveness: the process is up and serving requests"""
     return {
         "status": "healthy",
         "timestamp": datetime.datetime.utcnow().isoformat(),
         "development_mode": DEVELOPMENT_MODE
     }
 
+@router.get("/metrics")
+async def get_metrics():
+    """Process metrics: capacity, OpenAI rate-limit headroom and counters"""
+    return metrics.snapshot()
+
+@router.get("/health/ready")
+async def readiness_check():
+    """Readiness: whether this worker should be routed new calls"""
+    readiness = capacity.readiness()
+    readiness["timestamp"] = datetime.datetime.utcnow().isoformat()
+    status_code = 200 if readiness["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(content=readiness, status_code=status_code)
+
+def create_app() -> FastAPI:
+    """Build the API application; heavy clients are created lazily on first use"""
+    app = FastAPI(title="AiFriendChat API", version="1.0.0")
+
+    # Throttle auth, call-placing and mobile endpoints per user / client IP
+    # (added first so CORS wraps it and 429s still carry CORS headers)
+    app.add_middleware(RateLimitMiddleware)
+
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Include routers
+    app.include_router(auth_router)
+    app.include_router(mobile_router)
+    app.include_router(user_router)
+    app.include_router(scenarios_router)
+    app.include_router(transcripts_router)
+    app.include_router(calls_router)
+    app.include_router(twilio_webhooks_router)
+    app.include_router(admin_router)
+    app.include_router(media_router)
+    app.include_router(events_router)
+    app.include_router(router)
+
+    app.add_event_handler("startup", startup_event)
+    app.add_event_handler("shutdown", shutdown_event)
+    return app
+
+
+app = create_app()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=PORT)
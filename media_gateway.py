@@ -0,0 +1,144 @@
+"""
+Media gateway: serves only the Twilio call webhook (/incoming-call), media
+streams (/media-stream) and the live events of the calls it bridges (/events),
+so real-time audio workers can be scaled and restarted independently of the
+REST API in main.py. Runs on uvloop/httptools when they are installed, with a
+WebSocket transport tuned for audio.
+
+    python3 media_gateway.py
+"""
+import asyncio
+import datetime
+import importlib.util
+import logging
+
+import uvicorn
+from fastapi import APIRouter, FastAPI, status
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.config import (
+    CALL_RECORDING_ENABLED,
+    DB_AUTO_CREATE,
+    MEDIA_GATEWAY_PORT,
+    MEDIA_GATEWAY_WORKERS,
+    MEDIA_WS_MAX_SIZE,
+    MEDIA_WS_PING_INTERVAL,
+    MEDIA_WS_PING_TIMEOUT,
+    get_settings
+)
+from app.db import init_db
+from app.routes.admin import router as admin_router
+from app.routes.media import router as media_router
+from app.routes.events import router as events_router
+from app.services.call_costs import call_cost_writer
+from app.services.call_recorder import recording_writer, retention_loop as recording_retention_loop
+from app.services.call_supervisor import call_registry
+from app.services.capacity import capacity
+from app.services.drain import drain_controller
+from app.services.event_hub import event_hub
+from app.services.greeting_cache import greeting_cache
+from app.services.metrics import metrics
+from app.services.scenario_registry import scenario_registry
+from app.services.token_revocation import revocation_store
+from app.services.transcripts import transcript_writer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Endpoints defined in this module; create_app() registers them after the routers
+router = APIRouter()
+
+MEDIA_WRITERS = (transcript_writer, recording_writer, call_cost_writer)
+
+
+async def startup_event():
+    if not get_settings().openai_api_key:
+        raise ValueError('Missing the OpenAI API key. Please set it in the .env file.')
+    if DB_AUTO_CREATE:
+        await run_in_threadpool(init_db)
+    asyncio.create_task(capacity.monitor_loop_lag())
+    scenario_registry.load()
+    greeting_cache.load()
+    asyncio.create_task(scenario_registry.watch())
+    asyncio.create_task(call_registry.leak_watch())
+    # /events checks revocations, so this worker keeps its copy in sync like main.py
+    asyncio.create_task(revocation_store.watch())
+    asyncio.create_task(event_hub.heartbeat_loop())
+    for writer in MEDIA_WRITERS:
+        writer.start()
+        drain_controller.register_flush(writer.name, writer.flush)
+    drain_controller.register_flush("event_hub", event_hub.shutdown)
+    if CALL_RECORDING_ENABLED:
+        asyncio.create_task(recording_retention_loop())
+    drain_controller.install_signal_handler()
+
+
+async def shutdown_event():
+    event_hub.close_all()
+    for writer in MEDIA_WRITERS:
+        await run_in_threadpool(writer.stop)
+    if CALL_RECORDING_ENABLED:
+        from app.services.call_analytics import shutdown_analysis_pool
+        shutdown_analysis_pool()
+
+
+@router.get("/health")
+@router.get("/health/live")
+async def health_check():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "healthy", "timestamp": datetime.datetime.utcnow().isoformat()}
+
+
+@router.get("/health/ready")
+async def readiness_check():
+    """Readiness: whether this worker should be routed new calls"""
+    readiness = capacity.readiness()
+    readiness["timestamp"] = datetime.datetime.utcnow().isoformat()
+    status_code = 200 if readiness["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(content=readiness, status_code=status_code)
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Process metrics: capacity, OpenAI rate-limit headroom and counters"""
+    return metrics.snapshot()
+
+
+def create_app() -> FastAPI:
+    """Build the media gateway application; same lifecycle wiring as main.create_app()"""
+    app = FastAPI(title="AiFriendChat Media Gateway", version="1.0.0")
+    app.include_router(media_router)
+    app.include_router(events_router)
+    app.include_router(admin_router)
+    app.include_router(router)
+
+    app.add_event_handler("startup", startup_event)
+    app.add_event_handler("shutdown", shutdown_event)
+    return app
+
+
+app = create_app()
+
+
+def uvicorn_options() -> dict:
+    """Server settings for the audio profile; uvloop/httptools are optional"""
+    return {
+        "host": "0.0.0.0",
+        "port": MEDIA_GATEWAY_PORT,
+        "workers": MEDIA_GATEWAY_WORKERS,
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "ws": "websockets",
+        "ws_max_size": MEDIA_WS_MAX_SIZE,
+        "ws_ping_interval": MEDIA_WS_PING_INTERVAL,
+        "ws_ping_timeout": MEDIA_WS_PING_TIMEOUT,
+        "ws_per_message_deflate": False,
+        "timeout_keep_alive": 5
+    }
+
+
+if __name__ == "__main__":
+    options = uvicorn_options()
+    logger.info(f"Starting media gateway: {options}")
+    uvicorn.run("media_gateway:app", **options)
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.services.audio_pacer import FRAME_BYTES, FRAME_SECONDS, PlayoutScheduler
+
+pytestmark = pytest.mark.anyio
+
+
+def make_scheduler(**kwargs):
+    sent = []
+
+    async def send_text(text):
+        sent.append(text)
+
+    return PlayoutScheduler(send_text, "MZ1", **kwargs), sent
+
+
+def media(sent):
+    return [m for m in sent if m.startswith('{"event":"media"')]
+
+
+async def test_sends_frames_at_real_time_pace():
+    scheduler, sent = make_scheduler(lead_ms=20)
+    task = asyncio.create_task(scheduler.run())
+    try:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        scheduler.feed(b"\x00" * FRAME_BYTES * 10)
+        while scheduler.frames_sent < 10:
+            await asyncio.sleep(0.005)
+        elapsed = loop.time() - started
+    finally:
+        task.cancel()
+    assert len(media(sent)) == 10
+    # The tenth frame plays 180 ms in and may go out up to `lead` early, but not all at once
+    assert elapsed >= 9 * FRAME_SECONDS - 0.02 - 0.01
+
+
+async def test_stall_mid_response_counts_one_underrun():
+    scheduler, _ = make_scheduler(lead_ms=40)
+    task = asyncio.create_task(scheduler.run())
+    try:
+        scheduler.feed(b"\x00" * FRAME_BYTES * 5)
+        await asyncio.sleep(0.3)  # Twilio plays the 100 ms and runs dry
+        assert scheduler.underruns == 0
+        scheduler.feed(b"\x00" * FRAME_BYTES * 5)
+        while scheduler.frames_sent < 10:
+            await asyncio.sleep(0.005)
+    finally:
+        task.cancel()
+    assert scheduler.underruns == 1
+
+
+async def test_gap_between_responses_is_not_an_underrun():
+    scheduler, _ = make_scheduler(lead_ms=40)
+    task = asyncio.create_task(scheduler.run())
+    try:
+        scheduler.feed(b"\x00" * FRAME_BYTES * 5)
+        scheduler.end_response()
+        await asyncio.sleep(0.3)
+        scheduler.feed(b"\x00" * FRAME_BYTES * 5)
+        while scheduler.frames_sent < 10:
+            await asyncio.sleep(0.005)
+    finally:
+        task.cancel()
+    assert scheduler.underruns == 0
+
+
+async def test_short_stall_within_the_lead_is_not_an_underrun():
+    scheduler, _ = make_scheduler(lead_ms=100)
+    task = asyncio.create_task(scheduler.run())
+    try:
+        scheduler.feed(b"\x00" * FRAME_BYTES * 10)
+        await asyncio.sleep(0.12)  # 200 ms queued, 100 ms still ahead of playback
+        scheduler.feed(b"\x00" * FRAME_BYTES * 5)
+        while scheduler.frames_sent < 15:
+            await asyncio.sleep(0.005)
+    finally:
+        task.cancel()
+    assert scheduler.underruns == 0
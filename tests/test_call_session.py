@@ -0,0 +1,51 @@
+import weakref
+
+import pytest
+
+from app.services.call_session import CallSession, EventRing
+
+
+def test_event_ring_keeps_the_most_recent_events_oldest_first():
+    ring = EventRing(size=3)
+    for n, event_type in enumerate(["start", "mark", "mark", "stop"]):
+        ring.add(event_type, float(n))
+    assert ring.recent() == [(1.0, "mark"), (2.0, "mark"), (3.0, "stop")]
+    assert ring.count == 4
+
+
+def test_event_ring_before_it_wraps():
+    ring = EventRing(size=4)
+    ring.add("start", 1.0)
+    assert ring.recent() == [(1.0, "start")]
+    assert EventRing(size=4).recent() == []
+
+
+def test_call_session_is_slotted_and_weakly_referenceable():
+    session = CallSession(websocket=None, scenario="default")
+    with pytest.raises(AttributeError):
+        session.unexpected = 1
+    assert weakref.ref(session)() is session
+
+
+def test_start_falls_back_to_the_stream_sid():
+    session = CallSession(websocket=None, scenario="default")
+    session.start({"streamSid": "MZ1"})
+    assert (session.stream_sid, session.call_sid) == ("MZ1", "MZ1")
+    session.start({"streamSid": "MZ2", "callSid": "CA2"})
+    assert session.call_sid == "CA2"
+
+
+def test_summary_counts_media_and_first_response():
+    session = CallSession(websocket=None, scenario="default")
+    assert session.summary()["duration_s"] == 0.0
+    session.start({"streamSid": "MZ1", "callSid": "CA1"})
+    for _ in range(3):
+        session.on_media()
+    assert session.summary()["first_response_ms"] is None
+    session.on_audio_delta()
+    session.on_audio_delta()
+    summary = session.summary()
+    assert summary["media_in"] == 3
+    assert summary["audio_deltas"] == 2
+    assert summary["first_response_ms"] >= 0
+    assert summary["reconnects"] == 0
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import IdempotencyKey
+from app.services import idempotency
+from app.services.idempotency import IdempotencyStore
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def store(session_factory, monkeypatch):
+    monkeypatch.setattr(idempotency, "SessionLocal", session_factory)
+    monkeypatch.setattr(idempotency, "POLL_INTERVAL", 0.01)
+    return IdempotencyStore()
+
+
+def counting_handler(result=None, started=None, release=None):
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        if started is not None:
+            started.set()
+        if release is not None:
+            await release.wait()
+        return result or {"call_sid": "CA1"}
+
+    return handler, calls
+
+
+def stored_row(session_factory, key="k1"):
+    db = session_factory()
+    try:
+        return db.query(IdempotencyKey).filter(IdempotencyKey.key == key).first()
+    finally:
+        db.close()
+
+
+async def test_repeat_replays_first_response(store):
+    handler, calls = counting_handler()
+    assert await store.run(1, "k1", "fp", handler) == {"call_sid": "CA1"}
+    replay = await store.run(1, "k1", "fp", handler)
+    assert calls == [1]
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+
+
+async def test_no_key_always_runs(store):
+    handler, calls = counting_handler()
+    await store.run(1, None, "fp", handler)
+    await store.run(1, None, "fp", handler)
+    assert calls == [1, 1]
+
+
+async def test_key_reused_with_other_request_is_rejected(store):
+    handler, _ = counting_handler()
+    await store.run(1, "k1", "fp", handler)
+    with pytest.raises(HTTPException) as excinfo:
+        await store.run(1, "k1", "other", handler)
+    assert excinfo.value.status_code == 422
+
+
+async def test_keys_are_scoped_per_user(store):
+    handler, calls = counting_handler()
+    await store.run(1, "k1", "fp", handler)
+    await store.run(2, "k1", "fp", handler)
+    assert calls == [1, 1]
+
+
+async def test_concurrent_duplicates_in_process_share_one_run(store):
+    release = asyncio.Event()
+    handler, calls = counting_handler(release=release)
+    first = asyncio.create_task(store.run(1, "k1", "fp", handler))
+    await asyncio.sleep(0.05)
+    second = asyncio.create_task(store.run(1, "k1", "fp", handler))
+    await asyncio.sleep(0.01)
+    release.set()
+    assert await first == {"call_sid": "CA1"}
+    assert (await second).status_code == 200
+    assert calls == [1]
+
+
+async def test_duplicate_on_another_worker_polls_the_claimed_row(store, session_factory):
+    other_worker = IdempotencyStore()
+    started, release = asyncio.Event(), asyncio.Event()
+    handler, calls = counting_handler(started=started, release=release)
+    first = asyncio.create_task(store.run(1, "k1", "fp", handler))
+    await started.wait()
+    second = asyncio.create_task(other_worker.run(1, "k1", "fp", handler))
+    await asyncio.sleep(0.05)
+    assert not second.done()  # pending: waiting on the first worker
+    release.set()
+    await first
+    replay = await second
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert calls == [1]
+    assert stored_row(session_factory).status_code == 200
+
+
+async def test_failed_handler_releases_the_key(store, session_factory):
+    async def failing():
+        raise RuntimeError("twilio down")
+
+    with pytest.raises(RuntimeError):
+        await store.run(1, "k1", "fp", failing)
+    assert stored_row(session_factory) is None
+    handler, calls = counting_handler()
+    assert await store.run(1, "k1", "fp", handler) == {"call_sid": "CA1"}
+    assert calls == [1]
+
+
+async def test_lost_claim_race_with_vanished_row_claims_again(store, session_factory):
+    # Another worker holds the key, then releases it between our failed insert and our lookup
+    owner = IdempotencyStore()
+    assert owner._claim(1, "k1", "fp")[0] == "claimed"
+    lookup = store._lookup
+    lookups = []
+
+    def released_before_lookup(db, user_id, key):
+        if not lookups:
+            owner._release(user_id, key)
+        lookups.append(1)
+        return lookup(db, user_id, key)
+
+    store._lookup = released_before_lookup
+    handler, calls = counting_handler()
+    assert await store.run(1, "k1", "fp", handler) == {"call_sid": "CA1"}
+    assert lookups == [1]
+    assert calls == [1]
+    assert stored_row(session_factory).status_code == 200
+
+
+async def test_invalid_key_is_rejected(store):
+    handler, calls = counting_handler()
+    with pytest.raises(HTTPException) as excinfo:
+        await store.run(1, "x" * 300, "fp", handler)
+    assert excinfo.value.status_code == 400
+    assert calls == []
@@ -0,0 +1,155 @@
+import asyncio
+import threading
+
+import pytest
+from jose import jwt
+
+from app.config import ALGORITHM, SECRET_KEY
+from app.services import rate_limiter
+from app.services.rate_limiter import (
+    MemoryBucketStore,
+    RateLimiter,
+    RateLimitMiddleware,
+    SQLiteBucketStore,
+    parse_limit
+)
+
+RULES = {
+    "auth": parse_limit("auth", "3/30", by_user=False),
+    "calls": parse_limit("calls", "5/60", by_user=True),
+    "api": parse_limit("api", "10/10", by_user=True)
+}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBucketStore()
+    return SQLiteBucketStore(str(tmp_path / "ratelimit.db"))
+
+
+def scope(path="/auth/login", headers=(), client=("203.0.113.7", 5000)):
+    return {"type": "http", "path": path, "headers": list(headers), "client": client}
+
+
+def test_parse_limit():
+    rule = parse_limit("auth", "10/60", by_user=False)
+    assert rule.capacity == 10
+    assert rule.rate == pytest.approx(10 / 60)
+
+
+def test_bucket_allows_burst_then_reports_wait(store):
+    rule = RULES["auth"]  # 3 per 30 s: one token every 10 s
+    assert [store.take("k", rule, 1000.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert store.take("k", rule, 1000.0) == pytest.approx(10.0)
+
+
+def test_bucket_refills_over_time(store):
+    rule = RULES["auth"]
+    for _ in range(3):
+        store.take("k", rule, 1000.0)
+    assert store.take("k", rule, 1004.0) == pytest.approx(6.0)
+    assert store.take("k", rule, 1010.0) == 0.0
+    assert store.take("k", rule, 1010.0) > 0
+
+
+def test_bucket_never_refills_past_capacity(store):
+    rule = RULES["auth"]
+    store.take("k", rule, 1000.0)
+    allowed = [store.take("k", rule, 5000.0) for _ in range(4)]
+    assert allowed[:3] == [0.0, 0.0, 0.0]
+    assert allowed[3] > 0
+
+
+def test_buckets_are_per_key(store):
+    rule = RULES["auth"]
+    for _ in range(3):
+        store.take("a", rule, 1000.0)
+    assert store.take("a", rule, 1000.0) > 0
+    assert store.take("b", rule, 1000.0) == 0.0
+
+
+def test_unthrottled_paths_never_touch_the_store():
+    limiter = RateLimiter(MemoryBucketStore(), RULES)
+    for path in ("/incoming-call/default", "/media-stream/default", "/health/ready"):
+        assert limiter.check(scope(path)) == (None, 0.0)
+    assert len(limiter.store) == 0
+
+
+def test_client_key_ignores_forwarded_header_unless_trusted(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "RATE_LIMIT_TRUST_FORWARDED", False)
+    limiter = RateLimiter(MemoryBucketStore(), RULES)
+    headers = [(b"x-forwarded-for", b"198.51.100.1")]
+    assert limiter.client_key(scope(headers=headers), RULES["auth"]) == "ip:203.0.113.7"
+
+
+@pytest.mark.parametrize("hops, forwarded, expected", [
+    (1, [b"198.51.100.1"], "ip:198.51.100.1"),
+    (1, [b"9.9.9.9, 198.51.100.1"], "ip:198.51.100.1"),  # spoofed left-hand entry
+    (1, [b"9.9.9.9", b"198.51.100.1"], "ip:198.51.100.1"),  # repeated header
+    (2, [b"9.9.9.9, 198.51.100.1, 10.0.0.2"], "ip:198.51.100.1"),
+    (3, [b"198.51.100.1"], "ip:198.51.100.1"),  # fewer entries than hops: leftmost
+])
+def test_client_key_takes_trusted_hop_from_the_right(monkeypatch, hops, forwarded, expected):
+    monkeypatch.setattr(rate_limiter, "RATE_LIMIT_TRUST_FORWARDED", True)
+    monkeypatch.setattr(rate_limiter, "RATE_LIMIT_TRUSTED_HOPS", hops)
+    limiter = RateLimiter(MemoryBucketStore(), RULES)
+    headers = [(b"x-forwarded-for", value) for value in forwarded]
+    assert limiter.client_key(scope(headers=headers), RULES["auth"]) == expected
+
+
+def test_client_key_prefers_verified_bearer_user():
+    limiter = RateLimiter(MemoryBucketStore(), RULES)
+    token = jwt.encode({"sub": "alice@example.com", "user_id": 42}, SECRET_KEY, algorithm=ALGORITHM)
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    assert limiter.client_key(scope("/calls", headers), RULES["api"]) == "user:42"
+    # Auth routes stay per IP, and a forged token falls back to the IP
+    assert limiter.client_key(scope("/auth/login", headers), RULES["auth"]) == "ip:203.0.113.7"
+    forged = [(b"authorization", b"Bearer not.a.jwt")]
+    assert limiter.client_key(scope("/calls", forged), RULES["api"]) == "ip:203.0.113.7"
+
+
+def test_sqlite_store_is_called_off_the_event_loop(tmp_path):
+    limiter = RateLimiter(SQLiteBucketStore(str(tmp_path / "ratelimit.db")), RULES)
+    threads = []
+    take = limiter.store.take
+
+    def recording_take(*args):
+        threads.append(threading.current_thread())
+        return take(*args)
+
+    limiter.store.take = recording_take
+
+    async def check():
+        return await limiter.check_async(scope())
+
+    rule, retry_after = asyncio.run(check())
+    assert rule is RULES["auth"] and retry_after == 0.0
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_middleware_answers_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "RATE_LIMIT_ENABLED", True)
+    limiter = RateLimiter(MemoryBucketStore(), RULES)
+    passed = []
+
+    async def app(scope, receive, send):
+        passed.append(scope["path"])
+
+    async def request():
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await RateLimitMiddleware(app, limiter)(scope(), None, send)
+        return sent
+
+    async def burst():
+        return [await request() for _ in range(4)]
+
+    responses = asyncio.run(burst())
+    assert len(passed) == 3
+    start = responses[3][0]
+    assert start["status"] == 429
+    assert (b"retry-after", b"10") in start["headers"]
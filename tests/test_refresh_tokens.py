@@ -0,0 +1,107 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app import auth
+from app.config import ALGORITHM, SECRET_KEY
+from app.services import token_revocation
+from app.services.token_revocation import RevocationStore
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def revocations(session_factory, monkeypatch):
+    store = RevocationStore()
+    monkeypatch.setattr(auth, "revocation_store", store)
+    monkeypatch.setattr(token_revocation, "SessionLocal", session_factory)
+    return store
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+def family_of(token: str) -> str:
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])["fam"]
+
+
+async def rotate(db, token: str) -> dict:
+    return (await auth.refresh_token(token, db)).model_dump()
+
+
+async def test_rotation_issues_a_new_pair_in_the_same_session(revocations, db):
+    tokens = auth._issue_tokens(1, "alice@example.com")
+    rotated = await rotate(db, tokens["refresh_token"])
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert family_of(rotated["refresh_token"]) == family_of(tokens["refresh_token"])
+    assert auth._access_claims(rotated["access_token"])["user_id"] == 1
+
+
+async def test_reused_refresh_token_revokes_the_whole_session(revocations, db):
+    tokens = auth._issue_tokens(1, "alice@example.com")
+    rotated = await rotate(db, tokens["refresh_token"])
+
+    with pytest.raises(HTTPException) as excinfo:
+        await rotate(db, tokens["refresh_token"])
+    assert excinfo.value.status_code == 401
+    assert revocations.reuse_detected == 1
+    assert revocations.is_revoked(family_of(tokens["refresh_token"]))
+
+    # The legitimate holder's newer tokens die with the session
+    with pytest.raises(HTTPException):
+        await rotate(db, rotated["refresh_token"])
+    with pytest.raises(HTTPException):
+        auth._access_claims(rotated["access_token"])
+    assert revocations.reuse_detected == 1  # already revoked: not counted again
+
+
+async def test_reuse_is_detected_across_workers(revocations, session_factory, db):
+    tokens = auth._issue_tokens(1, "alice@example.com")
+    await rotate(db, tokens["refresh_token"])
+
+    # A second worker has not synced yet; the unique insert still catches the replay
+    other_worker = RevocationStore()
+    other_db = session_factory()
+    try:
+        claims = jwt.decode(tokens["refresh_token"], SECRET_KEY, algorithms=[ALGORITHM])
+        assert not other_worker.consume_refresh(
+            other_db, claims["jti"], claims["fam"], 1, datetime.utcfromtimestamp(claims["exp"]))
+    finally:
+        other_db.close()
+
+
+async def test_other_sessions_are_unaffected(revocations, db):
+    leaked = auth._issue_tokens(1, "alice@example.com")
+    other = auth._issue_tokens(1, "alice@example.com")
+    await rotate(db, leaked["refresh_token"])
+    with pytest.raises(HTTPException):
+        await rotate(db, leaked["refresh_token"])
+    assert (await rotate(db, other["refresh_token"]))["access_token"]
+
+
+async def test_access_token_is_not_a_refresh_token(revocations, db):
+    tokens = auth._issue_tokens(1, "alice@example.com")
+    with pytest.raises(HTTPException) as excinfo:
+        await rotate(db, tokens["access_token"])
+    assert excinfo.value.status_code == 401
+    with pytest.raises(HTTPException):
+        auth._access_claims(tokens["refresh_token"])
+
+
+async def test_sync_loads_revocations_from_other_workers(revocations, db):
+    tokens = auth._issue_tokens(1, "alice@example.com")
+    await rotate(db, tokens["refresh_token"])
+    with pytest.raises(HTTPException):
+        await rotate(db, tokens["refresh_token"])
+
+    other_worker = RevocationStore()
+    assert not other_worker.is_revoked(family_of(tokens["refresh_token"]))
+    assert other_worker.sync() == 2  # the spent refresh token and the revoked session
+    assert other_worker.is_revoked(family_of(tokens["refresh_token"]))
+    assert other_worker.sync() == 0